@@ -0,0 +1,97 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+End-to-end latency of oasis commands, with and without the daemon.
+
+Every run starts a new `oasis` process, the way scripts do. The command
+is first timed in-process (OASIS_NO_DAEMON=1), then forwarded to a
+daemon started for the occasion from the same environment. The OS_*
+variables must hold working credentials unless the command does not
+need them.
+
+Usage::
+
+    python benchmarks/cli_latency.py --runs 20 function-list
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from oasisclient import daemon
+
+OASIS = [sys.executable, '-m', 'oasisclient.daemon']
+
+
+def _time(argv, env, runs):
+    samples = []
+    with open(os.devnull, 'w') as devnull:
+        for _ in range(runs):
+            started = time.time()
+            status = subprocess.call(OASIS + argv, env=env, stdout=devnull)
+            samples.append(time.time() - started)
+            if status:
+                raise RuntimeError('%s exited with %d' %
+                                   (' '.join(argv), status))
+    return sorted(samples)
+
+
+def _report(name, samples):
+    def pct(p):
+        return samples[min(len(samples) - 1, int(len(samples) * p))] * 1000
+    print('%-10s p50 %8.1f ms   p95 %8.1f ms   min %8.1f ms' %
+          (name, pct(0.5), pct(0.95), samples[0] * 1000))
+
+
+def _wait_for(path, daemon_proc, timeout=60):
+    deadline = time.time() + timeout
+    while not os.path.exists(path):
+        if daemon_proc.poll() is not None or time.time() > deadline:
+            raise RuntimeError('The daemon did not start')
+        time.sleep(0.1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--runs', type=int, default=10,
+                        help='Runs per mode.')
+    parser.add_argument('command', nargs=argparse.REMAINDER,
+                        help='Command to time, e.g. function-list.')
+    args = parser.parse_args(argv)
+    command = args.command or ['help']
+
+    env = dict(os.environ, OASIS_NO_DAEMON='1')
+    _report('in-process', _time(command, env, args.runs))
+
+    env = dict(os.environ)
+    env.pop('OASIS_NO_DAEMON', None)
+    path = daemon.socket_path()
+    proc = subprocess.Popen(OASIS + ['daemon', '--idle-timeout', '0'],
+                            env=env)
+    try:
+        _wait_for(path, proc)
+        # The first forwarded command warms the daemon's caches up.
+        _time(command, env, 1)
+        _report('daemon', _time(command, env, args.runs))
+    finally:
+        proc.terminate()
+        proc.wait()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,216 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Micro-benchmarks of the client-side cost of a request.
+
+The HTTP connection and the keystone session are replaced by in-memory
+fakes returning canned responses, so that only the CPU time spent by the
+client itself is measured: building headers, decoding the body, creating
+the resource objects and copying them back to dicts.
+
+Usage::
+
+    python benchmarks/request_overhead.py --save baseline.json
+    # ... change things ...
+    python benchmarks/request_overhead.py --compare baseline.json \\
+        --threshold 10
+
+With --compare, the exit status is 1 if any case got slower than the
+baseline by more than the threshold, in percent.
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import sys
+import timeit
+
+from oasisclient.common import httpclient
+from oasisclient.v1 import functions
+
+ITEM = {
+    'id': '9f6b6ad8-4e7b-4bd5-8d8e-3c2e5c6f5f10',
+    'name': 'hello',
+    'user_id': 'c3f5e0f5b9a94a0b9e3b6c3a2f2c8b1d',
+    'project_id': '4b6f7e0a2c7d4f3e9a8b1c2d3e4f5a6b',
+    'runtime': 'python2.7',
+    'labels': {'tier': 'web', 'team': 'core'},
+    'env': [{'name': 'DEBUG', 'value': '0'}],
+    'created_at': '2016-11-02T10:00:00+00:00',
+    'updated_at': None,
+}
+PAGE_SIZE = 100
+
+
+def _page_body(size=PAGE_SIZE):
+    return json.dumps({'functions': [dict(ITEM, id='%032x' % i)
+                                     for i in range(size)]})
+
+
+class FakeResponse(object):
+    status = 200
+    reason = 'OK'
+    version = 11
+    will_close = False
+
+    def __init__(self, body):
+        self._body = body.encode('utf-8')
+        self._headers = {'content-type': 'application/json'}
+
+    def getheader(self, name, default=None):
+        return self._headers.get(name.lower(), default)
+
+    def getheaders(self):
+        return list(self._headers.items())
+
+    def read(self, amt=None):
+        chunk, self._body = self._body[:amt], self._body[amt:]
+        return chunk
+
+
+class FakeConnection(object):
+    body = _page_body(1)
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def request(self, method, url, body=None, headers=None):
+        pass
+
+    def getresponse(self):
+        return FakeResponse(self.body)
+
+    def close(self):
+        pass
+
+
+class FakeSessionResponse(object):
+    status_code = 200
+
+    def __init__(self, body):
+        self.content = body
+        self.headers = {'content-type': 'application/json'}
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class FakeSession(object):
+    body = _page_body(1)
+
+    def request(self, url, method, **kwargs):
+        return FakeSessionResponse(self.body)
+
+
+def _http_client(body):
+    client = httpclient.HTTPClient('http://oasis.invalid:9417/v1',
+                                   token='0123456789abcdef')
+    conn_class = type('Connection', (FakeConnection,), {'body': body})
+    client.connection_params = ((conn_class,) +
+                                client.connection_params[1:])
+    return client
+
+
+def _session_client(body):
+    session = FakeSession()
+    session.body = body
+    return httpclient.SessionClient(session=session, service_type='oasis')
+
+
+def cases():
+    """Return the benchmark cases, as (name, callable) pairs."""
+    one = json.dumps(ITEM)
+    page = _page_body()
+    http = _http_client(one)
+    http_page = _http_client(page)
+    session = _session_client(one)
+    manager = functions.FunctionManager(http_page)
+    objs = manager._list('/v1/functions', 'functions')
+    headers = {'If-Match': '"etag"'}
+
+    return [
+        ('http_json_get', lambda: http.json_request('GET', '/v1/functions/x')),
+        ('http_json_patch', lambda: http.json_request(
+            'PATCH', '/v1/functions/x', body=[], headers=headers)),
+        ('session_json_get', lambda: session.json_request(
+            'GET', '/v1/functions/x')),
+        ('list_%d' % PAGE_SIZE, lambda: manager._list('/v1/functions',
+                                                      'functions')),
+        ('to_dict_%d' % PAGE_SIZE, lambda: [obj.to_dict() for obj in objs]),
+    ]
+
+
+def run(number, repeat):
+    """Time every case, return the best time per call in microseconds."""
+    results = {}
+    for name, func in cases():
+        timer = timeit.Timer(func)
+        best = min(timer.repeat(repeat=repeat, number=number))
+        results[name] = best / number * 1e6
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print the change from the baseline, return the regressed cases."""
+    regressed = []
+    for name in sorted(results):
+        before = baseline.get(name)
+        if not before:
+            print('%-20s %10.1f us' % (name, results[name]))
+            continue
+        change = (results[name] - before) / before * 100
+        flag = ''
+        if change > threshold:
+            regressed.append(name)
+            flag = '  REGRESSION'
+        print('%-20s %10.1f us  (%+.1f%%)%s' % (name, results[name],
+                                              change, flag))
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--number', type=int, default=500,
+                        help='Calls per timing run.')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Timing runs per case; the best one is kept.')
+    parser.add_argument('--save', metavar='FILE',
+                        help='Save the results as a baseline.')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='Compare the results with a saved baseline.')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='Slowdown, in percent, counted as a '
+                             'regression.')
+    args = parser.parse_args(argv)
+
+    results = run(args.number, args.repeat)
+    regressed = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressed = compare(results, json.load(f), args.threshold)
+    else:
+        compare(results, {}, args.threshold)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if regressed:
+        print('%d case(s) regressed by more than %.0f%%'
+              % (len(regressed), args.threshold))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
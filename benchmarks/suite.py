@@ -0,0 +1,316 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Benchmarks of the client hot paths against a local stand-in API.
+
+Every case runs against a :class:`oasisclient.fakeserver.FakeOasisServer`
+over real HTTP: listings of various sizes, with and without pagination,
+Resource construction, json_request decoding, create and update
+round-trips, print_list rendering and the cold start of the CLI.
+
+Results are saved per commit, as .benchmarks/<commit>.json, and can be
+compared between commits::
+
+    python benchmarks/suite.py run
+    git checkout my-branch
+    python benchmarks/suite.py run --compare master --threshold 10
+    python benchmarks/suite.py compare master my-branch
+
+A comparison exits with 1 if any case got slower than the baseline by
+more than the threshold, in percent.
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+from oasisclient.common import cliutils
+from oasisclient.common import httpclient
+from oasisclient import fakeserver
+from oasisclient.v1 import functions
+
+import request_overhead
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, '.benchmarks')
+
+COLLECTION_SIZE = 1000
+LIST_SIZES = (10, 100, 1000)
+PAGE_SIZE = 100
+
+_CASES = []
+
+
+def case(name):
+    """Register a benchmark case.
+
+    The decorated function takes the :class:`Context` and returns a list
+    of (name, callable) pairs, the callables being what is timed.
+    """
+    def decorator(func):
+        _CASES.append((name, func))
+        return func
+    return decorator
+
+
+class _Null(object):
+
+    def write(self, data):
+        pass
+
+    def flush(self):
+        pass
+
+
+class Context(object):
+    """A seeded server and a client connected to it."""
+
+    def __init__(self):
+        self.server = fakeserver.FakeOasisServer(max_limit=COLLECTION_SIZE)
+        self.server.seed('functions', COLLECTION_SIZE,
+                         {'name': 'function-{n}', 'runtime': 'python2.7',
+                          'labels': {'tier': 'web'}})
+        self.server.start()
+        self.http = httpclient.HTTPClient(self.server.endpoint)
+        self.manager = functions.FunctionManager(self.http)
+
+    def close(self):
+        self.server.stop()
+
+
+@case('list')
+def _list_cases(ctx):
+    return [('list_%d' % size,
+             lambda size=size: ctx.manager._list(
+                 '/v1/functions?limit=%d' % size, 'functions'))
+            for size in LIST_SIZES]
+
+
+@case('list_pagination')
+def _pagination_cases(ctx):
+    url = '/v1/functions?limit=%d' % PAGE_SIZE
+    return [('list_pagination_%d' % size,
+             lambda size=size: ctx.manager._list_pagination(
+                 url, 'functions', limit=size))
+            for size in LIST_SIZES if size >= PAGE_SIZE]
+
+
+@case('resource')
+def _resource_cases(ctx):
+    _resp, body = ctx.http.json_request('GET', '/v1/functions?limit=100')
+    infos = body['functions']
+    return [('resource_100', lambda: [functions.Function(ctx.manager, info,
+                                                         loaded=True)
+                                      for info in infos])]
+
+
+@case('json_request')
+def _json_request_cases(ctx):
+    return [('json_request_%d' % size,
+             lambda size=size: ctx.http.json_request(
+                 'GET', '/v1/functions?limit=%d' % size))
+            for size in (1, 100)]
+
+
+@case('roundtrip')
+def _roundtrip_cases(ctx):
+    target = ctx.manager._list('/v1/functions?limit=1', 'functions')[0]
+    counter = [0]
+
+    def create():
+        obj = ctx.manager.create(name='bench', runtime='python2.7')
+        ctx.manager.delete(obj.id)
+
+    def update():
+        counter[0] += 1
+        ctx.manager.update(target.id, name='renamed-%d' % counter[0])
+
+    return [('create_delete', create), ('update', update)]
+
+
+@case('print_list')
+def _print_list_cases(ctx):
+    def render(objs):
+        stdout, sys.stdout = sys.stdout, _Null()
+        try:
+            cliutils.print_list(objs, ['id', 'name', 'runtime', 'labels'])
+        finally:
+            sys.stdout = stdout
+
+    cases = []
+    for size in (100, COLLECTION_SIZE):
+        objs = ctx.manager._list('/v1/functions?limit=%d' % size,
+                                 'functions')
+        cases.append(('print_list_%d' % size,
+                      lambda objs=objs: render(objs)))
+    return cases
+
+
+def _cold_start(ctx, runs):
+    """Best wall time of `oasis function-list` in a new process."""
+    env = dict(os.environ, OASIS_NO_DAEMON='1',
+               OS_AUTH_URL=ctx.server.auth_url, OS_USERNAME='bench',
+               OS_PASSWORD='bench', OS_PROJECT_NAME='bench',
+               XDG_CACHE_HOME=tempfile.mkdtemp(prefix='oasis-bench-'))
+    argv = [sys.executable, '-m', 'oasisclient.daemon', 'function-list']
+    samples = []
+    with open(os.devnull, 'w') as devnull:
+        # The first run writes the command table, as any first run does.
+        for _i in range(runs + 1):
+            started = time.time()
+            status = subprocess.call(argv, env=env, stdout=devnull,
+                                     stderr=devnull, cwd=ROOT)
+            samples.append(time.time() - started)
+            if status:
+                raise RuntimeError('function-list exited with %d' % status)
+    return min(samples[1:]) * 1e6
+
+
+def _calibrate(func, min_time):
+    number = 1
+    while True:
+        if timeit.Timer(func).timeit(number) >= min_time or number >= 10 ** 6:
+            return number
+        number *= 10
+
+
+def run(selected=None, repeat=5, min_time=0.1, cold_start_runs=5):
+    """Time every case, return the best time per call in microseconds."""
+    ctx = Context()
+    results = {}
+    try:
+        for _group, factory in _CASES:
+            cases = factory(ctx)
+            for name, func in cases:
+                if selected and not any(s in name for s in selected):
+                    continue
+                number = _calibrate(func, min_time)
+                best = min(timeit.Timer(func).repeat(repeat=repeat,
+                                                     number=number))
+                results[name] = best / number * 1e6
+        if not selected or any(s in 'cli_cold_start' for s in selected):
+            results['cli_cold_start'] = _cold_start(ctx, cold_start_runs)
+    finally:
+        ctx.close()
+    return results
+
+
+def _git(*args):
+    return subprocess.check_output(('git',) + args, cwd=ROOT).decode(
+        'utf-8').strip()
+
+
+def _results_file(ref):
+    """Return the saved results of a commit-ish, or a results file."""
+    if os.path.isfile(ref):
+        return ref
+    return os.path.join(RESULTS_DIR, '%s.json' % _git('rev-parse', ref))
+
+
+def _load(ref):
+    path = _results_file(ref)
+    if not os.path.exists(path):
+        raise SystemExit('No results for %s; run the suite on it first.'
+                         % ref)
+    with open(path) as f:
+        return json.load(f)['results']
+
+
+def save(results):
+    """Save the results under the current commit, return the file.
+
+    Results of cases which were not run are kept from earlier runs.
+    """
+    commit = _git('rev-parse', 'HEAD')
+    dirty = bool(_git('status', '--porcelain', '--untracked-files=no'))
+    if not os.path.isdir(RESULTS_DIR):
+        os.makedirs(RESULTS_DIR)
+    path = os.path.join(RESULTS_DIR, '%s.json' % commit)
+    if os.path.exists(path):
+        with open(path) as f:
+            results = dict(json.load(f)['results'], **results)
+    with open(path, 'w') as f:
+        json.dump({'commit': commit, 'dirty': dirty, 'time': time.time(),
+                   'python': platform.python_version(),
+                   'results': results}, f, indent=2, sort_keys=True)
+    return path
+
+
+def _regressions(results, baseline, threshold):
+    regressed = request_overhead.compare(results, baseline, threshold)
+    if regressed:
+        print('%d case(s) regressed by more than %.0f%%'
+              % (len(regressed), threshold))
+        return 1
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    subparsers = parser.add_subparsers(dest='action')
+
+    run_parser = subparsers.add_parser('run', help='Run the suite.')
+    run_parser.add_argument('cases', nargs='*',
+                            help='Only run the cases whose name contains '
+                                 'one of these.')
+    run_parser.add_argument('--repeat', type=int, default=5,
+                            help='Timing runs per case; the best one is '
+                                 'kept.')
+    run_parser.add_argument('--min-time', type=float, default=0.1,
+                            help='Seconds a timing run lasts at least.')
+    run_parser.add_argument('--no-save', action='store_true',
+                            help='Do not save the results.')
+    run_parser.add_argument('--compare', metavar='REF',
+                            help='Compare with the results of a commit or '
+                                 'a results file.')
+    run_parser.add_argument('--threshold', type=float, default=10.0,
+                            help='Slowdown, in percent, counted as a '
+                                 'regression.')
+
+    compare_parser = subparsers.add_parser(
+        'compare', help='Compare the saved results of two commits.')
+    compare_parser.add_argument('base',
+                                help='Commit or results file of reference.')
+    compare_parser.add_argument('head', nargs='?', default='HEAD',
+                                help='Commit or results file to compare; '
+                                     'the current commit by default.')
+    compare_parser.add_argument('--threshold', type=float, default=10.0,
+                                help='Slowdown, in percent, counted as a '
+                                     'regression.')
+    args = parser.parse_args(argv)
+
+    if args.action == 'compare':
+        return _regressions(_load(args.head), _load(args.base),
+                            args.threshold)
+
+    # Loaded first, since the results of the current commit get replaced.
+    baseline = _load(args.compare) if args.compare else None
+    results = run(args.cases, args.repeat, args.min_time)
+    if not args.no_save:
+        print('Saved to %s' % os.path.relpath(save(results)))
+    if baseline is not None:
+        return _regressions(results, baseline, args.threshold)
+    request_overhead.compare(results, {}, args.threshold)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -39,6 +39,7 @@ Base utilities to build API operation managers and objects on top of.
 
 import abc
 import copy
+import itertools
 
 from oslo_utils import strutils
 import six
@@ -228,6 +229,10 @@ class BaseManager(HookableMixin):
 class ManagerWithFind(BaseManager):
     """Manager with additional `find()`/`findall()` methods."""
 
+    # Attributes that list() accepts as keyword arguments and forwards to
+    # the API as query filters.
+    filter_params = ()
+
     @abc.abstractmethod
     def list(self):
         pass
@@ -235,10 +240,10 @@ class ManagerWithFind(BaseManager):
     def find(self, **kwargs):
         """Find a single item with attributes matching ``**kwargs``.
 
-        This isn't very efficient: it loads the entire list then filters on
-        the Python side.
+        Filters listed in `filter_params` are passed on to list(); the
+        rest are checked on the Python side, stopping at the second match.
         """
-        matches = self.findall(**kwargs)
+        matches = list(itertools.islice(self._iter_findall(**kwargs), 2))
         num_matches = len(matches)
         if num_matches == 0:
             msg = _("No %(name)s matching %(args)s.") % {
@@ -254,22 +259,24 @@ class ManagerWithFind(BaseManager):
     def findall(self, **kwargs):
         """Find all items with attributes matching ``**kwargs``.
 
-        This isn't very efficient: it loads the entire list then filters on
-        the Python side.
+        Filters listed in `filter_params` are passed on to list(); the
+        rest are checked on the Python side.
         """
-        found = []
+        return list(self._iter_findall(**kwargs))
+
+    def _iter_findall(self, **kwargs):
         searches = kwargs.items()
+        list_filters = dict((attr, value) for (attr, value) in searches
+                            if attr in self.filter_params)
 
-        for obj in self.list():
+        for obj in self.list(**list_filters):
             try:
                 if all(getattr(obj, attr) == value
                        for (attr, value) in searches):
-                    found.append(obj)
+                    yield obj
             except AttributeError:
                 continue
 
-        return found
-
 
 class CrudManager(BaseManager):
     """Base manager class for manipulating entities.
@@ -123,10 +123,15 @@ class HttpError(ClientException):
 
     def __init__(self, message=None, details=None,
                  response=None, request_id=None,
-                 url=None, method=None, http_status=None):
+                 url=None, method=None, http_status=None, retry_after=0):
         self.http_status = http_status or self.http_status
         self.message = message or self.message
         self.details = details
+        try:
+            self.retry_after = int(retry_after)
+        except ValueError:
+            # An HTTP date rather than seconds.
+            self.retry_after = 0
         self.request_id = request_id
         self.response = response
         self.url = url
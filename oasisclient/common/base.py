@@ -3,11 +3,41 @@
 Base utilities to build API operation managers and objects on top of.
 """
 
+import collections
 import copy
+import itertools
+import operator
+import time
 
+import six
 import six.moves.urllib.parse as urlparse
 
+from oslo_utils import uuidutils
+
 from oasisclient.common.apiclient import base
+from oasisclient.common.apiclient import exceptions
+from oasisclient.common import concurrency
+from oasisclient.common import index
+from oasisclient.common import utils
+from oasisclient.common import watch
+from oasisclient.i18n import _
+
+_JSON_LEAVES = six.string_types + six.integer_types + (float, type(None))
+
+
+def _copy_info(value):
+    """Copy decoded JSON, sharing the immutable leaves.
+
+    Much cheaper than copy.deepcopy, which keeps a memo of every object it
+    visits; anything that is not plain JSON still goes through it.
+    """
+    if isinstance(value, dict):
+        return dict((k, _copy_info(v)) for (k, v) in value.items())
+    elif isinstance(value, list):
+        return [_copy_info(v) for v in value]
+    elif isinstance(value, _JSON_LEAVES):
+        return value
+    return copy.deepcopy(value)
 
 
 def getid(obj):
@@ -26,14 +56,100 @@ class Manager(object):
     """Provides  CRUD operations with a particular API."""
     resource_class = None
 
+    # Key of the collection in list responses, e.g. 'functions'.
+    collection_key = None
+
+    # Attributes the API accepts as query parameters when listing the
+    # collection. find() pushes these filters to the server; anything
+    # else is matched on the client side.
+    filter_params = ()
+
+    # Unique attributes, besides the ID, kept in the name index.
+    index_attrs = ('name',)
+
+    # How many objects, as last returned by the API, are kept around to
+    # compute update patches against.
+    seen_cache_size = 256
+
+    # :class:`oasisclient.common.pagination.PageSizeTuner` picking the page
+    # size of paginated listings, if any; pages have the API's default
+    # size otherwise, and listings without a limit stop at the first one.
+    page_tuner = None
+
     def __init__(self, api):
         self.api = api
+        self._index = None
+        self._seen = collections.OrderedDict()
+
+    def get_index(self, cache_file=None):
+        """Return the name index of the collection, creating it if needed.
+
+        :param cache_file: where to persist the index between runs; only
+            used when the index is created.
+        """
+        if self._index is None:
+            self._index = index.ResourceIndex(self, self.index_attrs,
+                                              cache_file=cache_file)
+        return self._index
+
+    def resolve(self, name_or_id, verify=False):
+        """Return the ID of the object with the given name or ID.
+
+        :param verify: get the object a name resolves to from the index,
+            and check that it still has that name, since the index does
+            not see the renames and deletions made by others; to be used
+            before anything destructive.
+        """
+        # Taken as an ID as is, rather than building the index to check.
+        if uuidutils.is_uuid_like(name_or_id):
+            return name_or_id
+        idx = self.get_index()
+        if name_or_id in idx:
+            return name_or_id
+        try:
+            obj_id = idx.resolve(name_or_id)
+        except exceptions.NotFound:
+            obj_id = None
+        if obj_id is not None and verify:
+            try:
+                current = self.get(obj_id)
+            except exceptions.NotFound:
+                idx.discard(obj_id)
+                obj_id = None
+            else:
+                if getattr(current, 'name', None) != name_or_id:
+                    idx.add(current)
+                    obj_id = None
+        if obj_id is None:
+            # Renamed or deleted by someone else since the index was built.
+            obj = self.find(name=name_or_id)
+            idx.add(obj)
+            obj_id = obj.id
+        return obj_id
+
+    @staticmethod
+    def _id_from_url(url):
+        return url.split('?', 1)[0].rstrip('/').rsplit('/', 1)[-1]
+
+    def _remember(self, obj, resp):
+        """Keep track of an object just returned by the API."""
+        obj._etag = utils.get_header(resp, 'ETag')
+        obj_id = getattr(obj, 'id', None)
+        if obj_id is None:
+            return
+        self._seen.pop(obj_id, None)
+        self._seen[obj_id] = obj
+        while len(self._seen) > self.seen_cache_size:
+            self._seen.popitem(last=False)
+        if self._index is not None:
+            self._index.add(obj)
 
     def _create(self, url, body):
-        print 'url : ' + url
         resp, body = self.api.json_request('POST', url, body=body)
         if body:
-            return self.resource_class(self, body)
+            obj = self.resource_class(self, body)
+            self._remember(obj, resp)
+            return obj
 
     def _format_body_data(self, body, response_key):
         if response_key:
@@ -67,6 +183,21 @@ class Manager(object):
         :param limit: maximum number of items to return. If None returns
             everything.
 
+        """
+        return list(self._iter_pagination(url, response_key, obj_class,
+                                          limit))
+
+    def _iter_pagination(self, url, response_key=None, obj_class=None,
+                         limit=None):
+        """Iterate over items, fetching the next page only when needed.
+
+        Same as :meth:`_list_pagination`, but yields the objects as the
+        pages arrive, so that a caller which stops early never requests
+        the remaining pages.
+
+        With a `page_tuner`, the `limit` query parameter of every page
+        request, including the 'next' links, is set to the tuner's page
+        size.
         """
         if obj_class is None:
             obj_class = self.resource_class
@@ -74,23 +205,27 @@ class Manager(object):
         if limit is not None:
             limit = int(limit)
 
-        object_list = []
+        tuner = self.page_tuner
         object_count = 0
-        limit_reached = False
         while url:
+            if tuner is not None:
+                page_size = tuner.limit
+                if limit:
+                    page_size = min(page_size, limit - object_count)
+                url = utils.set_query_params(url, limit=page_size)
+                started = time.time()
             resp, body = self.api.json_request('GET', url)
             data = self._format_body_data(body, response_key)
+            if tuner is not None and body.get('next'):
+                # The last page is usually short, and tells little.
+                size = utils.get_header(resp, 'Content-Length')
+                tuner.record(len(data), time.time() - started,
+                             int(size) if size else None)
             for obj in data:
-                object_list.append(obj_class(self, obj, loaded=True))
+                yield obj_class(self, obj, loaded=True)
                 object_count += 1
                 if limit and object_count >= limit:
-                    # break the for loop
-                    limit_reached = True
-                    break
-
-            # break the while loop and return
-            if limit_reached:
-                break
+                    return
 
             url = body.get('next')
             if url:
@@ -100,25 +235,236 @@ class Manager(object):
                 url_parts[0] = url_parts[1] = ''
                 url = urlparse.urlunparse(url_parts)
 
-        return object_list
-
     def _list(self, url, response_key=None, obj_class=None, body=None):
+        if response_key and self.page_tuner is not None:
+            # Pages of the tuner's size rather than the API's default one,
+            # followed to the end so that none is cut short.
+            return self._list_pagination(url, response_key, obj_class)
         resp, body = self.api.json_request('GET', url)
 
         if obj_class is None:
             obj_class = self.resource_class
 
         data = self._format_body_data(body, response_key)
-        return [obj_class(self, res, loaded=True) for res in data if res]
-
-    def _update(self, url, body, method='PATCH', response_key=None):
-        resp, body = self.api.json_request(method, url, body=body)
+        objs = [obj_class(self, res, loaded=True) for res in data if res]
+        if isinstance(body, dict) and response_key not in body:
+            # A single object, whose ETag is that of the response.
+            for obj in objs:
+                self._remember(obj, resp)
+        return objs
+
+    def _update(self, url, body, method='PATCH', response_key=None,
+                headers=None):
+        kwargs = {'headers': headers} if headers else {}
+        try:
+            resp, body = self.api.json_request(method, url, body=body,
+                                               **kwargs)
+        except exceptions.PreconditionFailed:
+            self._seen.pop(self._id_from_url(url), None)
+            raise
         # PATCH/PUT requests may not return a body
         if body:
-            return self.resource_class(self, body)
+            obj = self.resource_class(self, body)
+            self._remember(obj, resp)
+            return obj
+
+    def _update_fields(self, url, changes, original=None):
+        """Update the given fields of an object in a single round-trip.
+
+        The patch is computed against `original` or, failing that, against
+        the object as this manager last saw it if it came with an ETag;
+        otherwise every field in `changes` is replaced, as a cached copy
+        may be stale. If the base object came with an ETag it is sent as
+        If-Match, so that the update fails rather than overwrite a
+        concurrent one. Nothing is sent if nothing changes.
+
+        :param url: a partial URL, e.g. '/v1/functions/<id>'
+        :param changes: `dict` of the fields to set.
+        :param original: the object before the update, as a
+            :class:`Resource` or a `dict`.
+        :returns: the updated object if the API returned it, the
+            unchanged `original` if there was nothing to do.
+        """
+        if original is None:
+            seen = self._seen.get(self._id_from_url(url))
+            if getattr(seen, '_etag', None):
+                original = seen
+
+        etag = None
+        info = original
+        if isinstance(original, base.Resource):
+            etag = getattr(original, '_etag', None)
+            info = original._info
+
+        patch = utils.fields_to_patch(changes, info)
+        if not patch:
+            return original if isinstance(original, base.Resource) else None
+
+        headers = {'If-Match': etag} if etag else None
+        return self._update(url, patch, headers=headers)
+
+    def update_fields(self, obj_id, changes, original=None):
+        """Update the given fields of an object, see :meth:`_update_fields`.
+
+        Unlike the `update` of each manager, which takes the fields as
+        keyword arguments when it takes them at all, this works the same
+        for every collection.
+
+        :param obj_id: the ID of the object.
+        :param changes: `dict` of the fields to set.
+        :param original: the object before the update, if known.
+        """
+        return self._update_fields(self._path(obj_id), changes,
+                                   original=original)
 
     def _delete(self, url):
         self.api.raw_request('DELETE', url)
+        obj_id = self._id_from_url(url)
+        self._seen.pop(obj_id, None)
+        if self._index is not None:
+            self._index.discard(obj_id)
+
+    def get_many(self, ids, max_workers=concurrency.DEFAULT_WORKERS):
+        """Fetch several objects by ID, concurrently.
+
+        Objects are fetched with one get() per ID, with at most
+        `max_workers` requests in flight over the shared connection pool.
+
+        :param ids: IDs of the objects to fetch.
+        :param max_workers: maximum number of concurrent requests.
+        :returns: a tuple of a `dict` of the objects found, keyed by ID,
+            and the list of the IDs that do not exist.
+        """
+        ids = list(collections.OrderedDict.fromkeys(ids))
+        if hasattr(self.api, 'set_pool_size'):
+            self.api.set_pool_size(max_workers)
+
+        found = {}
+        for obj_id, obj, exc in concurrency.run_concurrently(
+                self._get_one, ids, max_workers):
+            if exc is not None:
+                raise exc
+            if obj:
+                found[obj_id] = obj
+
+        missing = [obj_id for obj_id in ids if obj_id not in found]
+        return found, missing
+
+    def _get_one(self, obj_id):
+        try:
+            return self.get(obj_id)
+        except exceptions.NotFound:
+            return None
+
+    def watch(self, interval=10, resync_every=10):
+        """Poll the collection and yield what changes.
+
+        The first poll reports every object as added; later ones only
+        fetch and report what was added, modified or deleted since. See
+        :class:`oasisclient.common.watch.ChangeTracker`.
+
+        :param interval: seconds to wait between two polls.
+        :param resync_every: number of polls between two full listings,
+            which are needed to notice deletions.
+        :returns: endless generator of
+            :class:`oasisclient.common.watch.Event`.
+        """
+        tracker = watch.ChangeTracker(self, resync_every=resync_every)
+        while True:
+            for event in tracker.poll():
+                yield event
+            time.sleep(interval)
+
+    def _iter_shard(self, params, sort_key, sort_dir):
+        query = utils.common_filters(sort_key=sort_key, sort_dir=sort_dir)
+        query.extend(utils.filter_query(params, params))
+        url = self._path()
+        if query:
+            url += '?' + '&'.join(query)
+        for obj in self._iter_pagination(url, self.collection_key):
+            yield obj
+
+    def scan(self, shards, sort_key=None, sort_dir='asc', ordered=False):
+        """List a whole collection over concurrent pagination chains.
+
+        The collection is split into shards by query filters, each listed
+        by its own chain of page requests in its own thread, and the
+        objects of all shards are yielded as they arrive.
+
+        :param shards: list of `dict` of filters of `filter_params`
+            partitioning the collection, e.g. one per parent object:
+            ``[{'httpapi_id': id} for id in httpapi_ids]``. Objects
+            matching none of them are not listed, and those matching
+            several are listed as many times.
+        :param sort_key: attribute the API sorts every shard on.
+        :param sort_dir: 'asc' or 'desc'.
+        :param ordered: merge the shards so that the objects come out
+            sorted on `sort_key`, at the cost of waiting for the slowest
+            shard.
+        :returns: generator of objects.
+        :raises ValueError: if a shard filters on something else than
+            `filter_params`.
+        """
+        if ordered and not sort_key:
+            raise ValueError("An ordered scan needs a sort_key")
+        shards = list(shards)
+        for params in shards:
+            unsupported = set(params) - set(self.filter_params)
+            if unsupported:
+                raise ValueError("Cannot filter %s on %s" %
+                                 (self.collection_key,
+                                  ', '.join(sorted(unsupported))))
+        if hasattr(self.api, 'set_pool_size'):
+            self.api.set_pool_size(len(shards))
+
+        streams = [self._iter_shard(params, sort_key, sort_dir)
+                   for params in shards]
+        key = None
+        if ordered:
+            key = operator.attrgetter(sort_key)
+        return concurrency.merge_streams(streams, key=key,
+                                         reverse=(sort_dir == 'desc'))
+
+    def _iter_find(self, **kwargs):
+        filters = utils.filter_query(self.filter_params, kwargs)
+        url = self._path()
+        if filters:
+            url += '?' + '&'.join(filters)
+
+        # NOTE: the server side filters are only a hint, so every object
+        # is still checked against all of the requested attributes.
+        for obj in self._iter_pagination(url, self.collection_key):
+            try:
+                if all(getattr(obj, attr) == value
+                       for (attr, value) in kwargs.items()):
+                    yield obj
+            except AttributeError:
+                continue
+
+    def find(self, **kwargs):
+        """Find a single item with attributes matching ``**kwargs``.
+
+        Listing stops as soon as a second match shows up, which is enough
+        to tell that the match is not unique.
+        """
+        matches = list(itertools.islice(self._iter_find(**kwargs), 2))
+        if not matches:
+            msg = _("No %(name)s matching %(args)s.") % {
+                'name': self.resource_class.__name__,
+                'args': kwargs
+            }
+            raise exceptions.NotFound(msg)
+        elif len(matches) > 1:
+            raise exceptions.NoUniqueMatch()
+        return matches[0]
+
+    def findall(self, **kwargs):
+        """Find all items with attributes matching ``**kwargs``."""
+        return list(self._iter_find(**kwargs))
+
+    def iter_findall(self, **kwargs):
+        """Same as :meth:`findall`, yielding the items page by page."""
+        return self._iter_find(**kwargs)
 
 
 class Resource(base.Resource):
@@ -127,5 +473,8 @@ class Resource(base.Resource):
     This is pretty much just a bag for attributes.
     """
 
+    # ETag of the response the object came from, if any.
+    _etag = None
+
     def to_dict(self):
-        return copy.deepcopy(self._info)
+        return _copy_info(self._info)
@@ -0,0 +1,346 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Load generator driving a mix of operations against a collection.
+"""
+
+import bisect
+import collections
+import logging
+import math
+import os
+import random
+import threading
+import time
+
+from concurrent import futures
+from oslo_utils import importutils
+import six
+
+LOG = logging.getLogger(__name__)
+
+hdrh = importutils.try_import('hdrh.histogram')
+
+OPERATIONS = ('list', 'get', 'create', 'update', 'delete')
+MODES = ('closed', 'open')
+PERCENTILES = (50, 90, 99, 99.9)
+
+# Latencies are recorded in microseconds, up to an hour.
+_HIGHEST_LATENCY = 3600 * 10 ** 6
+
+
+class Histogram(object):
+    """Latency histogram, thread safe.
+
+    Uses an HDR histogram from the hdrh package when it is installed, and
+    otherwise keeps every sample, which is exact but grows with the run;
+    the samples are then sorted when a percentile is asked for, not as
+    they are recorded.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        if hdrh is not None:
+            self._hdr = hdrh.HdrHistogram(1, _HIGHEST_LATENCY, 3)
+        else:
+            self._hdr = None
+            self._samples = []
+            self._sorted = True
+        self.count = 0
+        self.total = 0
+
+    def record(self, seconds):
+        value = max(1, min(_HIGHEST_LATENCY, int(seconds * 10 ** 6)))
+        with self._lock:
+            self.count += 1
+            self.total += value
+            if self._hdr is not None:
+                self._hdr.record_value(value)
+            else:
+                self._samples.append(value)
+                self._sorted = False
+
+    def percentile(self, percent):
+        """Return the given percentile, in microseconds."""
+        with self._lock:
+            if not self.count:
+                return 0
+            if self._hdr is not None:
+                return self._hdr.get_value_at_percentile(percent)
+            if not self._sorted:
+                self._samples.sort()
+                self._sorted = True
+            rank = int(math.ceil(percent * self.count / 100.0)) - 1
+            return self._samples[max(0, min(self.count - 1, rank))]
+
+    def merge(self, other):
+        """Add the samples of another histogram to this one."""
+        with self._lock:
+            self.count += other.count
+            self.total += other.total
+            if self._hdr is not None:
+                self._hdr.add(other._hdr)
+            else:
+                self._samples.extend(other._samples)
+                self._sorted = False
+
+    def summary(self):
+        """Return the percentiles, mean and max, in milliseconds."""
+        result = dict(('p%s' % p, self.percentile(p) / 1000.0)
+                      for p in PERCENTILES + (100,))
+        result['max'] = result.pop('p100')
+        result['mean'] = (float(self.total) / self.count / 1000.0
+                          if self.count else 0.0)
+        result['count'] = self.count
+        return result
+
+
+def _status(exc):
+    """Key of an error in the report: its HTTP status, or its class."""
+    status = getattr(exc, 'http_status', None)
+    if status:
+        return str(status)
+    return type(exc).__name__
+
+
+def _render(template, serial):
+    """Copy a JSON template, replacing '{n}' in strings by `serial`."""
+    if isinstance(template, dict):
+        return dict((k, _render(v, serial)) for (k, v) in template.items())
+    elif isinstance(template, list):
+        return [_render(v, serial) for v in template]
+    elif isinstance(template, six.string_types):
+        return template.replace('{n}', str(serial))
+    return template
+
+
+def _cpu_time():
+    times = os.times()
+    return times[0] + times[1]
+
+
+class Bench(object):
+    """Runs a weighted mix of operations against a manager and measures it.
+
+    get and update pick one of the objects known to the run, those of the
+    first listing and those created since; delete only removes objects
+    the run created itself, and is skipped while there are none.
+
+    :param manager: the :class:`oasisclient.common.base.Manager` of the
+        collection; only its public methods are used, so that the run
+        measures what the client's callers get.
+    :param mix: `dict` of the weight of each of :data:`OPERATIONS`.
+    :param template: body of the created objects, as a `dict`; '{n}' in
+        its strings is replaced by a serial number, to keep names unique.
+    :param changes: fields set by update, rendered like `template`.
+    :param seed: seed of the choice of operations and objects.
+    """
+
+    def __init__(self, manager, mix, template=None, changes=None, seed=None):
+        unknown = set(mix) - set(OPERATIONS)
+        if unknown:
+            raise ValueError("Unknown operations: %s" %
+                             ', '.join(sorted(unknown)))
+        if ('create' in mix or 'update' in mix) and template is None:
+            raise ValueError("create and update need an object template")
+        self.manager = manager
+        self.template = template
+        self.changes = changes if changes is not None else template
+        self._ops = [op for op in OPERATIONS if mix.get(op, 0) > 0]
+        if not self._ops:
+            raise ValueError("The operation mix is empty")
+        self._cumulative = []
+        total = 0
+        for op in self._ops:
+            total += mix[op]
+            self._cumulative.append(total)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._serial = 0
+        self._known = []
+        self._created = []
+        self.histograms = dict((op, Histogram()) for op in self._ops)
+        self.errors = dict((op, collections.Counter()) for op in self._ops)
+        self.skipped = collections.Counter()
+
+    def _choose(self):
+        with self._lock:
+            point = self._random.random() * self._cumulative[-1]
+            op = self._ops[bisect.bisect_right(self._cumulative, point)]
+            target = None
+            if op in ('get', 'update') and self._known:
+                target = self._random.choice(self._known)
+            elif op == 'delete' and self._created:
+                target = self._created.pop(
+                    self._random.randrange(len(self._created)))
+                self._known.remove(target)
+            self._serial += 1
+            return op, target, self._serial
+
+    def _call(self, op, target, serial):
+        manager = self.manager
+        if op == 'list':
+            for _obj in manager.iter_findall():
+                pass
+        elif op == 'get':
+            manager.get(target)
+        elif op == 'create':
+            obj = manager.create(**_render(self.template, serial))
+            obj_id = getattr(obj, 'id', None)
+            if obj_id is not None:
+                with self._lock:
+                    self._known.append(obj_id)
+                    self._created.append(obj_id)
+        elif op == 'update':
+            manager.update_fields(target, _render(self.changes, serial))
+        elif op == 'delete':
+            manager.delete(target)
+
+    def step(self, scheduled=None):
+        """Run one operation of the mix and record how it went.
+
+        :param scheduled: time the operation was due, in the open loop;
+            its latency is counted from then, so that a server falling
+            behind shows in the latencies rather than lowering the rate.
+        :returns: False if the operation had nothing to act on.
+        """
+        op, target, serial = self._choose()
+        if target is None and op in ('get', 'update', 'delete'):
+            self.skipped[op] += 1
+            return False
+        started = time.time() if scheduled is None else scheduled
+        try:
+            self._call(op, target, serial)
+        except Exception as e:
+            LOG.debug('%s %s failed: %s', op, target, e)
+            with self._lock:
+                self.errors[op][_status(e)] += 1
+            return True
+        self.histograms[op].record(time.time() - started)
+        return True
+
+    def _prepare(self):
+        self._known = [obj.id for obj in self.manager.iter_findall()]
+
+    def run(self, mode='closed', workers=8, rate=None, duration=10.0,
+            requests=None, warmup=0.0):
+        """Run the benchmark and return its report.
+
+        :param mode: 'closed' for `workers` loops each issuing a request
+            as soon as the previous one is done, 'open' for requests
+            arriving at a fixed `rate` whatever the latency, with up to
+            `workers` in flight.
+        :param workers: number of concurrent requests.
+        :param rate: requests per second of the open loop.
+        :param duration: seconds to run for, None for no limit.
+        :param requests: number of requests to send, None for no limit.
+        :param warmup: seconds run before measuring.
+        :returns: the report, see :meth:`report`.
+        """
+        if mode not in MODES:
+            raise ValueError("Unknown mode '%s'" % mode)
+        if mode == 'open' and not rate:
+            raise ValueError("The open loop needs a rate")
+        if duration is None and requests is None:
+            raise ValueError("Give a duration or a number of requests")
+        if hasattr(self.manager.api, 'set_pool_size'):
+            self.manager.api.set_pool_size(workers)
+        self._prepare()
+
+        if warmup:
+            self._run(mode, workers, rate, warmup, None)
+            self.histograms = dict((op, Histogram()) for op in self._ops)
+            self.errors = dict((op, collections.Counter())
+                               for op in self._ops)
+            self.skipped = collections.Counter()
+
+        cpu = _cpu_time()
+        started = time.time()
+        self._run(mode, workers, rate, duration, requests)
+        elapsed = time.time() - started
+        return self.report(elapsed, _cpu_time() - cpu, mode, workers, rate)
+
+    def _run(self, mode, workers, rate, duration, requests):
+        deadline = time.time() + duration if duration is not None else None
+        budget = [requests]
+        budget_lock = threading.Lock()
+
+        def take():
+            if deadline is not None and time.time() >= deadline:
+                return False
+            with budget_lock:
+                if budget[0] is None:
+                    return True
+                if budget[0] <= 0:
+                    return False
+                budget[0] -= 1
+                return True
+
+        if mode == 'closed':
+            def loop():
+                while take():
+                    self.step()
+            threads = [threading.Thread(target=loop) for _i in
+                       range(workers)]
+            for thread in threads:
+                thread.daemon = True
+                thread.start()
+            for thread in threads:
+                thread.join()
+            return
+
+        interval = 1.0 / rate
+        with futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            due = time.time()
+            while take():
+                delay = due - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self.step, due)
+                due += interval
+
+    def report(self, elapsed, cpu, mode, workers, rate):
+        """Summarize the run.
+
+        :returns: a JSON serializable `dict` with the throughput, the
+            latency percentiles in milliseconds per operation and overall,
+            the errors per operation and status, and the client CPU time
+            per request in milliseconds.
+        """
+        overall = Histogram()
+        operations = {}
+        done = 0
+        failed = 0
+        for op in self._ops:
+            histogram = self.histograms[op]
+            errors = dict(self.errors[op])
+            summary = histogram.summary()
+            summary['errors'] = errors
+            summary['skipped'] = self.skipped[op]
+            operations[op] = summary
+            done += histogram.count
+            failed += sum(errors.values())
+            overall.merge(histogram)
+        sent = done + failed
+        return {
+            'mode': mode,
+            'workers': workers,
+            'rate': rate,
+            'duration': elapsed,
+            'requests': sent,
+            'errors': failed,
+            'throughput': sent / elapsed if elapsed else 0.0,
+            'latency': overall.summary(),
+            'operations': operations,
+            'cpu_per_request': cpu / sent * 1000.0 if sent else 0.0,
+        }
@@ -18,8 +18,11 @@
 
 from __future__ import print_function
 
+import csv
 import getpass
 import inspect
+import itertools
+import json
 import os
 import sys
 import textwrap
@@ -30,8 +33,12 @@ import prettytable
 import six
 from six import moves
 
+from oasisclient.common import concurrency
 from oasisclient.i18n import _
 
+# Formats of print_list(); all but 'table' print rows as they come.
+OUTPUT_FORMATS = ('table', 'stream-table', 'json-lines', 'csv', 'value')
+
 
 class MissingArgs(Exception):
     """Supplied arguments are not sufficient for calling a function."""
@@ -139,7 +146,8 @@ def isunauthenticated(func):
 
 
 def print_list(objs, fields, formatters=None, sortby_index=0,
-               mixed_case_fields=None, field_labels=None):
+               mixed_case_fields=None, field_labels=None,
+               output_format='table'):
     """Print a list or objects as a table, one row per object.
 
     :param objs: iterable of :class:`Resource`
@@ -150,6 +158,8 @@ def print_list(objs, fields, formatters=None, sortby_index=0,
         have mixed case names (e.g., 'serverId')
     :param field_labels: Labels to use in the heading of the table, default to
         fields.
+    :param output_format: one of :data:`OUTPUT_FORMATS`; the formats other
+        than 'table' are printed by :func:`print_stream`, unsorted.
     """
     formatters = formatters or {}
     mixed_case_fields = mixed_case_fields or []
@@ -159,6 +169,12 @@ def print_list(objs, fields, formatters=None, sortby_index=0,
                            "of elements than fields list %(fields)s"),
                          {'labels': field_labels, 'fields': fields})
 
+    if output_format != 'table':
+        return print_stream(objs, fields, output_format,
+                            formatters=formatters,
+                            mixed_case_fields=mixed_case_fields,
+                            field_labels=field_labels)
+
     if sortby_index is None:
         kwargs = {}
     else:
@@ -167,18 +183,7 @@ def print_list(objs, fields, formatters=None, sortby_index=0,
     pt.align = 'l'
 
     for o in objs:
-        row = []
-        for field in fields:
-            if field in formatters:
-                row.append(formatters[field](o))
-            else:
-                if field in mixed_case_fields:
-                    field_name = field.replace(' ', '_')
-                else:
-                    field_name = field.lower().replace(' ', '_')
-                data = getattr(o, field_name, '')
-                row.append(data)
-        pt.add_row(row)
+        pt.add_row(_get_row(o, fields, formatters, mixed_case_fields))
 
     if six.PY3:
         print(encodeutils.safe_encode(pt.get_string(**kwargs)).decode())
@@ -186,6 +191,119 @@ def print_list(objs, fields, formatters=None, sortby_index=0,
         print(encodeutils.safe_encode(pt.get_string(**kwargs)))
 
 
+def _get_row(o, fields, formatters, mixed_case_fields):
+    row = []
+    for field in fields:
+        if field in formatters:
+            row.append(formatters[field](o))
+        else:
+            if field in mixed_case_fields:
+                field_name = field.replace(' ', '_')
+            else:
+                field_name = field.lower().replace(' ', '_')
+            data = getattr(o, field_name, '')
+            row.append(data)
+    return row
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, sort_keys=True)
+    return encodeutils.safe_decode(value) if isinstance(
+        value, six.binary_type) else six.text_type(value)
+
+
+class _LineWriter(object):
+    """Writes lines to a stream, flushing each so that they show at once."""
+
+    def __init__(self, out):
+        self.out = out
+
+    def write(self, text):
+        if six.PY2:
+            text = encodeutils.safe_encode(text)
+        self.out.write(text)
+
+    def line(self, text):
+        self.write(text + '\n')
+        self.out.flush()
+
+
+def _truncate(text, width):
+    if len(text) <= width:
+        return text.ljust(width)
+    return text[:max(0, width - 3)] + '...'[:width]
+
+
+def print_stream(objs, fields, output_format='stream-table', formatters=None,
+                 mixed_case_fields=None, field_labels=None, widths=None,
+                 max_width=40, sample_size=20, out=None):
+    """Print objects one row at a time, as the iterable yields them.
+
+    Unlike :func:`print_list`, nothing is kept nor sorted, so rows of a
+    paginated listing show up as the pages arrive.
+
+    :param objs: iterable of :class:`Resource`, e.g. a generator.
+    :param fields: attributes that correspond to columns, in order.
+    :param output_format: 'stream-table', 'json-lines', 'csv' or 'value'.
+    :param formatters: `dict` of callables for field formatting.
+    :param mixed_case_fields: see :func:`print_list`.
+    :param field_labels: labels of the columns, default to fields.
+    :param widths: column widths of 'stream-table', as a list; by default
+        they fit the first `sample_size` rows, up to `max_width`. Longer
+        values are truncated.
+    :param out: stream to print to, default to stdout.
+    """
+    formatters = formatters or {}
+    mixed_case_fields = mixed_case_fields or []
+    field_labels = field_labels or fields
+    writer = _LineWriter(out or sys.stdout)
+    rows = (_get_row(o, fields, formatters, mixed_case_fields)
+            for o in objs)
+
+    if output_format == 'json-lines':
+        keys = [field.lower().replace(' ', '_') for field in field_labels]
+        for row in rows:
+            writer.line(json.dumps(dict(zip(keys, row)), sort_keys=True,
+                                   default=six.text_type))
+    elif output_format == 'csv':
+        # csv wants str on both versions: bytes on py2, text on py3.
+        csv_out = csv.writer(writer, lineterminator='\n')
+        for row in itertools.chain([field_labels], rows):
+            csv_out.writerow([encodeutils.safe_encode(_text(value))
+                              if six.PY2 else _text(value)
+                              for value in row])
+            writer.out.flush()
+    elif output_format == 'value':
+        for row in rows:
+            writer.line(' '.join(_text(value) for value in row))
+    elif output_format == 'stream-table':
+        sample = []
+        if widths is None:
+            sample = list(itertools.islice(rows, sample_size))
+            widths = [min(max_width, max([len(_text(label))] +
+                                         [len(_text(row[i]))
+                                          for row in sample]))
+                      for (i, label) in enumerate(field_labels)]
+        border = '+' + '+'.join('-' * (width + 2) for width in widths) + '+'
+
+        def table_row(values):
+            return '| ' + ' | '.join(_truncate(_text(value), width)
+                                     for (value, width)
+                                     in zip(values, widths)) + ' |'
+
+        writer.line(border)
+        writer.line(table_row(field_labels))
+        writer.line(border)
+        for row in itertools.chain(sample, rows):
+            writer.line(table_row(row))
+        writer.line(border)
+    else:
+        raise ValueError(_("Unknown output format %s") % output_format)
+
+
 def keys_and_vals_to_strs(dictionary):
     """Recursively convert a dictionary's keys and values to strings.
 
@@ -283,6 +401,43 @@ def pretty_choice_list(l):
     return ', '.join("'%s'" % i for i in l)
 
 
+def run_for_each(action, targets, parallel=1, success=None, failure=None):
+    """Run `action` on every target, `parallel` at a time.
+
+    Failures do not stop the other targets. A line is printed as each
+    target is done, and a summary at the end when there are several.
+
+    :param action: callable taking a target.
+    :param targets: the targets, e.g. IDs or names given on the command
+        line.
+    :param parallel: maximum number of actions running at once.
+    :param success: message printed for a target done, with a %(target)s
+        placeholder.
+    :param failure: message printed for a target that failed, with
+        %(target)s and %(e)s placeholders.
+    :returns: list of the targets that failed.
+    """
+    targets = list(targets)
+    failed = []
+    done = 0
+    for target, _result, e in concurrency.run_concurrently(
+            action, targets, max(1, parallel)):
+        done += 1
+        if e is None:
+            if success:
+                print(success % {'target': target})
+        else:
+            failed.append(target)
+            if failure:
+                print(failure % {'target': target, 'e': e})
+        sys.stdout.flush()
+    if len(targets) > 1:
+        print(_("%(done)d of %(total)d done, %(failed)d failed.") %
+              {'done': done - len(failed), 'total': len(targets),
+               'failed': len(failed)}, file=sys.stderr)
+    return failed
+
+
 def exit(msg=''):
     if msg:
         print (msg, file=sys.stderr)
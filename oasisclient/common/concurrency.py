@@ -0,0 +1,224 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Helpers to run API calls concurrently over a shared client.
+"""
+
+import heapq
+import threading
+
+from concurrent import futures
+from six.moves import queue
+
+DEFAULT_WORKERS = 8
+
+# Marks the end of a stream in merge_streams() queues.
+_END = object()
+
+
+def run_concurrently(func, items, max_workers=DEFAULT_WORKERS):
+    """Call `func` on every item, with at most `max_workers` calls at once.
+
+    Items are consumed lazily, so `items` may be a generator.
+
+    :param func: callable taking a single item.
+    :param items: iterable of items.
+    :param max_workers: maximum number of concurrent calls.
+    :returns: generator of ``(item, result, exception)`` tuples, in
+        completion order; `exception` is None if the call succeeded.
+    """
+    max_workers = max(1, int(max_workers))
+    items = iter(items)
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+
+        def submit():
+            for item in items:
+                pending[executor.submit(func, item)] = item
+                if len(pending) >= max_workers:
+                    break
+
+        submit()
+        while pending:
+            done, _ = futures.wait(pending,
+                                   return_when=futures.FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                exc = future.exception()
+                if exc is None:
+                    yield item, future.result(), None
+                else:
+                    yield item, None, exc
+            submit()
+
+
+class DependencyFailed(Exception):
+    """A task was not run because a task it depends on failed."""
+
+    def __init__(self, task, dependency):
+        self.task = task
+        self.dependency = dependency
+        super(DependencyFailed, self).__init__(
+            "%s skipped, %s failed" % (task, dependency))
+
+
+def run_graph(func, dependencies, max_workers=DEFAULT_WORKERS):
+    """Call `func` on every task of a dependency graph, in parallel.
+
+    A task starts as soon as all the tasks it depends on are done, with at
+    most `max_workers` tasks running at once. When a task fails, the tasks
+    depending on it, directly or not, are not run.
+
+    :param func: callable taking a single task.
+    :param dependencies: `dict` mapping every task to the tasks it depends
+        on; the graph must not have cycles.
+    :param max_workers: maximum number of concurrent calls.
+    :returns: generator of ``(task, result, exception)`` tuples, in
+        completion order; skipped tasks come with a
+        :class:`DependencyFailed` exception.
+    """
+    waiting = dict((task, set(deps)) for (task, deps) in dependencies.items())
+    dependents = dict((task, []) for task in dependencies)
+    for task, deps in dependencies.items():
+        for dep in deps:
+            dependents[dep].append(task)
+
+    ready = [task for task, deps in waiting.items() if not deps]
+    skipped = set()
+    max_workers = max(1, int(max_workers))
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running = {}
+        while ready or running:
+            while ready and len(running) < max_workers:
+                task = ready.pop(0)
+                running[executor.submit(func, task)] = task
+
+            done, _ = futures.wait(running,
+                                   return_when=futures.FIRST_COMPLETED)
+            for future in done:
+                task = running.pop(future)
+                exc = future.exception()
+                if exc is None:
+                    yield task, future.result(), None
+                    for dependent in dependents[task]:
+                        waiting[dependent].discard(task)
+                        if not waiting[dependent] and dependent not in skipped:
+                            ready.append(dependent)
+                    continue
+
+                yield task, None, exc
+                stack = list(dependents[task])
+                while stack:
+                    dependent = stack.pop()
+                    if dependent not in skipped:
+                        skipped.add(dependent)
+                        stack.extend(dependents[dependent])
+                        yield dependent, None, DependencyFailed(dependent,
+                                                                task)
+
+
+class _Descending(object):
+    """Sort key wrapper reversing the order of the wrapped values."""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def _put(q, entry, stop):
+    while not stop.is_set():
+        try:
+            q.put(entry, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _pump(stream, q, stop):
+    try:
+        for item in stream:
+            if not _put(q, (None, item), stop):
+                return
+    except Exception as e:
+        _put(q, (e, None), stop)
+    else:
+        _put(q, (None, _END), stop)
+
+
+def _drain(q, streams):
+    ended = 0
+    while ended < streams:
+        exc, item = q.get()
+        if exc is not None:
+            raise exc
+        if item is _END:
+            ended += 1
+            continue
+        yield item
+
+
+def merge_streams(streams, key=None, reverse=False, buffer_size=1000):
+    """Consume iterables in parallel, and yield their items as one stream.
+
+    Every iterable is consumed by its own thread, which stays at most
+    `buffer_size` items ahead of the caller. Items are yielded as they
+    come, or, with a `key`, merged so that the output is sorted as long
+    as every iterable is. The first exception raised by an iterable is
+    raised to the caller. The threads stop when the caller stops
+    iterating.
+
+    :param streams: iterables, e.g. generators doing blocking calls.
+    :param key: callable returning the sort key of an item, to merge the
+        streams in order.
+    :param reverse: whether the streams are sorted in descending order.
+    :param buffer_size: maximum number of items read ahead per iterable.
+    """
+    streams = list(streams)
+    stop = threading.Event()
+    if key is None:
+        shared = queue.Queue(buffer_size * max(1, len(streams)))
+        queues = [shared] * len(streams)
+    else:
+        queues = [queue.Queue(buffer_size) for _ in streams]
+
+    for stream, q in zip(streams, queues):
+        thread = threading.Thread(target=_pump, args=(stream, q, stop))
+        thread.daemon = True
+        thread.start()
+
+    try:
+        if key is None:
+            for item in _drain(shared, len(streams)):
+                yield item
+            return
+
+        wrap = _Descending if reverse else (lambda value: value)
+
+        def decorate(i, q):
+            # Ties are broken by stream and position, never by the items.
+            for (n, item) in enumerate(_drain(q, 1)):
+                yield wrap(key(item)), i, n, item
+
+        for entry in heapq.merge(*[decorate(i, q)
+                                   for (i, q) in enumerate(queues)]):
+            yield entry[-1]
+    finally:
+        stop.set()
@@ -0,0 +1,310 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Streaming export of whole collections to files.
+"""
+
+import csv
+import gzip
+import json
+import logging
+import os
+import sys
+
+from oslo_utils import importutils
+import six
+
+from oasisclient.common import utils
+
+LOG = logging.getLogger(__name__)
+
+pyarrow = importutils.try_import('pyarrow')
+parquet = importutils.try_import('pyarrow.parquet')
+zstandard = importutils.try_import('zstandard')
+
+FORMATS = ('ndjson', 'csv', 'parquet')
+COMPRESSIONS = ('gzip', 'zstd')
+
+# Objects written between two checkpoints.
+CHECKPOINT_EVERY = 1000
+# Rows per Parquet row group.
+ROW_GROUP_SIZE = 10000
+
+
+def _cell(value):
+    """Flatten a value for a CSV or Parquet cell."""
+    if value is None or isinstance(value, six.string_types):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, sort_keys=True)
+    return six.text_type(value)
+
+
+class _TextStream(object):
+    """Encodes text written to a binary stream."""
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def write(self, data):
+        if isinstance(data, six.text_type):
+            data = data.encode('utf-8')
+        self.raw.write(data)
+
+
+class _NdjsonWriter(object):
+
+    def __init__(self, raw, fields, append):
+        self.stream = _TextStream(raw)
+        self.fields = fields
+
+    def write(self, info):
+        if self.fields:
+            info = dict((field, info.get(field)) for field in self.fields)
+        self.stream.write(json.dumps(info, sort_keys=True) + '\n')
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _CsvWriter(object):
+
+    def __init__(self, raw, fields, append):
+        self.writer = csv.writer(_TextStream(raw), lineterminator='\n')
+        self.fields = fields
+        self.header = not append
+
+    def _row(self, values):
+        values = [_cell(value) for value in values]
+        if six.PY2:
+            values = [value.encode('utf-8')
+                      if isinstance(value, six.text_type) else value
+                      for value in values]
+        self.writer.writerow(values)
+
+    def write(self, info):
+        if self.fields is None:
+            self.fields = sorted(info)
+        if self.header:
+            self._row(self.fields)
+            self.header = False
+        self._row([info.get(field) for field in self.fields])
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _ParquetWriter(object):
+    """Writes rows in row groups of `row_group_size`.
+
+    Every value is stored as a string, nested ones JSON-encoded, so that
+    the schema does not depend on what the first rows happen to hold.
+    """
+
+    def __init__(self, raw, fields, compression, row_group_size):
+        self.raw = raw
+        self.fields = fields
+        self.compression = compression or 'none'
+        self.row_group_size = row_group_size
+        self.rows = []
+        self.writer = None
+
+    def write(self, info):
+        if self.fields is None:
+            self.fields = sorted(info)
+        self.rows.append([_cell(info.get(field)) for field in self.fields])
+        if len(self.rows) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        if self.writer is None:
+            schema = pyarrow.schema([(field, pyarrow.string())
+                                     for field in self.fields])
+            self.writer = parquet.ParquetWriter(
+                self.raw, schema, compression=self.compression)
+        columns = [pyarrow.array(column, type=pyarrow.string())
+                   for column in zip(*self.rows)]
+        self.writer.write_table(pyarrow.Table.from_arrays(
+            columns, names=list(self.fields)))
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+
+
+class _Output(object):
+    """Binary output of an export, to a file or stdout, maybe compressed.
+
+    Compressed output is written as a gzip member or zstd frame per
+    checkpoint, which decompress as one, so that the output up to a
+    checkpoint is complete by itself; a resumed export truncates the file
+    there, dropping what was written after it.
+
+    :param append: write after what the file holds, rather than over it.
+    :param offset: with `append`, size the file is first truncated to.
+    """
+
+    def __init__(self, path, compression, append=False, offset=None):
+        self.owned = path not in (None, '-')
+        if not self.owned:
+            self.file = getattr(sys.stdout, 'buffer', sys.stdout)
+        elif append and offset is not None:
+            self.file = open(path, 'r+b')
+            self.file.truncate(offset)
+            self.file.seek(offset)
+        else:
+            self.file = open(path, 'ab' if append else 'wb')
+        self.compression = compression
+        self.stream = None
+
+    def write(self, data):
+        if self.stream is None:
+            if self.compression == 'gzip':
+                self.stream = gzip.GzipFile(fileobj=self.file, mode='wb')
+            elif self.compression == 'zstd':
+                self.stream = zstandard.ZstdCompressor().stream_writer(
+                    self.file, closefd=False)
+            else:
+                self.stream = self.file
+        self.stream.write(data)
+
+    def _end_member(self):
+        if self.stream is not None and self.stream is not self.file:
+            self.stream.close()
+        self.stream = None
+
+    def checkpoint(self):
+        """Complete what was written; return its size, None for stdout."""
+        self._end_member()
+        self.file.flush()
+        return self.file.tell() if self.owned else None
+
+    def close(self):
+        self._end_member()
+        if self.owned:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+def _load_checkpoint(checkpoint):
+    try:
+        with open(checkpoint) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def export(manager, path=None, fmt='ndjson', compression=None, fields=None,
+           sort_key=None, marker=None, checkpoint=None,
+           row_group_size=ROW_GROUP_SIZE):
+    """Stream a whole collection to a file, page by page.
+
+    Only a page of objects, or a Parquet row group, is held in memory at
+    a time. With a `checkpoint` file, the ID of the last object written
+    is saved every :data:`CHECKPOINT_EVERY` objects and when the export
+    fails, along with the size of the output at that point; a later
+    export with the same checkpoint truncates the output to that size and
+    appends to it from there, and the file is removed once the export is
+    complete.
+
+    :param manager: the :class:`oasisclient.common.base.Manager` of the
+        collection.
+    :param path: output file, or None or '-' for stdout.
+    :param fmt: one of :data:`FORMATS`.
+    :param compression: None, or one of :data:`COMPRESSIONS`; Parquet
+        files are compressed internally instead.
+    :param fields: attributes to export; for CSV and Parquet, defaults to
+        those of the first object.
+    :param sort_key: attribute the listing is sorted on, which must stay
+        the same between an export and its resumption.
+    :param marker: ID of the object to start after.
+    :param checkpoint: path of the checkpoint file; not available for
+        Parquet.
+    :param row_group_size: rows per Parquet row group.
+    :returns: number of objects exported, resumed ones included.
+    """
+    if fmt not in FORMATS:
+        raise ValueError("Unknown format '%s'" % fmt)
+    if compression not in (None,) + COMPRESSIONS:
+        raise ValueError("Unknown compression '%s'" % compression)
+    if fmt == 'parquet' and parquet is None:
+        raise ValueError("The parquet format needs pyarrow")
+    if compression == 'zstd' and zstandard is None and fmt != 'parquet':
+        raise ValueError("zstd compression needs zstandard")
+    if fmt == 'parquet' and checkpoint:
+        # A Parquet file is only valid once closed, and cannot be appended.
+        raise ValueError("Parquet exports cannot be checkpointed")
+
+    count = 0
+    offset = None
+    state = _load_checkpoint(checkpoint) if checkpoint else None
+    if state:
+        marker = state['marker']
+        count = state['count']
+        offset = state.get('offset')
+        fields = fields or state.get('fields')
+        LOG.debug('Resuming export after %s', marker)
+    append = bool(state)
+
+    filters = utils.common_filters(marker=marker, sort_key=sort_key)
+    url = manager._path()
+    if filters:
+        url += '?' + '&'.join(filters)
+
+    if fmt == 'parquet':
+        output = _Output(path, None)
+        writer = _ParquetWriter(output.file, fields, compression,
+                                row_group_size)
+    else:
+        output = _Output(path, compression, append, offset)
+        writer_class = _CsvWriter if fmt == 'csv' else _NdjsonWriter
+        writer = writer_class(output, fields, append)
+
+    def save(last_id):
+        writer.flush()
+        state = {'marker': last_id, 'count': count, 'fields': writer.fields,
+                 'offset': output.checkpoint()}
+        utils.write_file_atomic(checkpoint, json.dumps(state))
+
+    last_id = None
+    try:
+        for obj in manager._iter_pagination(url, manager.collection_key):
+            # Written straight from the decoded response, never modified.
+            writer.write(obj._info)
+            count += 1
+            last_id = obj.id
+            if checkpoint and count % CHECKPOINT_EVERY == 0:
+                save(last_id)
+        writer.close()
+    except (Exception, KeyboardInterrupt):
+        if checkpoint and last_id is not None:
+            # Resume right after what made it to the output.
+            save(last_id)
+        raise
+    finally:
+        output.close()
+
+    if checkpoint and os.path.exists(checkpoint):
+        os.unlink(checkpoint)
+    return count
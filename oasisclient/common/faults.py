@@ -0,0 +1,335 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Injection of network and server faults into API requests.
+
+A :class:`Schedule` declares, per route, the faults to inject: latency
+drawn from a distribution, errors and bursts of them, connection resets
+before the request reaches the server or after it did, and a bandwidth
+cap on responses. Schedules are usually loaded from JSON::
+
+    {"seed": 42,
+     "rules": [
+        {"path": "/v1/functions*",
+         "latency": {"distribution": "lognormal", "median": 0.02,
+                     "sigma": 0.8, "max": 5}},
+        {"method": "GET", "probability": 0.01, "latency": 1.5},
+        {"errors": {"503": 0.005}, "burst": 20, "retry_after": 2},
+        {"method": "POST", "reset": 0.01, "drop": 0.01},
+        {"path": "/v1/functions/*", "bandwidth": 16384}]}
+
+Every rule matching a request applies to it: the latencies add up, and
+the first error or reset drawn wins.
+
+The same schedule drives :class:`FaultTransport`, which wraps the HTTP
+client of a :class:`~oasisclient.v1.client.Client` (see
+``Client.set_transport``), and
+:class:`~oasisclient.fakeserver.FakeOasisServer`, which injects the
+faults on its sockets.
+"""
+
+import fnmatch
+import json
+import math
+import random
+import threading
+import time
+
+from keystoneauth1 import exceptions as ksa_exc
+import six.moves.urllib.parse as urlparse
+
+from oasisclient.common import httpclient
+from oasisclient.common import replay
+from oasisclient.common import utils
+from oasisclient import exceptions
+
+# Latency distributions and their parameters, in seconds.
+DISTRIBUTIONS = {
+    'constant': ('value',),
+    'uniform': ('low', 'high'),
+    'normal': ('mean', 'stddev'),
+    'exponential': ('mean',),
+    'lognormal': ('median', 'sigma'),
+    'pareto': ('scale', 'alpha'),
+}
+
+_DRAWS = {
+    'constant': lambda rand, spec: spec['value'],
+    'uniform': lambda rand, spec: rand.uniform(spec['low'], spec['high']),
+    'normal': lambda rand, spec: rand.gauss(spec['mean'], spec['stddev']),
+    'exponential': lambda rand, spec: rand.expovariate(1.0 / spec['mean']),
+    'lognormal': lambda rand, spec: rand.lognormvariate(spec['mu'],
+                                                        spec['sigma']),
+    'pareto': lambda rand, spec: (spec['scale'] *
+                                  rand.paretovariate(spec['alpha'])),
+}
+
+
+def latency_sampler(spec):
+    """Return a function drawing latencies as `spec` describes.
+
+    :param spec: seconds, a ``[low, high]`` pair to draw uniformly from,
+        or a dict naming a distribution of :data:`DISTRIBUTIONS` with its
+        parameters, and optionally a 'max' the latencies are capped at.
+    :raises ValueError: if `spec` is not one of those.
+    """
+    if isinstance(spec, (int, float)):
+        spec = {'distribution': 'constant', 'value': spec}
+    elif isinstance(spec, (list, tuple)):
+        low, high = spec
+        spec = {'distribution': 'uniform', 'low': low, 'high': high}
+    elif not isinstance(spec, dict):
+        raise ValueError('Invalid latency: %r' % (spec,))
+
+    spec = dict(spec)
+    name = spec.pop('distribution', None)
+    cap = spec.pop('max', None)
+    if name not in DISTRIBUTIONS:
+        raise ValueError("Unknown latency distribution '%s'" % name)
+    if sorted(spec) != sorted(DISTRIBUTIONS[name]):
+        raise ValueError('The %s distribution takes %s' %
+                         (name, ', '.join(DISTRIBUTIONS[name])))
+
+    draw = _DRAWS[name]
+    if name == 'lognormal':
+        spec['mu'] = math.log(spec['median'])
+
+    def sampler(rand):
+        latency = max(0.0, draw(rand, spec))
+        return latency if cap is None else min(cap, latency)
+    return sampler
+
+
+class Rule(object):
+    """Faults injected into the requests of a route.
+
+    :param method: HTTP method the rule applies to, None for all.
+    :param path: shell-style pattern of the URL paths, without the query,
+        the rule applies to, e.g. '/v1/functions*'; None for all.
+    :param probability: fraction of the matching requests the rule
+        applies to.
+    :param latency: delay before the request is sent, see
+        :func:`latency_sampler`.
+    :param errors: `dict` of the probability of answering with each
+        status instead, e.g. ``{503: 0.01}``.
+    :param burst: number of requests in a row which get an error once
+        one is drawn.
+    :param retry_after: Retry-After header of the injected errors.
+    :param reset: probability of the connection being reset before the
+        request reaches the server.
+    :param drop: probability of the connection being reset after the
+        server handled the request, the response being lost.
+    :param bandwidth: bytes per second responses are capped at.
+    """
+
+    def __init__(self, method=None, path=None, probability=1.0, latency=0,
+                 errors=None, burst=1, retry_after=None, reset=0.0,
+                 drop=0.0, bandwidth=None):
+        self.method = method.upper() if method else None
+        self.path = path
+        self.probability = probability
+        self.latency = latency_sampler(latency)
+        self.errors = dict((int(status), probability)
+                           for status, probability in (errors or {}).items())
+        self.burst = burst
+        self.retry_after = retry_after
+        self.reset = reset
+        self.drop = drop
+        self.bandwidth = bandwidth
+        self._burst_status = None
+        self._burst_left = 0
+
+    def matches(self, method, path):
+        return ((self.method is None or self.method == method) and
+                (self.path is None or fnmatch.fnmatchcase(path, self.path)))
+
+    def _error(self, rand):
+        if self._burst_left:
+            self._burst_left -= 1
+            return self._burst_status
+        point = rand.random()
+        for status, probability in sorted(self.errors.items()):
+            if point < probability:
+                self._burst_status = status
+                self._burst_left = self.burst - 1
+                return status
+            point -= probability
+        return None
+
+    def apply(self, rand, fault):
+        """Add the faults drawn for a request to `fault`."""
+        if rand.random() >= self.probability:
+            return
+        fault.delay += self.latency(rand)
+        status = self._error(rand)
+        if status and not fault.status:
+            fault.status = status
+            fault.retry_after = self.retry_after
+        if self.reset and rand.random() < self.reset:
+            fault.reset = True
+        if self.drop and rand.random() < self.drop:
+            fault.drop = True
+        if self.bandwidth:
+            fault.bandwidth = min(fault.bandwidth or self.bandwidth,
+                                  self.bandwidth)
+
+
+class Fault(object):
+    """The faults drawn for one request."""
+
+    def __init__(self):
+        self.delay = 0.0
+        self.status = None
+        self.retry_after = None
+        self.reset = False
+        self.drop = False
+        self.bandwidth = None
+
+    def __nonzero__(self):
+        return bool(self.delay or self.status or self.reset or self.drop or
+                    self.bandwidth)
+
+    __bool__ = __nonzero__
+
+    def throttle(self, size):
+        """Sleep for as long as `size` bytes take at the bandwidth cap."""
+        if self.bandwidth and size:
+            time.sleep(float(size) / self.bandwidth)
+
+
+class Schedule(object):
+    """Rules of the faults to inject, and the random state drawing them.
+
+    :param rules: :class:`Rule` objects, or dicts of their arguments.
+    :param seed: seed of the draws, for runs which can be repeated.
+    """
+
+    def __init__(self, rules, seed=None):
+        self.rules = [rule if isinstance(rule, Rule) else Rule(**rule)
+                      for rule in rules]
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_dict(cls, spec):
+        """Make a schedule from its JSON form, see the module docstring.
+
+        A bare list of rules is accepted too.
+        """
+        if isinstance(spec, list):
+            spec = {'rules': spec}
+        try:
+            return cls(spec['rules'], seed=spec.get('seed'))
+        except (KeyError, TypeError) as e:
+            raise ValueError('Invalid fault schedule: %s' % e)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def draw(self, method, url):
+        """Return the :class:`Fault` of a request, None if it has none."""
+        path = urlparse.urlsplit(url).path
+        fault = Fault()
+        with self._lock:
+            for rule in self.rules:
+                if rule.matches(method, path):
+                    rule.apply(self._random, fault)
+        return fault or None
+
+
+class FaultTransport(object):
+    """Passes requests on to a client, injecting the faults of a schedule.
+
+    Injected errors are raised the way the wrapped client raises errors
+    of the server, and resets the way it raises connection errors, so
+    that callers see no difference with faults of a real network. As
+    with :class:`~.replay.RecordingTransport`, anything but json_request
+    and raw_request goes to the wrapped client untouched, and transports
+    can be stacked.
+
+    :param client: the HTTPClient or SessionClient doing the requests,
+        or another transport wrapping one.
+    :param schedule: the :class:`Schedule` of the faults.
+    """
+
+    def __init__(self, client, schedule):
+        self.__dict__['client'] = client
+        self.__dict__['schedule'] = schedule
+        self.__dict__['kind'] = getattr(client, 'kind', None) or (
+            'session' if isinstance(client, httpclient.SessionClient)
+            else 'http')
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.client, name, value)
+
+    def _reset(self, method, url):
+        if self.kind == 'session':
+            raise ksa_exc.ConnectFailure(
+                'Unable to establish connection to %s: '
+                'Connection reset by peer (injected)' % url)
+        raise exceptions.ConnectionRefused(
+            'Error communicating with %s [Errno 104] Connection reset by '
+            'peer (injected)' % getattr(self.client, 'endpoint', url))
+
+    def _error(self, fault, method, url):
+        headers = {'Content-Type': 'application/json'}
+        if fault.retry_after is not None:
+            headers['Retry-After'] = str(fault.retry_after)
+        resp = replay._Response(fault.status, headers, b'')
+        raise exceptions.from_response(resp, 'Injected error', None,
+                                       method, url)
+
+    def _send(self, method, url, request, size):
+        fault = self.schedule.draw(method, url)
+        if fault is None:
+            return request()
+        if fault.delay:
+            time.sleep(fault.delay)
+        if fault.reset:
+            self._reset(method, url)
+        if fault.status:
+            self._error(fault, method, url)
+        result = request()
+        if fault.drop:
+            self._reset(method, url)
+        fault.throttle(size(result))
+        return result
+
+    def json_request(self, method, url, **kwargs):
+        def size(result):
+            resp, body = result
+            length = utils.get_header(resp, 'Content-Length')
+            if length is not None:
+                return int(length)
+            return len(json.dumps(body)) if body else 0
+
+        return self._send(
+            method, url,
+            lambda: self.client.json_request(method, url, **kwargs), size)
+
+    def raw_request(self, method, url, **kwargs):
+        def size(result):
+            resp = result if self.kind == 'session' else result[0]
+            length = utils.get_header(resp, 'Content-Length')
+            if length is None and self.kind == 'session':
+                return len(resp.content)
+            return int(length or 0)
+
+        return self._send(
+            method, url,
+            lambda: self.client.raw_request(method, url, **kwargs), size)
@@ -15,12 +15,13 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import copy
 import json
 import logging
 import os
 import socket
 import ssl
+import threading
+import time
 
 from keystoneauth1 import adapter
 import six
@@ -32,10 +33,88 @@ from oasisclient.common.apiclient import exc
 LOG = logging.getLogger(__name__)
 USER_AGENT = 'python-oasisclient'
 CHUNKSIZE = 1024 * 64  # 64kB
+DEFAULT_POOL_SIZE = 10
+
+# Methods which can be sent twice without harm, should the server have
+# handled a request whose response was lost.
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS', 'TRACE')
+
+# Default headers, merged under the caller's ones into a new dict for
+# every request; neither these nor the caller's headers are modified.
+JSON_HEADERS = (('Content-Type', 'application/json'),
+                ('Accept', 'application/json'))
+RAW_HEADERS = (('Content-Type', 'application/octet-stream'),)
+SESSION_JSON_HEADERS = JSON_HEADERS + (
+    ('OpenStack-API-Version', 'container-infra latest'),)
 
 API_VERSION = '/v1'
 
 
+class _RequestTiming(object):
+    """Records the request made in its with statement into `timings`.
+
+    See :class:`oasisclient.common.timing.Timings`.
+    """
+
+    def __init__(self, timings, method, url):
+        self.timings = timings
+        self.method = method
+        self.url = url
+        self.received = None
+        self.status = None
+        self.size = None
+        self.decoding = False
+
+    def __enter__(self):
+        self.started = time.time()
+        return self
+
+    def response(self, status, size=None, decoding=False):
+        """Mark the response as read; what follows is decoding."""
+        self.received = time.time()
+        self.status = status
+        self.size = size
+        self.decoding = decoding
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = time.time()
+        if exc_value is not None and self.status is None:
+            self.status = getattr(exc_value, 'http_status', None)
+        received = self.received or end
+        self.timings.record_request(
+            self.method, self.url, self.status, received - self.started,
+            self.size, end - received if self.decoding else None)
+
+
+class _NotTimed(object):
+    """Stands for a :class:`_RequestTiming` when nothing is recorded."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    def response(self, status, size=None, decoding=False):
+        pass
+
+
+_NOT_TIMED = _NotTimed()
+
+
+def _timed(timings, method, url):
+    if timings is None:
+        return _NOT_TIMED
+    return _RequestTiming(timings, method, url)
+
+
+def _with_defaults(defaults, headers):
+    merged = dict(defaults)
+    if headers:
+        merged.update(headers)
+    return merged
+
+
 def _extract_error_json(body):
     """Return error_message from the HTTP response body."""
     error_json = {}
@@ -54,7 +133,8 @@ def _extract_error_json(body):
             error_json = {'faultstring': error_body['title'],
                           'debuginfo': error_body['detail']}
 
-    except ValueError:
+    except (ValueError, KeyError, IndexError, TypeError):
+        # Not JSON, or not one of the error formats above.
         return {}
 
     return error_json
@@ -62,11 +142,18 @@ def _extract_error_json(body):
 
 class HTTPClient(object):
 
+    # :class:`oasisclient.common.timing.Timings` the requests are recorded
+    # into, if any.
+    timings = None
+
     def __init__(self, endpoint, **kwargs):
         self.endpoint = endpoint
         self.auth_token = kwargs.get('token')
         self.auth_ref = kwargs.get('auth_ref')
         self.connection_params = self.get_connection_params(endpoint, **kwargs)
+        self.pool_size = kwargs.get('pool_size', DEFAULT_POOL_SIZE)
+        self._idle_connections = []
+        self._pool_lock = threading.Lock()
 
     @staticmethod
     def get_connection_params(endpoint, **kwargs):
@@ -102,7 +189,32 @@ class HTTPClient(object):
         except six.moves.http_client.InvalidURL:
             raise exceptions.EndpointException()
 
+    def set_pool_size(self, size):
+        """Keep up to `size` idle connections around for reuse."""
+        self.pool_size = max(self.pool_size, size)
+
+    def _acquire_connection(self):
+        """Return an idle connection if there is one, else a new one.
+
+        :returns: a tuple of the connection and whether it was reused.
+        """
+        with self._pool_lock:
+            if self._idle_connections:
+                return self._idle_connections.pop(), True
+        return self.get_connection(), False
+
+    def _release_connection(self, conn, resp):
+        """Put a connection whose response was fully read back in the pool."""
+        if not resp.will_close:
+            with self._pool_lock:
+                if len(self._idle_connections) < self.pool_size:
+                    self._idle_connections.append(conn)
+                    return
+        conn.close()
+
     def log_curl_request(self, method, url, kwargs):
+        if not LOG.isEnabledFor(logging.DEBUG):
+            return
         curl = ['curl -i -X %s' % method]
 
         for (key, value) in kwargs['headers'].items():
@@ -130,6 +242,8 @@ class HTTPClient(object):
 
     @staticmethod
     def log_http_response(resp, body=None):
+        if not LOG.isEnabledFor(logging.DEBUG):
+            return
         status = (resp.version / 10.0, resp.status, resp.reason)
         dump = ['\nHTTP/%.1f %s %s' % status]
         dump.extend(['%s: %s' % (k, v) for k, v in resp.getheaders()])
@@ -143,30 +257,49 @@ class HTTPClient(object):
         base_url = _args[2]
         return '%s/%s' % (base_url, url.lstrip('/'))
 
+    def _merge_headers(self, headers):
+        merged = {'User-Agent': USER_AGENT}
+        if self.auth_token:
+            merged['X-Auth-Token'] = self.auth_token
+        if headers:
+            merged.update(headers)
+        return merged
+
     def _http_request(self, url, method, **kwargs):
         """Send an http request with the specified characteristics.
 
         Wrapper around httplib.HTTP(S)Connection.request to handle tasks such
         as setting headers and error handling.
         """
-        # Copy the kwargs so we can reuse the original in case of redirects
-        kwargs['headers'] = copy.deepcopy(kwargs.get('headers', {}))
-        kwargs['headers'].setdefault('User-Agent', USER_AGENT)
-        if self.auth_token:
-            kwargs['headers'].setdefault('X-Auth-Token', self.auth_token)
+        kwargs['headers'] = self._merge_headers(kwargs.get('headers'))
 
         self.log_curl_request(method, url, kwargs)
-        conn = self.get_connection()
+        conn, reused = self._acquire_connection()
 
         try:
             conn_url = self._make_connection_url(url)
-            conn.request(method, conn_url, **kwargs)
-            resp = conn.getresponse()
+            sent = False
+            try:
+                conn.request(method, conn_url, **kwargs)
+                sent = True
+                resp = conn.getresponse()
+            except (socket.error, six.moves.http_client.HTTPException):
+                if not reused or (sent and
+                                  method.upper() not in IDEMPOTENT_METHODS):
+                    # Either not a stale connection, or the server may
+                    # have handled the request already.
+                    raise
+                # The server closed the idle connection, use a new one.
+                conn.close()
+                conn = self.get_connection()
+                conn.request(method, conn_url, **kwargs)
+                resp = conn.getresponse()
         except socket.gaierror as e:
             message = ("Error finding address for %(url)s: %(e)s"
                        % dict(url=url, e=e))
             raise exceptions.EndpointNotFound(message)
-        except (socket.error, socket.timeout) as e:
+        except (socket.error, socket.timeout,
+                six.moves.http_client.HTTPException) as e:
             endpoint = self.endpoint
             message = ("Error communicating with %(endpoint)s %(e)s"
                        % dict(endpoint=endpoint, e=e))
@@ -188,6 +321,7 @@ class HTTPClient(object):
             body_str = ''.join(body_list)
             self.log_http_response(resp, body_str)
             body_iter = six.StringIO(body_str)
+            self._release_connection(conn, resp)
         else:
             self.log_http_response(resp)
 
@@ -206,35 +340,36 @@ class HTTPClient(object):
         return resp, body_iter
 
     def json_request(self, method, url, **kwargs):
-        kwargs.setdefault('headers', {})
-        kwargs['headers'].setdefault('Content-Type', 'application/json')
-        kwargs['headers'].setdefault('Accept', 'application/json')
-        LOG.debug('@@@@@@@@@@@@@@@@@@@@')
-        LOG.debug(kwargs)
+        kwargs['headers'] = _with_defaults(JSON_HEADERS, kwargs.get('headers'))
         if 'body' in kwargs:
             kwargs['body'] = json.dumps(kwargs['body'])
-        resp, body_iter = self._http_request(url, method, **kwargs)
-        content_type = resp.getheader('content-type', None)
-        if resp.status == 204 or resp.status == 205 or content_type is None:
-            return resp, list()
-
-        if 'application/json' in content_type:
-            body = ''.join([chunk for chunk in body_iter])
-            try:
-                body = json.loads(body)
-            except ValueError:
-                LOG.error('Could not decode response body as JSON')
-        else:
-            body = None
+        with _timed(self.timings, method, url) as timing:
+            resp, body_iter = self._http_request(url, method, **kwargs)
+            content_type = resp.getheader('content-type', None)
+            if (resp.status == 204 or resp.status == 205 or
+                    content_type is None):
+                timing.response(resp.status)
+                return resp, list()
+
+            if 'application/json' in content_type:
+                body = ''.join([chunk for chunk in body_iter])
+                timing.response(resp.status, len(body), decoding=True)
+                try:
+                    body = json.loads(body)
+                except ValueError:
+                    LOG.error('Could not decode response body as JSON')
+            else:
+                timing.response(resp.status)
+                body = None
 
         return resp, body
 
     def raw_request(self, method, url, **kwargs):
-        print 'http'
-        kwargs.setdefault('headers', {})
-        kwargs['headers'].setdefault('Content-Type',
-                                     'application/octet-stream')
-        return self._http_request(url, method, **kwargs)
+        kwargs['headers'] = _with_defaults(RAW_HEADERS, kwargs.get('headers'))
+        with _timed(self.timings, method, url) as timing:
+            resp, body_iter = self._http_request(url, method, **kwargs)
+            timing.response(resp.status)
+        return resp, body_iter
 
 
 class VerifiedHTTPSConnection(six.moves.http_client.HTTPSConnection):
@@ -304,9 +439,31 @@ class VerifiedHTTPSConnection(six.moves.http_client.HTTPSConnection):
 class SessionClient(adapter.LegacyJsonAdapter):
     """HTTP client based on Keystone client session."""
 
+    # See HTTPClient.timings.
+    timings = None
+
     def __init__(self, user_agent=USER_AGENT, logger=LOG, *args, **kwargs):
         super(SessionClient, self).__init__(*args, **kwargs)
 
+    def set_pool_size(self, size):
+        """Let up to `size` concurrent requests share the connection pool.
+
+        The mounted adapters are kept, with their retries and any other
+        settings; only their pool of connections is replaced.
+        """
+        session = self.session.session
+        for prefix in ('https://', 'http://'):
+            adapter = session.get_adapter(prefix)
+            if (not hasattr(adapter, 'init_poolmanager') or
+                    adapter._pool_maxsize >= size):
+                continue
+            previous = adapter.poolmanager
+            adapter.init_poolmanager(adapter._pool_connections, size,
+                                     block=adapter._pool_block)
+            # The requests in flight finish on their connections, which
+            # are then closed rather than returned.
+            previous.clear()
+
     def _http_request(self, url, method, **kwargs):
         if url.startswith(API_VERSION):
             url = url[len(API_VERSION):]
@@ -318,16 +475,8 @@ class SessionClient(adapter.LegacyJsonAdapter):
         endpoint_filter.setdefault('interface', self.interface)
         endpoint_filter.setdefault('service_type', self.service_type)
         endpoint_filter.setdefault('region_name', self.region_name)
-        LOG.debug('@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@')
-        LOG.debug(kwargs)
-        # import requests
-        # r = requests.get(url)
-        # print r.status_code
-
         resp = self.session.request(url, method,
                                     raise_exc=False, **kwargs)
-        print '$$$$$$$$$$$$$$$$$$$$$$$$$$$$$$resp$$$$$$$$$$$$$$$$$$$$$$'
-        print resp
         if 400 <= resp.status_code < 600:
             error_json = _extract_error_json(resp.content)
             raise exceptions.from_response(
@@ -342,34 +491,36 @@ class SessionClient(adapter.LegacyJsonAdapter):
         return resp
 
     def json_request(self, method, url, **kwargs):
-        kwargs.setdefault('headers', {})
-        kwargs['headers'].setdefault('Content-Type', 'application/json')
-        kwargs['headers'].setdefault('Accept', 'application/json')
-        kwargs['headers'].setdefault(
-            'OpenStack-API-Version', 'container-infra latest')
+        kwargs['headers'] = _with_defaults(SESSION_JSON_HEADERS,
+                                           kwargs.get('headers'))
         if 'body' in kwargs:
             kwargs['data'] = json.dumps(kwargs.pop('body'))
-        resp = self._http_request(url, method, **kwargs)
-        body = resp.content
-        content_type = resp.headers.get('content-type', None)
-        status = resp.status_code
-        if status == 204 or status == 205 or content_type is None:
-            return resp, list()
-        if 'application/json' in content_type:
-            try:
-                body = resp.json()
-            except ValueError:
-                LOG.error('Could not decode response body as JSON')
-        else:
-            body = None
+        with _timed(self.timings, method, url) as timing:
+            resp = self._http_request(url, method, **kwargs)
+            body = resp.content
+            content_type = resp.headers.get('content-type', None)
+            status = resp.status_code
+            if status == 204 or status == 205 or content_type is None:
+                timing.response(status)
+                return resp, list()
+            if 'application/json' in content_type:
+                timing.response(status, len(body), decoding=True)
+                try:
+                    body = resp.json()
+                except ValueError:
+                    LOG.error('Could not decode response body as JSON')
+            else:
+                timing.response(status, len(body))
+                body = None
 
         return resp, body
 
     def raw_request(self, method, url, **kwargs):
-        # print 'session'
-        kwargs.setdefault('headers', {})
-        # kwargs['headers'].setdefault('Content-Type', 'application/octet-stream')
-        return self._http_request(url, method, **kwargs)
+        kwargs['headers'] = _with_defaults((), kwargs.get('headers'))
+        with _timed(self.timings, method, url) as timing:
+            resp = self._http_request(url, method, **kwargs)
+            timing.response(resp.status_code)
+        return resp
 
 
 class ResponseBodyIterator(object):
@@ -393,9 +544,7 @@ class ResponseBodyIterator(object):
 def _construct_http_client(*args, **kwargs):
     session = kwargs.pop('session', None)
     auth = kwargs.pop('auth', None)
-    print 'session'
     if session:
-        # print 'session'
         service_type = kwargs.pop('service_type', 'oasis')
         interface = kwargs.pop('endpoint_type', None)
         region_name = kwargs.pop('region_name', None)
@@ -408,5 +557,4 @@ def _construct_http_client(*args, **kwargs):
                              user_agent='python-oasisclient')
 
     else:
-        print 'Http Client'
         return HTTPClient(*args, **kwargs)
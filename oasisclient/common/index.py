@@ -0,0 +1,215 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+In-memory index of a collection, used to resolve names to IDs.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+from oasisclient.common.apiclient import exceptions
+from oasisclient.common import utils
+from oasisclient.i18n import _
+
+LOG = logging.getLogger(__name__)
+
+# Objects are listed in creation order, so that a later refresh only has
+# to ask for what comes after the last object seen.
+SORT_KEY = 'created_at'
+
+
+class ResourceIndex(object):
+    """Maps unique attributes (e.g. names) of a collection to object IDs.
+
+    The index is built once from a paginated listing, kept up to date by
+    the manager's own create/update/delete calls, and refreshed
+    incrementally afterwards using the ID of the newest object seen as the
+    pagination marker. Builds and refreshes are persisted at once; the
+    changes made by the manager's calls only by :meth:`flush`.
+
+    :param manager: the :class:`oasisclient.common.base.Manager` to index.
+    :param attrs: attributes to index besides the ID.
+    :param cache_file: optional path where the index is persisted between
+        runs.
+    :param max_age: seconds after which a persisted index is rebuilt from
+        scratch instead of being refreshed.
+    """
+
+    def __init__(self, manager, attrs=('name',), cache_file=None,
+                 max_age=3600):
+        self.manager = manager
+        self.attrs = tuple(attrs)
+        self.cache_file = cache_file
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._clear()
+        if cache_file:
+            self._load()
+
+    def _clear(self):
+        self._objects = {}
+        self._lookup = dict((attr, {}) for attr in self.attrs)
+        self._marker = None
+        self._built_at = None
+
+    @property
+    def built(self):
+        return self._built_at is not None
+
+    def _load(self):
+        try:
+            with open(self.cache_file) as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return
+
+        if (data.get('attrs') != list(self.attrs) or
+                time.time() - data.get('built_at', 0) > self.max_age):
+            return
+
+        for obj_id, values in data.get('objects', {}).items():
+            self._add(obj_id, values)
+        self._marker = data.get('marker')
+        self._built_at = data['built_at']
+
+    def save(self):
+        """Persist the index to `cache_file`, if there is one."""
+        if not self.cache_file or not self.built:
+            return
+        with self._lock:
+            data = {'attrs': list(self.attrs),
+                    'built_at': self._built_at,
+                    'marker': self._marker,
+                    'objects': self._objects}
+            try:
+                utils.write_file_atomic(self.cache_file, json.dumps(data))
+            except (IOError, OSError) as e:
+                LOG.debug('Could not save index to %s: %s',
+                          self.cache_file, e)
+            self._dirty = False
+
+    def flush(self):
+        """Persist the index if it changed since it was last saved."""
+        if self._dirty:
+            self.save()
+
+    def _add(self, obj_id, values):
+        self._discard(obj_id)
+        self._objects[obj_id] = values
+        for attr in self.attrs:
+            value = values.get(attr)
+            if value is not None:
+                self._lookup[attr].setdefault(value, set()).add(obj_id)
+
+    def _discard(self, obj_id):
+        values = self._objects.pop(obj_id, None)
+        if values is None:
+            return
+        for attr in self.attrs:
+            ids = self._lookup[attr].get(values.get(attr))
+            if ids is not None:
+                ids.discard(obj_id)
+                if not ids:
+                    del self._lookup[attr][values.get(attr)]
+
+    def _values(self, obj):
+        return dict((attr, getattr(obj, attr, None)) for attr in self.attrs)
+
+    def add(self, obj):
+        """Record a created or updated object."""
+        obj_id = getattr(obj, 'id', None)
+        if obj_id is None:
+            return
+        with self._lock:
+            self._add(obj_id, self._values(obj))
+            self._dirty = True
+
+    def discard(self, obj_id):
+        """Forget a deleted object."""
+        with self._lock:
+            self._discard(obj_id)
+            self._dirty = True
+
+    def _fetch(self, marker=None):
+        filters = utils.common_filters(marker=marker, sort_key=SORT_KEY,
+                                       sort_dir='asc')
+        url = '%s?%s' % (self.manager._path(), '&'.join(filters))
+        for obj in self.manager._iter_pagination(
+                url, self.manager.collection_key):
+            with self._lock:
+                self._add(obj.id, self._values(obj))
+                self._marker = obj.id
+
+    def build(self):
+        """(Re)build the index from a full listing."""
+        with self._lock:
+            self._clear()
+            self._fetch()
+            self._built_at = time.time()
+        self.save()
+
+    def refresh(self):
+        """Pick up the objects created since the index was last updated."""
+        if not self.built:
+            return self.build()
+        try:
+            self._fetch(self._marker)
+        except exceptions.NotFound:
+            # The marker object is gone, start over.
+            return self.build()
+        self.save()
+
+    def ids(self, value, attr='name'):
+        """Return the IDs of the objects whose `attr` equals `value`."""
+        with self._lock:
+            if not self.built:
+                self.build()
+            return set(self._lookup[attr].get(value, ()))
+
+    def __contains__(self, obj_id):
+        with self._lock:
+            if not self.built:
+                self.build()
+            return obj_id in self._objects
+
+    def resolve(self, value, attr='name'):
+        """Return the ID of the only object whose `attr` equals `value`.
+
+        The index is refreshed once on a miss before giving up.
+
+        :raises NotFound: if no object matches.
+        :raises NoUniqueMatch: if more than one object matches.
+        """
+        ids = self.ids(value, attr)
+        if not ids:
+            self.refresh()
+            ids = self.ids(value, attr)
+        if not ids:
+            msg = _("No %(name)s with %(attr)s '%(value)s' exists.") % {
+                'name': self.manager.resource_class.__name__.lower(),
+                'attr': attr,
+                'value': value}
+            raise exceptions.NotFound(msg)
+        elif len(ids) > 1:
+            raise exceptions.NoUniqueMatch()
+        return ids.pop()
+
+
+def default_cache_file(scope, collection_key):
+    """Return where the index of a collection is persisted by the CLI."""
+    return os.path.join(utils.cache_dir('index', scope),
+                        '%s.json' % collection_key)
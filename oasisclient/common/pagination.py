@@ -0,0 +1,97 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Adaptive page size for paginated listings.
+"""
+
+import threading
+
+# Smallest page size asked for by default.
+MIN_LIMIT = 20
+
+
+class PageSizeTuner(object):
+    """Picks the `limit` of the next page from how the previous ones went.
+
+    The time and size of each page are divided by its number of items and
+    averaged over the recent pages. The next page asks for as many items
+    as fit in `target_latency` seconds and `max_page_bytes` bytes, moving
+    by at most a factor of `max_step` from one page to the next and
+    staying between `min_limit` and `max_limit`.
+
+    Since the time per item includes the fixed cost of a request, the
+    page size settles where a page takes about `target_latency`.
+
+    :param target_latency: seconds a page should take.
+    :param min_limit: smallest page size asked for.
+    :param max_limit: largest page size asked for.
+    :param initial_limit: size of the first page.
+    :param max_page_bytes: largest page body wanted, when the responses
+        have a Content-Length; None for no bound.
+    :param max_step: largest growth or shrink factor between two pages.
+    :param smoothing: weight of the latest page in the averages, between
+        0 (ignore it) and 1 (only use it).
+    """
+
+    def __init__(self, target_latency=1.0, min_limit=MIN_LIMIT, max_limit=1000,
+                 initial_limit=100, max_page_bytes=4 * 1024 * 1024,
+                 max_step=2.0, smoothing=0.5):
+        if not 0 < min_limit <= max_limit:
+            raise ValueError('Page size bounds must satisfy '
+                             '0 < min_limit <= max_limit')
+        self.target_latency = target_latency
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_page_bytes = max_page_bytes
+        self.max_step = max_step
+        self.smoothing = smoothing
+        self.limit = self._bound(initial_limit)
+        self.seconds_per_item = None
+        self.bytes_per_item = None
+        self._lock = threading.Lock()
+
+    def _bound(self, limit):
+        return int(max(self.min_limit, min(self.max_limit, limit)))
+
+    def _average(self, average, value):
+        if average is None:
+            return value
+        return self.smoothing * value + (1 - self.smoothing) * average
+
+    def record(self, count, elapsed, size=None):
+        """Account for a page, and update the size of the next one.
+
+        :param count: number of items on the page.
+        :param elapsed: seconds the request took.
+        :param size: size of the body in bytes, None if unknown.
+        :returns: the new page size.
+        """
+        with self._lock:
+            if count <= 0:
+                return self.limit
+            self.seconds_per_item = self._average(self.seconds_per_item,
+                                                  float(elapsed) / count)
+            if size:
+                self.bytes_per_item = self._average(self.bytes_per_item,
+                                                    float(size) / count)
+
+            wanted = self.limit * self.max_step
+            if self.seconds_per_item > 0:
+                wanted = min(wanted,
+                             self.target_latency / self.seconds_per_item)
+            if self.max_page_bytes and self.bytes_per_item:
+                wanted = min(wanted,
+                             self.max_page_bytes / self.bytes_per_item)
+            wanted = max(wanted, self.limit / self.max_step)
+            self.limit = self._bound(wanted)
+            return self.limit
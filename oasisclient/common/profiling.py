@@ -0,0 +1,111 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Profiling of a command, with cProfile or a sampling profiler.
+"""
+
+import collections
+import contextlib
+import os
+import sys
+import threading
+import time
+
+# Files with these extensions get collapsed stacks, one
+# "frame;frame;...;frame count" line per stack, which flamegraph.pl and
+# speedscope read; anything else gets cProfile's pstats.
+COLLAPSED_EXTENSIONS = ('.collapsed', '.folded')
+
+# Seconds between two samples.
+SAMPLE_INTERVAL = 0.001
+
+
+class Sampler(object):
+    """Samples the stack of a thread from another one, on wall clock time.
+
+    Time spent waiting, on the network for instance, shows up as much as
+    time spent computing, which is what matters for a slow command.
+
+    :param thread_id: ident of the sampled thread, by default the one
+        calling :meth:`start`.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.stacks = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _frame_name(frame):
+        code = frame.f_code
+        return '%s:%s:%d' % (os.path.basename(code.co_filename),
+                             code.co_name, code.co_firstlineno)
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        names = []
+        while frame is not None:
+            names.append(self._frame_name(frame))
+            frame = frame.f_back
+        if names:
+            self.stacks[';'.join(reversed(names))] += 1
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._sample()
+            time.sleep(self.interval)
+
+    def start(self):
+        if self.thread_id is None:
+            self.thread_id = threading.current_thread().ident
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write('%s %d\n' % (stack, count))
+
+
+@contextlib.contextmanager
+def profile(path):
+    """Profile the body of the with statement into `path`.
+
+    The profiler depends on the extension of `path`, see
+    :data:`COLLAPSED_EXTENSIONS`. The profile is written even if the body
+    fails.
+    """
+    if path.endswith(COLLAPSED_EXTENSIONS):
+        profiler = Sampler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            profiler.write(path)
+    else:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(path)
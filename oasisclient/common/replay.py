@@ -0,0 +1,276 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Recording of API traffic, and replay of the recordings.
+
+:class:`RecordingTransport` wraps an :class:`~.httpclient.HTTPClient` or
+:class:`~.httpclient.SessionClient` and writes every request it makes,
+with its response and timing, to a gzipped JSON lines file.
+:class:`ReplayTransport` then stands in for the client, answering the
+same requests from the file, so that traffic seen against a real service
+can be run again without it::
+
+    cs.set_transport(replay.RecordingTransport(cs.http_client, 'trace.gz'))
+    ...
+    cs = client.Client(http_client=replay.ReplayTransport('trace.gz',
+                                                          timing='zero'))
+"""
+
+import base64
+import collections
+import gzip
+import json
+import threading
+import time
+
+from requests import structures
+import six
+
+from oasisclient.common import httpclient
+from oasisclient.common import utils
+from oasisclient import exceptions
+
+FORMAT_VERSION = 1
+TIMINGS = ('original', 'zero', 'scaled')
+
+# Response headers kept in recordings.
+RECORDED_HEADERS = ('Content-Type', 'Content-Length', 'ETag', 'Location',
+                    'Retry-After', 'X-Openstack-Request-Id')
+
+
+def _request_key(method, url, body):
+    if body is not None:
+        body = json.dumps(body, sort_keys=True)
+    return method, url, body
+
+
+class _Response(object):
+    """Replayed response, usable as an httplib or a requests response."""
+
+    def __init__(self, status, headers, content):
+        self.status_code = self.status = status
+        self.headers = structures.CaseInsensitiveDict(headers)
+        self.content = content
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name, default)
+
+    def getheaders(self):
+        return list(self.headers.items())
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', 'replace')
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class RecordingTransport(object):
+    """Passes requests on to a client, recording them into a file.
+
+    Anything but json_request and raw_request goes to the wrapped client
+    untouched.
+
+    :param client: the HTTPClient or SessionClient doing the requests.
+    :param path: file the recording is written to, gzipped.
+    """
+
+    def __init__(self, client, path):
+        self.__dict__['client'] = client
+        self.__dict__['_lock'] = threading.Lock()
+        self.__dict__['_started'] = time.time()
+        self.__dict__['kind'] = getattr(client, 'kind', None) or (
+            'session' if isinstance(client, httpclient.SessionClient)
+            else 'http')
+        self.__dict__['_file'] = gzip.open(path, 'wb')
+        self._write({'version': FORMAT_VERSION, 'kind': self.kind,
+                     'started': self._started})
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def __setattr__(self, name, value):
+        # e.g. timings, which the wrapped client records into.
+        setattr(self.client, name, value)
+
+    def _write(self, entry):
+        line = json.dumps(entry, sort_keys=True, separators=(',', ':'))
+        with self._lock:
+            self._file.write(line.encode('utf-8') + b'\n')
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _record(self, method, url, body, started, resp=None, error=None,
+                **response):
+        entry = {'t': started - self._started, 'method': method, 'url': url,
+                 'elapsed': time.time() - started}
+        if body is not None:
+            entry['body'] = body
+        if error is not None and getattr(error, 'response', None) is not None:
+            resp = error.response
+        if resp is not None:
+            entry['status'] = getattr(resp, 'status_code',
+                                      getattr(resp, 'status', None))
+            entry['headers'] = dict(
+                (name, utils.get_header(resp, name))
+                for name in RECORDED_HEADERS
+                if utils.get_header(resp, name) is not None)
+        if error is not None:
+            status = getattr(error, 'http_status', None)
+            if status:
+                entry['status'] = status
+                entry['error'] = {'message': error.message,
+                                  'details': error.details}
+            else:
+                entry['error'] = {'exception': type(error).__name__,
+                                  'message': six.text_type(error)}
+        entry.update(response)
+        self._write(entry)
+
+    def json_request(self, method, url, **kwargs):
+        started = time.time()
+        try:
+            resp, body = self.client.json_request(method, url, **kwargs)
+        except Exception as e:
+            self._record(method, url, kwargs.get('body'), started, error=e)
+            raise
+        self._record(method, url, kwargs.get('body'), started, resp,
+                     json=body)
+        return resp, body
+
+    def raw_request(self, method, url, **kwargs):
+        started = time.time()
+        try:
+            result = self.client.raw_request(method, url, **kwargs)
+        except Exception as e:
+            self._record(method, url, None, started, error=e)
+            raise
+        if self.kind == 'session':
+            resp, content = result, result.content
+        else:
+            # The body is read here, so it is handed back as a new stream.
+            resp, body_iter = result
+            content = b''.join(chunk if isinstance(chunk, bytes)
+                               else chunk.encode('utf-8')
+                               for chunk in body_iter)
+            result = resp, six.BytesIO(content)
+        self._record(method, url, None, started, resp,
+                     raw=base64.b64encode(content).decode('ascii'))
+        return result
+
+
+class ReplayMiss(exceptions.ClientException):
+    """A request which the recording has no answer for."""
+
+
+class ReplayTransport(object):
+    """Answers requests from a recording made by RecordingTransport.
+
+    Each request gets the next recorded response to the same method, URL
+    and body, so that a listing changing between two requests replays
+    the same way.
+
+    :param path: the recording.
+    :param timing: 'original' to take as long as the recorded requests
+        did, 'zero' to answer at once, 'scaled' to take `scale` times as
+        long.
+    :param scale: factor of the recorded durations, with 'scaled'.
+    :param loop: start over with the first answer of a request once its
+        recorded ones are used up, instead of raising ReplayMiss; for
+        throughput runs longer than the recording.
+    """
+
+    # See HTTPClient.timings.
+    timings = None
+
+    def __init__(self, path, timing='original', scale=1.0, loop=False):
+        if timing not in TIMINGS:
+            raise ValueError("Unknown timing '%s'" % timing)
+        self.scale = {'original': 1.0, 'zero': 0.0, 'scaled': scale}[timing]
+        self.loop = loop
+        self._lock = threading.Lock()
+        self._answers = collections.defaultdict(collections.deque)
+        with gzip.open(path, 'rb') as f:
+            header = json.loads(f.readline().decode('utf-8'))
+            if header.get('version') != FORMAT_VERSION:
+                raise ValueError('%s is not a recording' % path)
+            self.kind = header['kind']
+            for line in f:
+                entry = json.loads(line.decode('utf-8'))
+                key = _request_key(entry['method'], entry['url'],
+                                   entry.get('body'))
+                self._answers[key].append(entry)
+
+    def set_pool_size(self, size):
+        pass
+
+    def _answer(self, method, url, body):
+        key = _request_key(method, url, body)
+        with self._lock:
+            answers = self._answers.get(key)
+            if not answers:
+                raise ReplayMiss('No recorded answer to %s %s' %
+                                 (method, url))
+            entry = answers.popleft()
+            if self.loop:
+                answers.append(entry)
+        if self.scale:
+            time.sleep(entry['elapsed'] * self.scale)
+
+        error = entry.get('error')
+        if error and 'exception' in error:
+            exc_class = getattr(exceptions, error['exception'], None)
+            if not (isinstance(exc_class, type) and
+                    issubclass(exc_class, Exception)):
+                exc_class = exceptions.ClientException
+            raise exc_class(error['message'])
+        content = b''
+        if 'raw' in entry:
+            content = base64.b64decode(entry['raw'])
+        elif entry.get('json') is not None:
+            content = json.dumps(entry['json']).encode('utf-8')
+        headers = entry.get('headers', {})
+        if error:
+            # from_response only takes the message and details given to
+            # it from a JSON response.
+            headers = dict(headers, **{'Content-Type': 'application/json'})
+        resp = _Response(entry['status'], headers, content)
+        if error:
+            e = exceptions.from_response(resp, error['message'],
+                                         error['details'], method, url)
+            e.details = error['details']
+            raise e
+        return resp, entry
+
+    def json_request(self, method, url, **kwargs):
+        with httpclient._timed(self.timings, method, url) as timing:
+            resp, entry = self._answer(method, url, kwargs.get('body'))
+            timing.response(resp.status, len(resp.content))
+        return resp, entry.get('json')
+
+    def raw_request(self, method, url, **kwargs):
+        with httpclient._timed(self.timings, method, url) as timing:
+            resp, entry = self._answer(method, url, None)
+            timing.response(resp.status, len(resp.content))
+        if self.kind == 'session':
+            return resp
+        return resp, six.BytesIO(resp.content)
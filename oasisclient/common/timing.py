@@ -0,0 +1,103 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Where the time of a command goes: phases, and HTTP requests.
+"""
+
+import contextlib
+import threading
+import time
+
+
+class Timings(object):
+    """Collects the duration of named phases and of HTTP requests.
+
+    The HTTP clients record their requests into the `timings` they are
+    given, see :meth:`record_request`; the phases are timed with
+    :meth:`phase`.
+    """
+
+    def __init__(self):
+        self.phases = []
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def add_phase(self, name, seconds):
+        with self._lock:
+            self.phases.append((name, seconds))
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Time the body of the with statement as phase `name`."""
+        started = time.time()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.time() - started)
+
+    def record_request(self, method, url, status, elapsed, size=None,
+                       decode=None):
+        """Account for an HTTP request.
+
+        :param status: HTTP status of the response, None if there was
+            none.
+        :param elapsed: seconds from sending the request to having read
+            the response.
+        :param size: size of the response body in bytes, if known.
+        :param decode: seconds spent decoding the body, if it was.
+        """
+        with self._lock:
+            self.requests.append({'method': method, 'url': url,
+                                  'status': status, 'elapsed': elapsed,
+                                  'size': size, 'decode': decode})
+
+    def http_time(self):
+        """Total time of the HTTP requests, decoding included."""
+        with self._lock:
+            return sum(r['elapsed'] + (r['decode'] or 0)
+                       for r in self.requests)
+
+    def report(self, stream, command_phase=None):
+        """Write the breakdown to `stream`.
+
+        :param command_phase: name of the phase the requests were made
+            in; its time is split between them and the rest.
+        """
+        def line(name, seconds):
+            stream.write('%-40s %10.1f ms\n' % (name, seconds * 1000))
+
+        total = 0.0
+        stream.write('Phases:\n')
+        for name, seconds in self.phases:
+            total += seconds
+            line('  ' + name, seconds)
+            if name == command_phase and self.requests:
+                http = self.http_time()
+                line('    HTTP requests (%d)' % len(self.requests), http)
+                line('    other: processing and output',
+                     max(0.0, seconds - http))
+        line('  total', total)
+
+        if self.requests:
+            stream.write('HTTP requests:\n')
+            for r in self.requests:
+                details = []
+                if r['size'] is not None:
+                    details.append('%d bytes' % r['size'])
+                if r['decode'] is not None:
+                    details.append('decode %.1f ms' % (r['decode'] * 1000))
+                stream.write('  %-6s %s %s %.1f ms%s\n' % (
+                    r['method'], r['url'],
+                    r['status'] if r['status'] is not None else '-',
+                    r['elapsed'] * 1000,
+                    ' (%s)' % ', '.join(details) if details else ''))
@@ -16,6 +16,13 @@
 #    under the License.
 
 import json
+import os
+import tempfile
+
+import jsonpatch
+from oslo_utils import encodeutils
+import six
+from six.moves.urllib import parse
 
 from oasisclient import exceptions as exc
 from oasisclient.i18n import _
@@ -42,6 +49,37 @@ def common_filters(marker=None, limit=None, sort_key=None, sort_dir=None):
     return filters
 
 
+def filter_query(supported, filters):
+    """Translate attribute filters into list query parameters.
+
+    :param supported: attributes the API is able to filter on.
+    :param filters: `dict` of attribute/value pairs to look for.
+    :returns: list of string filters, for the attributes in `supported`.
+    """
+    query = []
+    for key in sorted(filters):
+        value = filters[key]
+        if key in supported and value is not None:
+            query.append(parse.urlencode(
+                [(key, encodeutils.safe_encode(six.text_type(value)))]))
+    return query
+
+
+def set_query_params(url, **params):
+    """Return `url` with some query parameters added or replaced.
+
+    The other parameters are kept, in their order.
+    """
+    parts = parse.urlsplit(url)
+    query = [(key, value)
+             for (key, value) in parse.parse_qsl(parts.query,
+                                                 keep_blank_values=True)
+             if key not in params]
+    query.extend(sorted(params.items()))
+    return parse.urlunsplit(parts[:3] + (parse.urlencode(query),) +
+                            parts[4:])
+
+
 def split_and_deserialize(string):
     """Split and try to JSON deserialize a string.
 
@@ -80,6 +118,40 @@ def args_array_to_patch(op, attributes):
     return patch
 
 
+# Attributes maintained by the API, which are never part of an update.
+READ_ONLY_ATTRS = ('id', 'user_id', 'project_id', 'created_at', 'updated_at')
+
+
+def fields_to_patch(changes, original=None):
+    """Build the JSON patch that sets the given fields.
+
+    :param changes: `dict` of the fields to set; read-only attributes are
+        ignored.
+    :param original: `dict` of the object as last seen, if known. Fields
+        whose value did not change are left out and nested values are
+        diffed. Without it every field is replaced.
+    :returns: list of JSON patch operations, empty if nothing changes.
+    """
+    changes = dict((key, value) for (key, value) in changes.items()
+                   if key not in READ_ONLY_ATTRS)
+    if original is None:
+        return [{'op': 'replace',
+                 'path': '/' + key.replace('~', '~0').replace('/', '~1'),
+                 'value': changes[key]}
+                for key in sorted(changes)]
+
+    source = dict((key, original[key]) for key in changes if key in original)
+    return jsonpatch.make_patch(source, changes).patch
+
+
+def get_header(resp, name):
+    """Return a response header, for both requests and httplib responses."""
+    try:
+        return resp.headers.get(name)
+    except AttributeError:
+        return resp.getheader(name)
+
+
 def handle_labels(labels):
     labels = format_labels(labels)
     if 'mesos_slave_executor_env_file' in labels:
@@ -144,3 +216,32 @@ def handle_json_from_file(json_arg):
         raise exc.InvalidAttribute(err)
 
     return json_arg
+
+
+def cache_dir(*parts):
+    """Return (and create) a directory under the user's cache directory.
+
+    :param parts: path components below the oasisclient cache directory.
+    """
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache')
+    path = os.path.join(base, 'oasisclient', *parts)
+    try:
+        os.makedirs(path, 0o700)
+    except OSError:
+        if not os.path.isdir(path):
+            raise
+    return path
+
+
+def write_file_atomic(path, data):
+    """Write `data` to `path` so that readers never see a partial file."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path),
+                                    prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(data)
+        os.rename(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
@@ -0,0 +1,144 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Change tracking over paginated collection listings.
+"""
+
+import collections
+
+from oasisclient.common import utils
+
+ADDED = 'added'
+MODIFIED = 'modified'
+DELETED = 'deleted'
+
+Event = collections.namedtuple('Event', ['type', 'id', 'resource'])
+
+
+def _stamp(obj):
+    return getattr(obj, 'updated_at', None) or getattr(obj, 'created_at',
+                                                        None)
+
+
+def _is_deleted(obj):
+    return (getattr(obj, 'deleted', False) or
+            getattr(obj, 'status', None) == 'DELETED')
+
+
+class ChangeTracker(object):
+    """Turns successive listings of a collection into change events.
+
+    The first poll lists the whole collection and reports every object as
+    added. Later polls only fetch what changed since the newest timestamp
+    seen, by paging through the collection sorted by `updated_at` and
+    `created_at`, newest first, and stopping at the first object that is
+    older. The whole collection is listed again every
+    `resync_every` polls, to find the objects deleted in the meantime.
+
+    :param manager: the :class:`oasisclient.common.base.Manager` to track.
+    :param resync_every: number of polls between two full listings, or
+        None to only list everything once.
+    :param snapshot: `dict` of the timestamps of the objects already
+        known, by ID, to carry on from an earlier tracker.
+    :param polls: number of polls made by that earlier tracker.
+    """
+
+    def __init__(self, manager, resync_every=10, snapshot=None, polls=0):
+        self.manager = manager
+        self.resync_every = resync_every
+        self.snapshot = dict(snapshot or {})
+        self.watermark = max([stamp for stamp in self.snapshot.values()
+                              if stamp is not None] or [None])
+        self.polls = polls if self.snapshot else 0
+
+    def _url(self, sort_key=None, sort_dir=None):
+        filters = utils.common_filters(sort_key=sort_key, sort_dir=sort_dir)
+        url = self.manager._path()
+        if filters:
+            url += '?' + '&'.join(filters)
+        return url
+
+    def _iter(self, url):
+        return self.manager._iter_pagination(url,
+                                             self.manager.collection_key)
+
+    def _record(self, obj):
+        """Record a listed object, return its event if it changed."""
+        stamp = _stamp(obj)
+        if stamp is not None and (self.watermark is None or
+                                  stamp > self.watermark):
+            self.watermark = stamp
+
+        if _is_deleted(obj):
+            if obj.id in self.snapshot:
+                del self.snapshot[obj.id]
+                return Event(DELETED, obj.id, obj)
+            return None
+
+        if obj.id not in self.snapshot:
+            self.snapshot[obj.id] = stamp
+            return Event(ADDED, obj.id, obj)
+        if self.snapshot[obj.id] != stamp:
+            self.snapshot[obj.id] = stamp
+            return Event(MODIFIED, obj.id, obj)
+        return None
+
+    def _resync(self):
+        listed = set()
+        events = []
+        for obj in self._iter(self._url()):
+            listed.add(obj.id)
+            event = self._record(obj)
+            if event:
+                events.append(event)
+        for obj_id in set(self.snapshot) - listed:
+            del self.snapshot[obj_id]
+            events.append(Event(DELETED, obj_id, None))
+        return events
+
+    def _newest_first(self):
+        events = {}
+        # Both passes stop at the previous poll's watermark; _record()
+        # raises self.watermark as the first pass goes.
+        watermark = self.watermark
+        for sort_key in ('updated_at', 'created_at'):
+            url = self._url(sort_key=sort_key, sort_dir='desc')
+            dated = False
+            for obj in self._iter(url):
+                stamp = getattr(obj, sort_key, None)
+                if stamp is None:
+                    # Never updated; those are found by the created_at
+                    # pass, and when they sort last there is nothing more.
+                    if dated:
+                        break
+                    continue
+                if stamp < watermark:
+                    break
+                dated = True
+                event = self._record(obj)
+                if event:
+                    events[obj.id] = event
+        return list(events.values())
+
+    def poll(self):
+        """List what changed since the previous poll.
+
+        :returns: list of :class:`Event`.
+        """
+        resync = (self.polls == 0 or self.watermark is None or
+                  (self.resync_every and
+                   self.polls % self.resync_every == 0))
+        self.polls += 1
+        if resync:
+            return self._resync()
+        return self._newest_first()
@@ -0,0 +1,169 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Shell completion of commands and resource names, served from caches.
+
+Like :mod:`oasisclient.daemon`, this module only imports the standard
+library: completing never touches the API nor imports the client. The
+names and IDs come from a cache file per environment, written by
+``oasis completion-refresh``, which is started in the background when
+the cache is older than its TTL.
+"""
+
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+
+from oasisclient import daemon
+
+# Collection completed for the arguments of the commands starting with
+# each prefix, longest prefixes first.
+RESOURCE_COMMANDS = (
+    ('nodepool-policy', 'nodepool_policies'),
+    ('nodepool', 'nodepools'),
+    ('function', 'functions'),
+    ('endpoint', 'endpoints'),
+)
+
+# Commands of the shell itself, which are not in the command table.
+SHELL_COMMANDS = ('batch', 'bash-completion', 'completion-refresh', 'daemon',
+                  'help')
+
+DEFAULT_TTL = 300
+# Seconds a refresh is given before another one may start.
+REFRESH_GRACE = 60
+
+
+def _cache_base():
+    return os.path.join(os.environ.get('XDG_CACHE_HOME') or
+                        os.path.join(os.path.expanduser('~'), '.cache'),
+                        'oasisclient')
+
+
+def cache_file():
+    """Return the name cache of the current environment."""
+    return os.path.join(_cache_base(), 'completion',
+                        '%s.json' % daemon.env_scope())
+
+
+def collections():
+    """Return the collections whose names are completed."""
+    return sorted(set(key for (_prefix, key) in RESOURCE_COMMANDS))
+
+
+def _commands():
+    # The newest command table written by the shell, see
+    # OasisShell._command_table().
+    tables = glob.glob(os.path.join(_cache_base(), 'commands', '*.json'))
+    commands = set(SHELL_COMMANDS)
+    if tables:
+        try:
+            with open(max(tables, key=os.path.getmtime)) as f:
+                commands.update(json.load(f))
+        except (IOError, OSError, ValueError):
+            pass
+    return sorted(commands)
+
+
+def _refresh_in_background(path):
+    marker = path + '.refreshing'
+    try:
+        if time.time() - os.path.getmtime(marker) < REFRESH_GRACE:
+            return
+    except OSError:
+        pass
+    try:
+        directory = os.path.dirname(marker)
+        if not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+        open(marker, 'w').close()
+        with open(os.devnull, 'r+') as devnull:
+            subprocess.Popen([sys.executable, '-m', 'oasisclient.daemon',
+                              'completion-refresh'],
+                             stdin=devnull, stdout=devnull, stderr=devnull,
+                             close_fds=True, preexec_fn=os.setsid)
+    except (IOError, OSError):
+        pass
+
+
+def _names(collection, ttl):
+    path = cache_file()
+    try:
+        age = time.time() - os.path.getmtime(path)
+    except OSError:
+        age = None
+    if age is None or age > ttl:
+        _refresh_in_background(path)
+    if age is None:
+        return []
+    try:
+        with open(path) as f:
+            objects = json.load(f).get(collection, [])
+    except (IOError, OSError, ValueError):
+        return []
+    names = set()
+    for obj_id, name in objects:
+        names.add(obj_id)
+        if name:
+            names.add(name)
+    return sorted(names)
+
+
+def _collection(command):
+    for prefix, collection in RESOURCE_COMMANDS:
+        if command == prefix or command.startswith(prefix + '-'):
+            return collection
+    return None
+
+
+def complete(words, ttl=DEFAULT_TTL):
+    """Return the candidates for the last word of a command line.
+
+    :param words: the words after 'oasis', up to and including the one
+        being completed.
+    """
+    if not words:
+        words = ['']
+    current = words[-1]
+    positional = [word for word in words[:-1] if not word.startswith('-')]
+    if current.startswith('-'):
+        return []
+    if not positional:
+        candidates = _commands()
+    else:
+        collection = _collection(positional[0])
+        if collection is None:
+            return []
+        candidates = _names(collection, ttl)
+    return [word for word in candidates if word.startswith(current)]
+
+
+def main(argv):
+    """Print the candidates, one per line.
+
+    :param argv: index of the word being completed, counting 'oasis' as
+        0, followed by the words of the command line after 'oasis'.
+    """
+    try:
+        cword = int(argv[0])
+    except (IndexError, ValueError):
+        return 1
+    words = argv[1:cword + 1]
+    words.extend([''] * (cword - len(words)))
+    ttl = float(os.environ.get('OASIS_COMPLETION_TTL') or DEFAULT_TTL)
+    for candidate in complete(words, ttl):
+        print(candidate)
+    return 0
@@ -0,0 +1,262 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Local daemon running CLI commands over a warm client, and its thin client.
+
+This module is the `oasis` entry point. It only imports the standard
+library, so that forwarding a command to a running daemon costs little
+more than starting the interpreter; without a daemon, it falls back to
+:func:`oasisclient.shell.main`.
+
+Messages are JSON objects, one per line. The client sends the command::
+
+    {"argv": [...], "cwd": "...", "tty": true}
+
+and the daemon answers with any number of ``{"out": <base64>}`` and
+``{"err": <base64>}`` messages, then ``{"exit": <status>}``.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+# When the entry point started, before the client is imported.
+STARTED = time.time()
+
+LOG = logging.getLogger(__name__)
+
+# Commands which are always run in-process: the daemon itself, batch,
+# which may read its commands from stdin, and function-invoke, which may
+# read its payload from stdin and streams the response to stdout.
+LOCAL_COMMANDS = ('daemon', 'batch', 'function-invoke')
+
+CONNECT_TIMEOUT = 0.5
+
+# Prefixes of the environment variables the credentials and the client
+# settings are read from.
+SCOPE_PREFIXES = ('OS_', 'OASIS_')
+
+
+def env_scope():
+    """Key of the credentials and client settings the environment holds."""
+    items = sorted((key, value) for (key, value) in os.environ.items()
+                   if key.startswith(SCOPE_PREFIXES))
+    digest = hashlib.sha1(json.dumps(items).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def socket_path():
+    """Return the socket of the daemon serving the current environment."""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'oasisclient', 'daemon', '%s.sock' % env_scope())
+
+
+def _send(conn, message):
+    conn.sendall(json.dumps(message).encode('utf-8') + b'\n')
+
+
+def _messages(conn):
+    buf = b''
+    while True:
+        data = conn.recv(65536)
+        if not data:
+            return
+        buf += data
+        while b'\n' in buf:
+            line, buf = buf.split(b'\n', 1)
+            yield json.loads(line.decode('utf-8'))
+
+
+class _SocketStream(object):
+    """File-like object sending what is written to the client."""
+
+    encoding = 'utf-8'
+
+    def __init__(self, conn, key, tty):
+        self.conn = conn
+        self.key = key
+        self.tty = tty
+
+    @property
+    def buffer(self):
+        return self
+
+    def isatty(self):
+        return self.tty
+
+    def write(self, data):
+        if not isinstance(data, bytes):
+            data = data.encode('utf-8')
+        if data:
+            _send(self.conn, {self.key: base64.b64encode(data).decode()})
+
+    def flush(self):
+        pass
+
+
+def _handle(shell, cs, conn):
+    request = next(_messages(conn))
+    stdout, stderr = sys.stdout, sys.stderr
+    cwd = os.getcwd()
+    sys.stdout = _SocketStream(conn, 'out', request.get('tty', False))
+    sys.stderr = _SocketStream(conn, 'err', request.get('tty', False))
+    status = 0
+    try:
+        os.chdir(request.get('cwd') or cwd)
+        args = shell.parse_args(request['argv'])
+        result = shell._run_one(cs, args)
+        if isinstance(result, int):
+            status = result
+    except SystemExit as e:
+        status = e.code if isinstance(e.code, int) else int(
+            e.code is not None)
+    except Exception as e:
+        sys.stderr.write('ERROR: %s\n' % e)
+        status = 1
+    finally:
+        sys.stdout, sys.stderr = stdout, stderr
+        os.chdir(cwd)
+        cs.flush_index_cache()
+    _send(conn, {'exit': status})
+
+
+def serve(shell, cs, path=None, idle_timeout=None):
+    """Run the commands sent to the socket, one at a time, over `cs`.
+
+    Commands are run in turn, since they share the working directory and
+    standard streams of the process.
+
+    :param shell: the :class:`oasisclient.shell.OasisShell` whose parser
+        parses the commands.
+    :param cs: the client the commands run with.
+    :param path: path of the socket, :func:`socket_path` by default.
+    :param idle_timeout: seconds without a command after which the daemon
+        exits, None to run forever.
+    """
+    path = path or socket_path()
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory, 0o700)
+    if os.path.exists(path):
+        os.unlink(path)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o077)
+    try:
+        server.bind(path)
+    finally:
+        os.umask(old_umask)
+    server.listen(16)
+    server.settimeout(idle_timeout)
+    stopping = []
+
+    def stop(signum, frame):
+        # Exiting from here would be caught by the command being run, if
+        # any; instead the loop stops once it is done.
+        stopping.append(signum)
+        server.close()
+
+    # Clean the socket up when killed.
+    signal.signal(signal.SIGTERM, stop)
+    LOG.debug('Serving on %s', path)
+    try:
+        while not stopping:
+            try:
+                conn, _addr = server.accept()
+            except socket.timeout:
+                return
+            except socket.error:
+                if stopping:
+                    return
+                raise
+            conn.settimeout(None)
+            try:
+                _handle(shell, cs, conn)
+            except (socket.error, ValueError, StopIteration) as e:
+                LOG.debug('Dropped a connection: %s', e)
+            finally:
+                conn.close()
+    finally:
+        server.close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def forward(argv, path=None):
+    """Run a command through the daemon, printing its output.
+
+    :returns: the exit status of the command, or None when no daemon
+        answered, in which case nothing was run.
+    """
+    path = path or socket_path()
+    if not os.path.exists(path):
+        return None
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    conn.settimeout(CONNECT_TIMEOUT)
+    try:
+        conn.connect(path)
+    except socket.error:
+        conn.close()
+        return None
+
+    conn.settimeout(None)
+    streams = {'out': getattr(sys.stdout, 'buffer', sys.stdout),
+               'err': getattr(sys.stderr, 'buffer', sys.stderr)}
+    try:
+        _send(conn, {'argv': argv, 'cwd': os.getcwd(),
+                     'tty': sys.stdout.isatty()})
+        for message in _messages(conn):
+            if 'exit' in message:
+                return message['exit']
+            for key, stream in streams.items():
+                if key in message:
+                    stream.write(base64.b64decode(message[key]))
+                    stream.flush()
+    finally:
+        conn.close()
+    # The daemon went away in the middle of the command.
+    sys.stderr.write('ERROR: lost the connection to the oasis daemon\n')
+    return 1
+
+
+def _forwardable(argv):
+    # Global options come before the subcommand and may change the
+    # credentials or the client settings, so those run in-process.
+    return (bool(argv) and not argv[0].startswith('-') and
+            argv[0] not in LOCAL_COMMANDS and
+            not os.environ.get('OASIS_NO_DAEMON'))
+
+
+def main():
+    argv = sys.argv[1:]
+    if argv[:1] == ['_complete']:
+        from oasisclient import completion
+        sys.exit(completion.main(argv[1:]))
+    if _forwardable(argv):
+        status = forward(argv)
+        if status is not None:
+            sys.exit(status)
+
+    from oasisclient import shell
+    sys.exit(shell.main())
+
+
+if __name__ == '__main__':
+    main()
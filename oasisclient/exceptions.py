@@ -38,6 +38,10 @@ class InvalidAttribute(ClientException):
     pass
 
 
+class InvalidManifest(ClientException):
+    pass
+
+
 def from_response(response, message=None, traceback=None, method=None,
                   url=None):
     """Return an HttpError instance based on response from httplib/requests."""
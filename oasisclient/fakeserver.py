@@ -0,0 +1,650 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Local stand-in for the Oasis API, over real HTTP.
+
+The server keeps the v1 collections in memory and serves them like the
+API does, 'next' pagination links, ETags and If-Match included, so that
+benchmarks and integration tests can run offline against real sockets.
+Latency, payload size and 429/503 errors are configurable per route, the
+faults of a :class:`~oasisclient.common.faults.Schedule` can be injected
+on the sockets, and it can serve over TLS.
+
+It also answers the few Keystone v3 calls a password login makes, so
+that a regular client can authenticate against it::
+
+    server = FakeOasisServer()
+    server.start()
+    server.seed('functions', 1000, {'name': 'function-{n}'})
+    cs = client.Client(username='demo', password='demo',
+                       project_name='demo', auth_url=server.auth_url)
+    ...
+    server.stop()
+
+or, from a shell, ``python -m oasisclient.fakeserver --port 9417``.
+
+Deployed functions are stood in for by an echo, under /invoke/: give an
+endpoint the URL ``server.base_url + '/invoke/<name>'`` and calls to it
+are answered with their method and JSON payload.
+"""
+
+from __future__ import print_function
+
+import argparse
+import collections
+import hashlib
+import json
+import logging
+import os
+import random
+import shutil
+import socket
+import ssl
+import struct
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import jsonpatch
+import six
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+import six.moves.urllib.parse as urlparse
+
+LOG = logging.getLogger(__name__)
+
+# Collections of the v1 managers.
+COLLECTIONS = ('endpoints', 'functions', 'httpapis', 'nodepool_policies',
+               'nodepools', 'requestheaders', 'requests', 'responsecodes',
+               'responsemessages', 'responses')
+
+# The policy is a single object rather than a collection.
+POLICY = 'policy'
+
+# Prefix of the paths echoing function invocations.
+INVOKE = 'invoke'
+
+# Service types the catalog lists the API under.
+SERVICE_TYPES = ('function', 'container-infra')
+
+DEFAULT_PAGE_SIZE = 50
+MAX_LIMIT = 1000
+
+_LIST_PARAMS = ('limit', 'marker', 'sort_key', 'sort_dir')
+
+# Seconds of response body written at once under a bandwidth cap.
+THROTTLE_INTERVAL = 0.05
+
+
+class Route(object):
+    """How the server behaves on a route.
+
+    :param latency: seconds added before answering, or a ``(low, high)``
+        tuple to draw it uniformly from.
+    :param errors: `dict` of the probability of answering with each
+        status instead, e.g. ``{429: 0.05, 503: 0.01}``.
+    :param retry_after: Retry-After header of the injected errors.
+    :param payload_size: bytes of padding added to every object returned,
+        in a 'padding' attribute.
+    """
+
+    def __init__(self, latency=0, errors=None, retry_after=1,
+                 payload_size=0):
+        self.latency = latency
+        self.errors = errors or {}
+        self.retry_after = retry_after
+        self.payload_size = payload_size
+
+    def delay(self, rand):
+        if isinstance(self.latency, (tuple, list)):
+            return rand.uniform(*self.latency)
+        return self.latency
+
+    def error(self, rand):
+        point = rand.random()
+        for status, probability in sorted(self.errors.items()):
+            if point < probability:
+                return status
+            point -= probability
+        return None
+
+
+class _HTTPServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def handle_error(self, request, client_address):
+        # Mostly clients dropping keep-alive connections.
+        LOG.debug('Error serving %s', client_address, exc_info=True)
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers are written one by one; with Nagle's algorithm, each
+    # response would wait for the client's delayed ACK.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _dispatch(self):
+        self.server.api._handle(self)
+
+    do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = do_HEAD = _dispatch
+
+
+class _Error(Exception):
+
+    def __init__(self, status, message, headers=None):
+        super(_Error, self).__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+class FakeOasisServer(object):
+    """Threaded HTTP server holding the v1 collections in memory.
+
+    :param host: address to listen on.
+    :param port: port to listen on, 0 for any free one.
+    :param page_size: number of objects of a page when the request gives
+        no limit.
+    :param max_limit: largest page served, whatever the limit asked for.
+    :param tls: serve HTTPS; either True, for a self-signed certificate
+        written to :attr:`ca_file`, or a ``(certfile, keyfile)`` tuple.
+    :param seed: seed of the injected latencies and errors.
+    :param faults: :class:`~oasisclient.common.faults.Schedule` of the
+        faults to inject, on top of those of the routes; it can be set
+        as :attr:`faults` later on too.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0,
+                 page_size=DEFAULT_PAGE_SIZE, max_limit=MAX_LIMIT,
+                 tls=False, seed=None, faults=None):
+        self.page_size = page_size
+        self.max_limit = max_limit
+        self.data = dict((name, collections.OrderedDict())
+                         for name in COLLECTIONS)
+        self.policy = {'id': str(uuid.uuid4())}
+        self.requests = collections.Counter()
+        self.faults = faults
+        self._versions = {}
+        self._routes = {}
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._serial = 0
+        self._tmpdir = None
+        self.ca_file = None
+
+        self.httpd = _HTTPServer((host, port), _Handler)
+        self.httpd.api = self
+        self.scheme = 'http'
+        if tls:
+            if tls is True:
+                certfile, keyfile = self._self_signed(host)
+            else:
+                certfile, keyfile = tls
+            context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+            context.load_cert_chain(certfile, keyfile)
+            self.httpd.socket = context.wrap_socket(self.httpd.socket,
+                                                    server_side=True)
+            self.scheme = 'https'
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return '%s://%s:%d' % (self.scheme, host, port)
+
+    @property
+    def endpoint(self):
+        """URL of the v1 API, as the catalog lists it."""
+        return self.base_url + '/v1'
+
+    @property
+    def auth_url(self):
+        return self.base_url + '/v3'
+
+    def _self_signed(self, host):
+        from cryptography.hazmat.backends import default_backend
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives import serialization
+        from cryptography import x509
+        from cryptography.x509.oid import NameOID
+        import datetime
+        import ipaddress
+
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048,
+                                       backend=default_backend())
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME,
+                                             six.text_type(host))])
+        try:
+            alt_name = x509.IPAddress(ipaddress.ip_address(
+                six.text_type(host)))
+        except ValueError:
+            alt_name = x509.DNSName(six.text_type(host))
+        now = datetime.datetime.utcnow()
+        cert = x509.CertificateBuilder().subject_name(name).issuer_name(
+            name).public_key(key.public_key()).serial_number(
+            x509.random_serial_number()).not_valid_before(
+            now - datetime.timedelta(days=1)).not_valid_after(
+            now + datetime.timedelta(days=7)).add_extension(
+            x509.SubjectAlternativeName([alt_name]), critical=False).sign(
+            key, hashes.SHA256(), default_backend())
+
+        self._tmpdir = tempfile.mkdtemp(prefix='oasis-fakeserver-')
+        certfile = os.path.join(self._tmpdir, 'cert.pem')
+        keyfile = os.path.join(self._tmpdir, 'key.pem')
+        with open(certfile, 'wb') as f:
+            f.write(cert.public_bytes(serialization.Encoding.PEM))
+        with open(keyfile, 'wb') as f:
+            f.write(key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.TraditionalOpenSSL,
+                serialization.NoEncryption()))
+        self.ca_file = certfile
+        return certfile, keyfile
+
+    def start(self):
+        """Serve in a background thread."""
+        self._thread = threading.Thread(target=self.httpd.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+        if self._tmpdir:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # Content
+
+    def configure(self, collection=None, method=None, **kwargs):
+        """Set how the server behaves on a route.
+
+        :param collection: collection the route applies to, e.g.
+            'functions', None for all of them.
+        :param method: HTTP method the route applies to, None for all.
+        :param kwargs: see :class:`Route`.
+        """
+        self._routes[(method, collection)] = Route(**kwargs)
+
+    def _route(self, method, collection):
+        for key in ((method, collection), (None, collection),
+                    (method, None), (None, None)):
+            if key in self._routes:
+                return self._routes[key]
+        return None
+
+    def add(self, collection, obj):
+        """Store an object, giving it an ID if it has none."""
+        with self._lock:
+            return self._store(collection, dict(obj))
+
+    def seed(self, collection, count, template=None):
+        """Add `count` objects made from `template`.
+
+        '{n}' in the strings of the template is replaced by the number of
+        the object.
+        """
+        template = template or {'name': '%s-{n}' % collection}
+        with self._lock:
+            for n in range(count):
+                self._store(collection, dict(
+                    (key, value.replace('{n}', str(n))
+                     if isinstance(value, six.string_types) else value)
+                    for (key, value) in template.items()))
+
+    def _store(self, collection, obj):
+        self._serial += 1
+        obj.setdefault('id', str(uuid.uuid4()))
+        now = time.strftime('%Y-%m-%dT%H:%M:%S+00:00', time.gmtime())
+        obj.setdefault('created_at', now)
+        obj.setdefault('updated_at', None)
+        self.data[collection][obj['id']] = obj
+        self._versions[obj['id']] = self._serial
+        return obj
+
+    def _etag(self, obj):
+        digest = hashlib.md5(('%s:%s' % (obj['id'], self._versions.get(
+            obj['id'], 0))).encode('utf-8')).hexdigest()
+        return '"%s"' % digest
+
+    # Requests
+
+    def _handle(self, handler):
+        parsed = urlparse.urlsplit(handler.path)
+        parts = [part for part in parsed.path.split('/') if part]
+        query = dict(urlparse.parse_qsl(parsed.query))
+        method = handler.command
+        collection = parts[1] if len(parts) > 1 else None
+        with self._lock:
+            self.requests[(method, collection)] += 1
+            route = self._route(method, collection)
+            delay = route.delay(self._random) if route else 0
+            error = route.error(self._random) if route else None
+        fault = self.faults.draw(method, parsed.path) if self.faults else None
+        if fault:
+            delay += fault.delay
+        if delay:
+            time.sleep(delay)
+        if fault and fault.reset:
+            self._reset(handler)
+            return
+
+        try:
+            body = self._read_body(handler)
+            if error:
+                raise _Error(error, 'Injected error',
+                             {'Retry-After': str(route.retry_after)})
+            if fault and fault.status:
+                raise _Error(fault.status, 'Injected error',
+                             {} if fault.retry_after is None else
+                             {'Retry-After': str(fault.retry_after)})
+            if parts[:1] == ['v3']:
+                status, headers, result = self._identity(parts, body)
+            elif parts[:1] == ['v1'] and collection == POLICY:
+                status, headers, result = self._policy(method, body)
+            elif parts[:1] == ['v1'] and collection in self.data:
+                obj_id = parts[2] if len(parts) > 2 else None
+                if obj_id == 'detail':
+                    obj_id = None
+                status, headers, result = self._collection(
+                    handler, method, collection, obj_id, query, body)
+            elif parts[:1] == [INVOKE]:
+                status, headers = 200, {}
+                result = {'function': '/'.join(parts[1:]),
+                          'method': method, 'payload': body}
+            elif not parts or parts == ['v1']:
+                status, headers, result = 200, {}, {'versions': []}
+            else:
+                raise _Error(404, 'No route to %s' % parsed.path)
+        except _Error as e:
+            status, headers = e.status, e.headers
+            result = {'errors': [{'status': e.status,
+                                  'title': e.message,
+                                  'detail': e.message}]}
+
+        if route and route.payload_size and isinstance(result, dict):
+            result = self._pad(result, collection, route.payload_size)
+        if fault and fault.drop:
+            self._reset(handler)
+            return
+        self._respond(handler, status, headers, result,
+                      fault.bandwidth if fault else None)
+
+    @staticmethod
+    def _reset(handler):
+        # With a zero linger time, closing sends a RST rather than a FIN.
+        handler.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER,
+                                      struct.pack('ii', 1, 0))
+        handler.connection.close()
+        handler.close_connection = True
+
+    @staticmethod
+    def _read_body(handler):
+        length = int(handler.headers.get('Content-Length') or 0)
+        if not length:
+            return None
+        data = handler.rfile.read(length)
+        try:
+            return json.loads(data.decode('utf-8'))
+        except ValueError:
+            raise _Error(400, 'Invalid JSON body')
+
+    @staticmethod
+    def _pad(result, collection, size):
+        padding = 'x' * size
+        if collection in result and isinstance(result[collection], list):
+            result = dict(result)
+            result[collection] = [dict(obj, padding=padding)
+                                  for obj in result[collection]]
+        elif 'id' in result:
+            result = dict(result, padding=padding)
+        return result
+
+    @staticmethod
+    def _respond(handler, status, headers, result, bandwidth=None):
+        data = b''
+        if result is not None and status not in (204, 304):
+            data = json.dumps(result).encode('utf-8')
+        handler.send_response(status)
+        if data:
+            handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        if handler.command == 'HEAD':
+            return
+        if not bandwidth:
+            handler.wfile.write(data)
+            return
+        step = max(1, int(bandwidth * THROTTLE_INTERVAL))
+        for start in range(0, len(data), step):
+            chunk = data[start:start + step]
+            handler.wfile.write(chunk)
+            handler.wfile.flush()
+            time.sleep(len(chunk) / float(bandwidth))
+
+    def _collection(self, handler, method, collection, obj_id, query, body):
+        with self._lock:
+            objects = self.data[collection]
+            if obj_id is None:
+                if method == 'GET':
+                    return self._list(collection, query)
+                if method == 'POST':
+                    if not isinstance(body, dict):
+                        raise _Error(400, 'Expected an object')
+                    obj = self._store(collection, dict(body))
+                    return 201, {'ETag': self._etag(obj),
+                                 'Location': '%s/%s/%s' % (
+                                     self.endpoint, collection,
+                                     obj['id'])}, obj
+                raise _Error(405, 'Method not allowed')
+
+            obj = objects.get(obj_id)
+            if obj is None:
+                raise _Error(404, '%s %s could not be found' %
+                             (collection, obj_id))
+            etag = self._etag(obj)
+            if method == 'GET':
+                if handler.headers.get('If-None-Match') == etag:
+                    return 304, {'ETag': etag}, None
+                return 200, {'ETag': etag}, obj
+            if_match = handler.headers.get('If-Match')
+            if if_match and if_match not in ('*', etag):
+                raise _Error(412, 'The object changed since %s' % if_match)
+            if method in ('PATCH', 'PUT'):
+                obj = self._modify(obj, body)
+                objects[obj_id] = obj
+                self._serial += 1
+                self._versions[obj_id] = self._serial
+                return 200, {'ETag': self._etag(obj)}, obj
+            if method == 'DELETE':
+                del objects[obj_id]
+                self._versions.pop(obj_id, None)
+                return 204, {}, None
+            raise _Error(405, 'Method not allowed')
+
+    @staticmethod
+    def _modify(obj, body):
+        if isinstance(body, list):
+            try:
+                updated = jsonpatch.apply_patch(obj, body)
+            except (jsonpatch.JsonPatchException,
+                    jsonpatch.JsonPointerException) as e:
+                raise _Error(400, 'Invalid patch: %s' % e)
+        elif isinstance(body, dict):
+            updated = dict(obj, **body)
+        else:
+            raise _Error(400, 'Expected a JSON patch or an object')
+        updated['id'] = obj['id']
+        updated['updated_at'] = time.strftime('%Y-%m-%dT%H:%M:%S+00:00',
+                                              time.gmtime())
+        return updated
+
+    def _list(self, collection, query):
+        objects = [obj for obj in self.data[collection].values()
+                   if all(six.text_type(obj.get(key)) == value
+                          for (key, value) in query.items()
+                          if key not in _LIST_PARAMS)]
+        sort_key = query.get('sort_key')
+        if sort_key:
+            objects.sort(key=lambda obj: (obj.get(sort_key) is None,
+                                          obj.get(sort_key)),
+                         reverse=query.get('sort_dir') == 'desc')
+        marker = query.get('marker')
+        if marker:
+            ids = [obj['id'] for obj in objects]
+            if marker not in ids:
+                raise _Error(400, 'Marker %s not found' % marker)
+            objects = objects[ids.index(marker) + 1:]
+
+        try:
+            limit = int(query.get('limit') or 0)
+        except ValueError:
+            raise _Error(400, 'Invalid limit')
+        limit = min(limit or self.page_size, self.max_limit)
+        page = objects[:limit]
+        result = {collection: page}
+        if len(objects) > limit:
+            params = dict(query, limit=str(limit), marker=page[-1]['id'])
+            result['next'] = '%s/%s?%s' % (self.endpoint, collection,
+                                           urlparse.urlencode(
+                                               sorted(params.items())))
+        return 200, {}, result
+
+    def _policy(self, method, body):
+        with self._lock:
+            if method == 'GET':
+                return 200, {}, self.policy
+            if method in ('PATCH', 'PUT'):
+                self.policy = self._modify(self.policy, body)
+                return 200, {}, self.policy
+            if method == 'DELETE':
+                return 204, {}, None
+        raise _Error(405, 'Method not allowed')
+
+    # Keystone
+
+    def _identity(self, parts, body):
+        if parts == ['v3']:
+            return 200, {}, {'version': {
+                'id': 'v3.8', 'status': 'stable',
+                'updated': '2017-02-22T00:00:00Z',
+                'links': [{'rel': 'self', 'href': self.auth_url + '/'}],
+                'media-types': [{
+                    'base': 'application/json',
+                    'type': 'application/vnd.openstack.identity-v3+json'}]}}
+        if parts == ['v3', 'auth', 'tokens']:
+            return 201, {'X-Subject-Token': uuid.uuid4().hex}, self._token(
+                body or {})
+        raise _Error(404, 'No route to /%s' % '/'.join(parts))
+
+    def _token(self, body):
+        auth = body.get('auth', {})
+        user = auth.get('identity', {}).get('password', {}).get('user', {})
+        scope = auth.get('scope', {}).get('project', {})
+        domain = {'id': 'default', 'name': 'Default'}
+        now = time.time()
+        endpoints = [{'id': uuid.uuid4().hex, 'interface': interface,
+                      'region': 'RegionOne', 'region_id': 'RegionOne',
+                      'url': self.endpoint}
+                     for interface in ('public', 'internal', 'admin')]
+        return {'token': {
+            'methods': ['password'],
+            'issued_at': time.strftime('%Y-%m-%dT%H:%M:%S.000000Z',
+                                       time.gmtime(now)),
+            'expires_at': time.strftime('%Y-%m-%dT%H:%M:%S.000000Z',
+                                        time.gmtime(now + 3600)),
+            'user': {'id': user.get('id') or uuid.uuid4().hex,
+                     'name': user.get('name') or 'demo', 'domain': domain},
+            'project': {'id': scope.get('id') or uuid.uuid4().hex,
+                        'name': scope.get('name') or 'demo',
+                        'domain': domain},
+            'roles': [{'id': uuid.uuid4().hex, 'name': 'member'}],
+            'catalog': [{'id': uuid.uuid4().hex, 'type': service_type,
+                         'name': 'oasis', 'endpoints': endpoints}
+                        for service_type in SERVICE_TYPES],
+        }}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Serve a stand-in Oasis API until interrupted.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument('--seed', metavar='COLLECTION=COUNT',
+                        action='append', default=[],
+                        help='Add COUNT objects to COLLECTION; repeatable.')
+    parser.add_argument('--latency', type=float, default=0,
+                        help='Seconds added to every response.')
+    parser.add_argument('--error-rate', type=float, default=0,
+                        help='Probability of answering 503.')
+    parser.add_argument('--throttle-rate', type=float, default=0,
+                        help='Probability of answering 429.')
+    parser.add_argument('--payload-size', type=int, default=0,
+                        help='Bytes of padding added to every object.')
+    parser.add_argument('--faults', metavar='FILE',
+                        help='JSON schedule of the faults to inject, see '
+                             'oasisclient.common.faults.')
+    parser.add_argument('--tls', action='store_true',
+                        help='Serve HTTPS with a self-signed certificate.')
+    args = parser.parse_args(argv)
+
+    schedule = None
+    if args.faults:
+        # Imported here, the server itself only needs a Schedule object.
+        from oasisclient.common import faults
+        schedule = faults.Schedule.load(args.faults)
+    server = FakeOasisServer(args.host, args.port, page_size=args.page_size,
+                             tls=args.tls,
+                             faults=schedule)
+    server.configure(latency=args.latency,
+                     errors={503: args.error_rate, 429: args.throttle_rate},
+                     payload_size=args.payload_size)
+    for item in args.seed:
+        collection, _sep, count = item.partition('=')
+        server.seed(collection, int(count or 1))
+    print('Serving the Oasis API on %s, Keystone on %s' %
+          (server.endpoint, server.auth_url))
+    if server.ca_file:
+        print('CA certificate: %s' % server.ca_file)
+    sys.stdout.flush()
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        if server._tmpdir:
+            shutil.rmtree(server._tmpdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
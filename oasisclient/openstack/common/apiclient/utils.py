@@ -70,14 +70,18 @@ def find_resource(manager, name_or_id, **find_args):
             pass
 
     try:
-        try:
-            return manager.find(human_id=name_or_id, **find_args)
-        except exceptions.NotFound:
-            pass
+        resource = getattr(manager, 'resource_class', None)
+
+        # human_id is always None unless the resource enables it, so don't
+        # pay for a listing that can't match anything
+        if getattr(resource, 'HUMAN_ID', True):
+            try:
+                return manager.find(human_id=name_or_id, **find_args)
+            except exceptions.NotFound:
+                pass
 
         # finally try to find entity by name
         try:
-            resource = getattr(manager, 'resource_class', None)
             name_attr = resource.NAME_ATTR if resource else 'name'
             kwargs = {name_attr: name_or_id}
             kwargs.update(find_args)
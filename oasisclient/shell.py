@@ -1,13 +1,22 @@
 
 import argparse
+import hashlib
+import json
+import os
+import shlex
 import sys
 import logging
+import threading
+import time
 from oslo_utils import encodeutils
 from oslo_utils import importutils
 import six
 from oasisclient import version
 from oasisclient.v1 import shell as shell_v1
 from oasisclient.common import cliutils
+from oasisclient.common import concurrency
+from oasisclient.common import pagination
+from oasisclient.common import utils
 from oasisclient.common.apiclient import exceptions
 from oasisclient.common.apiclient.exceptions import *
 from oasisclient import exceptions as exc
@@ -17,9 +26,23 @@ from oasisclient.i18n import _
 DEFAULT_API_VERSION = '1'
 DEFAULT_INTERFACE = 'public'
 DEFAULT_SERVICE_TYPE = 'container-infra'
+DEFAULT_PROFILE = 'oasis.prof'
+COMMAND_PHASE = 'command'
 
 logger = logging.getLogger(__name__)
 
+
+def _page_size(value):
+    """Type of --max-page-size, which cannot go below the tuner's minimum."""
+    try:
+        size = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid page size: '%s'" % value)
+    if size < pagination.MIN_LIMIT:
+        raise argparse.ArgumentTypeError(
+            'page size must be at least %d' % pagination.MIN_LIMIT)
+    return size
+
 class OasisClientArgumentParser(argparse.ArgumentParser):
 
     def __init__(self, *args, **kwargs):
@@ -47,6 +70,44 @@ class HelpFormatter(argparse.HelpFormatter):
         heading = '%s%s' % (heading[0].upper(), heading[1:])
         super(HelpFormatter, self).start_section(heading)
 
+class _CapturedOutput(object):
+    """Stands for stdout, keeping what some threads print for later.
+
+    A thread which calls :meth:`capture` gets its output buffered until it
+    calls :meth:`release`, so that commands running in parallel do not
+    print over each other.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+    def capture(self):
+        self.local.chunks = []
+
+    def release(self):
+        chunks, self.local.chunks = self.local.chunks, None
+        with self.lock:
+            for chunk in chunks:
+                self.stream.write(chunk)
+            self.stream.flush()
+
+    def write(self, data):
+        chunks = getattr(self.local, 'chunks', None)
+        if chunks is None:
+            self.stream.write(data)
+        else:
+            chunks.append(data)
+
+    def flush(self):
+        if getattr(self.local, 'chunks', None) is None:
+            self.stream.flush()
+
+
 class OasisShell(object):
     def _setup_logging(selfself, debug):
         log_lvl = logging.DEBUG if debug else logging.WARNING
@@ -197,6 +258,82 @@ class OasisShell(object):
         parser.add_argument('--bypass_url',
                             help=argparse.SUPPRESS)
 
+        parser.add_argument('--no-cache',
+                            action='store_true',
+                            default=False,
+                            help='Do not keep name to ID lookups cached '
+                                 'between runs.')
+
+        parser.add_argument('--page-latency',
+                            metavar='<seconds>',
+                            type=float,
+                            default=cliutils.env('OASIS_PAGE_LATENCY',
+                                                 default=None),
+                            help='Adapt the page size of listings so that '
+                                 'a page takes about this long. '
+                                 'Defaults to env[OASIS_PAGE_LATENCY].')
+
+        parser.add_argument('--max-page-size',
+                            metavar='<limit>',
+                            type=_page_size,
+                            default=1000,
+                            help='Largest page size used by --page-latency.')
+
+        parser.add_argument('--timings',
+                            action='store_true',
+                            default=False,
+                            help='Print where the time of the command went, '
+                                 'phase by phase and request by request, '
+                                 'to stderr.')
+
+        parser.add_argument('--faults',
+                            metavar='<file>',
+                            default=None,
+                            help='Inject the faults of a JSON schedule into '
+                                 'the API requests, see '
+                                 'oasisclient.common.faults.')
+
+        parser.add_argument('--record',
+                            metavar='<file>',
+                            default=None,
+                            help='Record the API requests of the command, '
+                                 'and their responses, into a file. '
+                                 'Implies --no-cache.')
+
+        parser.add_argument('--replay',
+                            metavar='<file>',
+                            default=None,
+                            help='Answer the API requests of the command '
+                                 'from a --record file, without logging '
+                                 'in. Implies --no-cache.')
+
+        parser.add_argument('--replay-timing',
+                            metavar='<timing>',
+                            default='original',
+                            help='How long replayed requests take: '
+                                 'original, as recorded; zero, no time at '
+                                 'all; or scaled, as recorded times '
+                                 '--replay-scale.')
+
+        parser.add_argument('--replay-scale',
+                            metavar='<factor>',
+                            type=float,
+                            default=1.0,
+                            help='Factor of the recorded durations, with '
+                                 '--replay-timing scaled.')
+
+        parser.add_argument('--profile',
+                            metavar='<file>',
+                            nargs='?',
+                            const=DEFAULT_PROFILE,
+                            default=None,
+                            help='Profile the command into a file, %s when '
+                                 'given as a bare --profile. Files ending '
+                                 'in .collapsed or .folded get sampled, '
+                                 'flamegraph compatible, collapsed stacks; '
+                                 'others cProfile statistics.' %
+                                 DEFAULT_PROFILE)
+
         return parser
 
     def _add_bash_completion_subparser(self, subparsers):
@@ -208,8 +345,17 @@ class OasisShell(object):
         self.subcommands['bash_completion'] = subparser
         subparser.set_defaults(func=self.do_bash_completion)
 
-    def get_subcommand_parser(self, version):
-        parser = self.get_base_parser()
+    def get_subcommand_parser(self, version, parser=None):
+        """Return the parser of all the commands.
+
+        Commands are only registered with their name and help; the rest of
+        their arguments is added by :meth:`_load_command` once one is
+        selected, see :meth:`parse_args`.
+
+        :param parser: the base parser to add the commands to, a new one
+            by default.
+        """
+        parser = parser or self.get_base_parser()
 
         self.subcommands = {}
         subparsers = parser.add_subparsers(metavar='<subcommand>')
@@ -221,14 +367,130 @@ class OasisShell(object):
         except KeyError:
             actions_modules = shell_v1.COMMAND_MODULES
 
-        for actions_module in actions_modules:
-            self._find_actions(subparsers, actions_module)
+        self._actions_modules = actions_modules
+        self._commands = self._command_table(actions_modules)
+        self._loaded = set()
+        for command in sorted(self._commands):
+            entry = self._commands[command]
+            subparser = (
+                subparsers.add_parser(command,
+                                      help=entry['description'].strip(),
+                                      description=entry['description'],
+                                      add_help=False,
+                                      formatter_class=OpenStackHelpFormatter)
+            )
+            subparser.set_defaults(_command=command)
+            self.subcommands[command] = subparser
         self._find_actions(subparsers, self)
 
         self._add_bash_completion_subparser(subparsers)
 
         return parser
 
+    @staticmethod
+    def _command_table_file(actions_modules):
+        # Besides the version, the modification times of the modules
+        # catch changes made in a development tree.
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        stamps = []
+        for name in actions_modules:
+            module_file = os.path.join(root, *name.split('.')) + '.py'
+            if os.path.exists(module_file):
+                stamps.append('%d' % os.path.getmtime(module_file))
+        key = hashlib.sha1(encodeutils.safe_encode(
+            ' '.join(list(actions_modules) + stamps))).hexdigest()[:8]
+        return os.path.join(utils.cache_dir('commands'), '%s-%s.json' % (
+            version.version_info.version_string(), key))
+
+    def _command_table(self, actions_modules, refresh=False):
+        """Return the module, function and docstring of every command.
+
+        The table is cached on disk per package version, so that the
+        command modules are not imported to build the parser.
+        """
+        try:
+            path = self._command_table_file(actions_modules)
+        except (IOError, OSError):
+            path = None
+        if path and not refresh:
+            try:
+                with open(path) as f:
+                    return json.load(f)
+            except (IOError, OSError, ValueError):
+                pass
+
+        table = {}
+        for module_name in actions_modules:
+            module = importutils.import_module(module_name)
+            for attr in (a for a in dir(module) if a.startswith('do_')):
+                # I prefer to be hyphen-separated instead of underscores.
+                command = attr[3:].replace('_', '-')
+                table[command] = {
+                    'module': module_name,
+                    'function': attr,
+                    'description': getattr(module, attr).__doc__ or '',
+                }
+        if path:
+            try:
+                utils.write_file_atomic(path, json.dumps(table))
+            except (IOError, OSError) as e:
+                logger.debug('Could not save the command table: %s', e)
+        return table
+
+    def _load_command(self, command):
+        """Add the arguments of a command to its parser."""
+        entry = self._commands.get(command)
+        if entry is None or command in self._loaded:
+            return
+        module = importutils.import_module(entry['module'])
+        callback = getattr(module, entry['function'], None)
+        if callback is None:
+            # Stale cache, e.g. in a development tree.
+            self._commands = self._command_table(self._actions_modules,
+                                                 refresh=True)
+            raise exc.CommandError("'%s' is not a valid subcommand" % command)
+
+        subparser = self.subcommands[command]
+        subparser.add_argument('-h', '--help',
+                               action='help',
+                               help=argparse.SUPPRESS,)
+        for (args, kwargs) in getattr(callback, 'arguments', []):
+            subparser.add_argument(*args, **kwargs)
+        subparser.set_defaults(func=callback)
+        self._loaded.add(command)
+
+    def _bare_profile(self, argv):
+        """Give a bare --profile followed by the command its default file.
+
+        It would take the command for its file name otherwise. Only the
+        global options, before the command, are looked at.
+        """
+        actions = self.parser._option_string_actions
+        argv = list(argv)
+        i = 0
+        while i < len(argv) and argv[i].startswith('-') and argv[i] != '--':
+            action = actions.get(argv[i])
+            takes_value = action is not None and action.nargs not in (0, '?')
+            if argv[i] == '--profile' and i + 1 < len(argv):
+                if argv[i + 1] in self.subcommands:
+                    argv[i] = '--profile=' + DEFAULT_PROFILE
+                else:
+                    takes_value = not argv[i + 1].startswith('-')
+            i += 2 if takes_value else 1
+        return argv
+
+    def parse_args(self, argv):
+        """Parse a command line with the parser of all the commands.
+
+        A first pass finds the command, whose arguments are then loaded
+        before the actual parsing.
+        """
+        known, _unknown = self.parser.parse_known_args(argv)
+        command = getattr(known, '_command', None)
+        if command:
+            self._load_command(command)
+        return self.parser.parse_args(argv)
+
     def setup_debugging(self, debug):
         if debug:
             streamformat = "%(levelname)s (%(module)s:%(lineno)d) %(message)s"
@@ -270,6 +532,8 @@ class OasisShell(object):
         # NOTE(Christoph Jansen): With Python 3.4 argv somehow becomes a Map.
         #                         This hack fixes it.
         argv = list(argv)
+        started = time.time()
+        self.argv = argv
 
         # Parse args once to find version and debug settings
         parser = self.get_base_parser()
@@ -284,8 +548,10 @@ class OasisShell(object):
             spot = argv.index('--endpoint_type')
             argv[spot] = '--endpoint-type'
 
+        # The commands are added to the same parser, instead of building
+        # the base parser a second time.
         subcommand_parser = (
-            self.get_subcommand_parser(options.oasis_api_version)
+            self.get_subcommand_parser(options.oasis_api_version, parser)
         )
         self.parser = subcommand_parser
 
@@ -293,7 +559,7 @@ class OasisShell(object):
             subcommand_parser.print_help()
             return 0
 
-        args = subcommand_parser.parse_args(argv)
+        args = self.parse_args(self._bare_profile(argv))
 
         # Short-circuit and deal with help right away.
         # NOTE(jamespage): args.func is not guaranteed with python >= 3.4
@@ -304,6 +570,26 @@ class OasisShell(object):
             self.do_bash_completion(args)
             return 0
 
+        # Like the modules only some options need, imported here rather
+        # than at the top, which is loaded before the command table.
+        from oasisclient.common import timing
+        from oasisclient import daemon
+
+        timings = timing.Timings()
+        timings.add_phase('imports', started - daemon.STARTED)
+        timings.add_phase('argument parsing', time.time() - started)
+        try:
+            if args.profile:
+                from oasisclient.common import profiling
+                with profiling.profile(args.profile):
+                    return self._execute(args, options, timings)
+            return self._execute(args, options, timings)
+        finally:
+            if args.timings:
+                timings.report(sys.stderr, COMMAND_PHASE)
+
+    def _execute(self, args, options, timings):
+        """Create the client and run the command of `args` with it."""
         if not args.service_type:
             args.service_type = DEFAULT_SERVICE_TYPE
 
@@ -313,7 +599,7 @@ class OasisShell(object):
         args.os_project_id = (args.os_project_id or args.os_tenant_id)
         args.os_project_name = (args.os_project_name or args.os_tenant_name)
 
-        if not cliutils.isunauthenticated(args.func):
+        if not (cliutils.isunauthenticated(args.func) or args.replay):
             if (not (args.os_token and
                      (args.os_auth_url or args.os_endpoint_override)) and
                 not args.os_cloud
@@ -348,29 +634,232 @@ class OasisShell(object):
         except KeyError:
             client = client_v1
 
-        # print args
-
-        self.cs = client.Client(
-            cloud=args.os_cloud,
-            user_id=args.os_user_id,
-            username=args.os_username,
-            password=args.os_password,
-            auth_token=args.os_token,
-            project_id=args.os_project_id,
-            project_name=args.os_project_name,
-            user_domain_id=args.os_user_domain_id,
-            user_domain_name=args.os_user_domain_name,
-            project_domain_id=args.os_project_domain_id,
-            project_domain_name=args.os_project_domain_name,
-            auth_url=args.os_auth_url,
-            service_type=args.service_type,
-            # region_name=args.os_region_name,
-            # oasis_url=args.os_endpoint_override,
-            # interface=args.os_interface,
-            # insecure=args.insecure,
-        )
+        if args.replay:
+            from oasisclient.common import replay
+            try:
+                transport = replay.ReplayTransport(
+                    args.replay, timing=args.replay_timing,
+                    scale=args.replay_scale)
+            except (IOError, ValueError) as e:
+                raise exc.CommandError('Cannot replay %s: %s' %
+                                       (args.replay, e))
+            self.cs = client.Client(http_client=transport)
+        else:
+            with timings.phase('authentication and endpoint lookup'):
+                self.cs = client.Client(
+                    cloud=args.os_cloud,
+                    user_id=args.os_user_id,
+                    username=args.os_username,
+                    password=args.os_password,
+                    input_auth_token=args.os_token,
+                    project_id=args.os_project_id,
+                    project_name=args.os_project_name,
+                    user_domain_id=args.os_user_domain_id,
+                    user_domain_name=args.os_user_domain_name,
+                    project_domain_id=args.os_project_domain_id,
+                    project_domain_name=args.os_project_domain_name,
+                    auth_url=args.os_auth_url,
+                    service_type=args.service_type,
+                    # region_name=args.os_region_name,
+                    # oasis_url=args.os_endpoint_override,
+                    # interface=args.os_interface,
+                    # insecure=args.insecure,
+                )
+
+        # Requests made or not depending on the state of the caches on disk
+        # would make recordings differ from their replays.
+        if not (args.no_cache or args.record or args.replay):
+            self.cs.enable_index_cache(self._cache_scope(args))
+        if args.page_latency:
+            self.cs.enable_page_tuning(target_latency=args.page_latency,
+                                       max_limit=args.max_page_size)
+
+        if args.timings:
+            self.cs.http_client.timings = timings
+        if args.faults:
+            from oasisclient.common import faults
+            try:
+                schedule = faults.Schedule.load(args.faults)
+            except (IOError, ValueError) as e:
+                raise exc.CommandError('Cannot load %s: %s' %
+                                       (args.faults, e))
+            self.cs.set_transport(faults.FaultTransport(self.cs.http_client,
+                                                        schedule))
+        if args.record:
+            from oasisclient.common import replay
+            self.cs.set_transport(replay.RecordingTransport(
+                self.cs.http_client, args.record))
 
-        args.func(self.cs, args)
+        try:
+            with timings.phase(COMMAND_PHASE):
+                return args.func(self.cs, args)
+        finally:
+            self.cs.flush_index_cache()
+            if args.record:
+                self.cs.http_client.close()
+
+    def _read_batch(self, path):
+        """Parse the commands of a batch file, one per line."""
+        if path == '-':
+            lines = sys.stdin.readlines()
+        else:
+            with open(path) as f:
+                lines = f.readlines()
+
+        commands = []
+        for number, line in enumerate(lines, 1):
+            line = encodeutils.safe_decode(line).strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                words = shlex.split(encodeutils.safe_encode(line)
+                                    if six.PY2 else line)
+                words = [encodeutils.safe_decode(word) for word in words]
+                if words[0] == 'oasis':
+                    words = words[1:]
+                args = self.parse_args(words)
+            except (ValueError, SystemExit):
+                raise exc.CommandError("Line %d: invalid command: %s" %
+                                       (number, line))
+            if getattr(args, 'func', None) == self.do_batch:
+                raise exc.CommandError("Line %d: batches cannot be "
+                                       "nested" % number)
+            commands.append((line, args))
+        return commands
+
+    def _run_one(self, cs, args):
+        if args.func in (self.do_help, self.do_bash_completion):
+            return args.func(args)
+        return args.func(cs, args)
+
+    @cliutils.arg('file',
+                  metavar='<file>',
+                  nargs='?',
+                  default='-',
+                  help='File with one command per line, without the leading '
+                       '"oasis"; defaults to stdin.')
+    @cliutils.arg('--parallel',
+                  metavar='<workers>',
+                  type=int,
+                  default=1,
+                  help='Number of commands run at once. The output of a '
+                       'command is printed once it is done.')
+    @cliutils.arg('--stop-on-error',
+                  action='store_true',
+                  default=False,
+                  help='Do not start any more commands once one failed.')
+    def do_batch(self, cs, args):
+        """Run many commands over a single authenticated session.
+
+        Every command is parsed before the first one runs. The status and
+        time of each command, then a summary, are printed to stderr.
+        """
+        commands = self._read_batch(args.file)
+        parallel = max(1, args.parallel)
+        stdout = sys.stdout
+        if parallel > 1:
+            sys.stdout = _CapturedOutput(stdout)
+            if hasattr(cs.http_client, 'set_pool_size'):
+                cs.http_client.set_pool_size(parallel)
+        failed = []
+
+        def run(command):
+            line, cmd_args = command
+            if parallel > 1:
+                sys.stdout.capture()
+            started = time.time()
+            error = None
+            try:
+                self._run_one(cs, cmd_args)
+            except (Exception, SystemExit) as e:
+                error = e
+            finally:
+                if parallel > 1:
+                    sys.stdout.release()
+            return time.time() - started, error
+
+        def pending():
+            for command in commands:
+                if failed and args.stop_on_error:
+                    return
+                yield command
+
+        started = time.time()
+        ran = 0
+        try:
+            for command, (elapsed, error), _exc in (
+                    concurrency.run_concurrently(run, pending(), parallel)):
+                line = command[0]
+                ran += 1
+                status = 'ok'
+                if error is not None:
+                    failed.append(line)
+                    status = 'FAILED: %s' % (six.text_type(error) or
+                                             type(error).__name__)
+                sys.stderr.write('%7.3fs %s ... %s\n' % (elapsed, line,
+                                                          status))
+        finally:
+            sys.stdout = stdout
+
+        sys.stderr.write('%d of %d commands run, %d failed, in %.3fs\n' %
+                         (ran, len(commands), len(failed),
+                          time.time() - started))
+        if failed:
+            raise exc.CommandError("%d of the commands failed." % len(failed))
+
+    @cliutils.arg('--socket',
+                  metavar='<path>',
+                  default=None,
+                  help='Socket to listen on; defaults to one per set of '
+                       'OS_* and OASIS_* environment variables, which is '
+                       'where the oasis command looks for a daemon.')
+    @cliutils.arg('--idle-timeout',
+                  metavar='<seconds>',
+                  type=float,
+                  default=3600,
+                  help='Exit after this long without a command; 0 to run '
+                       'until killed.')
+    def do_daemon(self, cs, args):
+        """Serve oasis commands on a local socket, over this session.
+
+        While the daemon runs, oasis commands started from the same
+        environment and without global options are forwarded to it, and
+        skip the imports, authentication and endpoint discovery. Global
+        options are only accepted along with --socket, since they would
+        otherwise apply to the commands forwarded from that environment.
+        """
+        if args.socket is None and self.argv[:1] != ['daemon']:
+            raise exc.CommandError(
+                'Global options cannot be given to a daemon on the default '
+                'socket; set them in the environment, or use --socket.')
+        from oasisclient import daemon
+        daemon.serve(self, cs, args.socket, args.idle_timeout or None)
+
+    def do_completion_refresh(self, cs, args):
+        """Refresh the names and IDs used by shell completion."""
+        from oasisclient import completion
+        data = {}
+        for key in completion.collections():
+            manager = cs.managers().get(key)
+            if manager is None:
+                continue
+            data[key] = [[obj.id, getattr(obj, 'name', None)]
+                         for obj in manager.iter_findall()]
+        path = completion.cache_file()
+        utils.cache_dir('completion')
+        try:
+            utils.write_file_atomic(path, json.dumps(data))
+        finally:
+            if os.path.exists(path + '.refreshing'):
+                os.unlink(path + '.refreshing')
+
+    @staticmethod
+    def _cache_scope(args):
+        """Return a key identifying the cloud, project and user in use."""
+        scope = '|'.join(six.text_type(value) for value in (
+            args.os_cloud, args.os_auth_url, args.os_user_id,
+            args.os_username, args.os_project_id, args.os_project_name))
+        return hashlib.sha1(encodeutils.safe_encode(scope)).hexdigest()
 
     def do_bash_completion(self, _args):
         """Prints arguments for bash-completion.
@@ -380,6 +869,8 @@ class OasisShell(object):
         """
         commands = set()
         options = set()
+        for command in self._commands:
+            self._load_command(command)
         for sc_str, sc in self.subcommands.items():
             commands.add(sc_str)
             for option in sc._optionals._option_string_actions.keys():
@@ -398,6 +889,7 @@ class OasisShell(object):
 
         if command:
             if args.command in self.subcommands:
+                self._load_command(args.command)
                 self.subcommands[args.command].print_help()
             else:
                 raise exc.CommandError("'%s' is not a valid subcommand" %
@@ -415,15 +907,17 @@ class OpenStackHelpFormatter(argparse.HelpFormatter):
 
 
 def main():
-    # from oasis.cmd import api
-    # api.main()
-   # try:
-    OasisShell().main(map(encodeutils.safe_decode, sys.argv[1:]))
-
-   # except Exception as e:
-   #     logger.debug(e, exc_info=1)
-   #     print("ERROR: %s" % encodeutils.safe_encode(six.text_type(e)))
-   #     sys.exit(1)
+    try:
+        return OasisShell().main(map(encodeutils.safe_decode, sys.argv[1:]))
+    except KeyboardInterrupt:
+        sys.stderr.write("... terminating oasis client\n")
+        sys.exit(130)
+    except Exception as e:
+        logger.debug(e, exc_info=1)
+        sys.stderr.write("ERROR: %s\n" %
+                         encodeutils.safe_encode(six.text_type(e)).decode(
+                             'utf-8'))
+        sys.exit(1)
 
 if __name__ == "__main__":
 
@@ -0,0 +1,134 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import itertools
+import uuid
+
+from oasisclient import exceptions
+from oasisclient import fakeserver
+from oasisclient.tests import utils
+
+
+class FindTest(utils.FakeServerTestCase):
+
+    def setUp(self):
+        super(FindTest, self).setUp()
+        self.server.seed('functions', fakeserver.DEFAULT_PAGE_SIZE * 3,
+                         {'name': 'fn-{n}', 'runtime': 'python'})
+
+    def _pages(self):
+        return self.server.requests[('GET', 'functions')]
+
+    def test_filters_on_the_server(self):
+        self.assertEqual('fn-120', self.cs.function.find(name='fn-120').name)
+        self.assertEqual(1, self._pages())
+
+    def test_matches_on_the_client(self):
+        obj = self.cs.function.create(name='other', runtime='go')
+        pages = self._pages()
+        self.assertEqual(obj.id, self.cs.function.find(runtime='go').id)
+        self.assertEqual(4, self._pages() - pages)
+        self.assertEqual([obj.id], [found.id for found in
+                                    self.cs.function.findall(
+                                        name='other', runtime='go')])
+
+    def test_not_unique(self):
+        self.assertRaises(exceptions.NoUniqueMatch, self.cs.function.find,
+                          runtime='python')
+        self.assertEqual(1, self._pages())
+        self.assertRaises(exceptions.NotFound, self.cs.function.find,
+                          name='nope')
+
+    def test_iter_findall_is_lazy(self):
+        objs = list(itertools.islice(self.cs.function.iter_findall(), 10))
+        self.assertEqual(10, len(objs))
+        self.assertEqual(1, self._pages())
+
+
+class GetManyTest(utils.FakeServerTestCase):
+
+    def setUp(self):
+        super(GetManyTest, self).setUp()
+        self.server.seed('functions', 5, {'name': 'fn-{n}'})
+        self.ids = sorted(self.server.data['functions'])
+
+    def test_get_many(self):
+        found, missing = self.cs.function.get_many(self.ids, max_workers=3)
+        self.assertEqual(set(self.ids), set(found))
+        self.assertEqual(self.ids[2], found[self.ids[2]].id)
+        self.assertEqual([], missing)
+
+    def test_missing(self):
+        unknown = str(uuid.uuid4())
+        found, missing = self.cs.function.get_many(
+            [self.ids[0], unknown, self.ids[0]])
+        self.assertEqual([self.ids[0]], list(found))
+        self.assertEqual([unknown], missing)
+
+    def test_error(self):
+        self.server.configure('functions', 'GET', errors={500: 1.0})
+        self.assertRaises(exceptions.InternalServerError,
+                          self.cs.function.get_many, self.ids)
+
+
+class UpdateFieldsTest(utils.FakeServerTestCase):
+
+    def setUp(self):
+        super(UpdateFieldsTest, self).setUp()
+        self.server.seed('nodepools', 1, {'name': 'pool', 'size': 1})
+        self.obj_id = list(self.server.data['nodepools'])[0]
+
+    def test_update_fields(self):
+        obj = self.cs.nodepool.update_fields(self.obj_id, {'size': 2})
+        self.assertEqual(2, obj.size)
+        self.assertEqual(2, self.server.data['nodepools'][self.obj_id]['size'])
+
+
+class ConditionalUpdateTest(utils.FakeServerTestCase):
+
+    def setUp(self):
+        super(ConditionalUpdateTest, self).setUp()
+        self.server.seed('functions', 1, {'name': 'fn', 'runtime': 'python'})
+        self.obj_id = list(self.server.data['functions'])[0]
+
+    def _patches(self):
+        return self.server.requests[('PATCH', 'functions')]
+
+    def test_nothing_to_change(self):
+        obj = self.cs.function.get(self.obj_id)
+        self.assertIs(obj, self.cs.function.update(self.obj_id, original=obj,
+                                                   runtime='python'))
+        self.assertIs(obj, self.cs.function.update(self.obj_id,
+                                                   runtime='python'))
+        self.assertEqual(0, self._patches())
+
+    def test_without_original(self):
+        obj = self.cs.function.update(self.obj_id, runtime='go')
+        self.assertEqual('go', obj.runtime)
+        self.assertEqual(1, self._patches())
+
+    def test_concurrent_update(self):
+        obj = self.cs.function.get(self.obj_id)
+        self.make_client().function.update(self.obj_id, runtime='go')
+        self.assertRaises(exceptions.PreconditionFailed,
+                          self.cs.function.update, self.obj_id,
+                          runtime='node')
+        self.assertEqual('go', self.server.data['functions'][self.obj_id][
+            'runtime'])
+
+        # The stale copy is dropped, so the next update goes through.
+        self.cs.function.update(self.obj_id, runtime='node')
+        self.assertEqual('node', self.server.data['functions'][self.obj_id][
+            'runtime'])
+        self.assertRaises(exceptions.PreconditionFailed,
+                          self.cs.function.update, self.obj_id,
+                          original=obj, runtime='ruby')
@@ -0,0 +1,80 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+
+import mock
+import six
+
+from oasisclient import exceptions
+from oasisclient import shell
+from oasisclient.tests import utils
+
+COUNT = 10
+
+
+class BatchTest(utils.FakeServerTestCase):
+
+    def setUp(self):
+        super(BatchTest, self).setUp()
+        self.server.seed('functions', COUNT, {'name': 'fn-{n}'})
+        self.patch_environment()
+        self.path = os.path.join(self.make_tempdir(), 'commands')
+
+    def _batch(self, lines, *options):
+        with open(self.path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        stdout, stderr = six.StringIO(), six.StringIO()
+        with mock.patch('sys.stdout', stdout), \
+                mock.patch('sys.stderr', stderr):
+            try:
+                shell.OasisShell().main(['batch', self.path] +
+                                        list(options))
+            finally:
+                self.stdout = stdout.getvalue()
+                self.stderr = stderr.getvalue()
+
+    def _lists(self):
+        return ['function-list --name fn-%d -f value' % n
+                for n in range(COUNT)]
+
+    def test_one_session(self):
+        logins = self.server.requests[('POST', 'auth')]
+        self._batch(['# comment', ''] + self._lists())
+        self.assertEqual(COUNT, len(self.stdout.splitlines()))
+        self.assertIn('%d of %d commands run, 0 failed' % (COUNT, COUNT),
+                      self.stderr)
+        self.assertEqual(logins + 1, self.server.requests[('POST', 'auth')])
+
+    def test_parallel(self):
+        self._batch(self._lists(), '--parallel', '4')
+        lines = self.stdout.splitlines()
+        self.assertEqual(COUNT, len(lines))
+        self.assertEqual(sorted('fn-%d' % n for n in range(COUNT)),
+                         sorted(line.split()[1] for line in lines))
+
+    def test_failure(self):
+        lines = ['function-delete unknown'] + self._lists()
+        self.assertRaises(exceptions.CommandError, self._batch, lines)
+        self.assertIn('%d of %d commands run, 1 failed' %
+                      (COUNT + 1, COUNT + 1), self.stderr)
+
+        self.assertRaises(exceptions.CommandError, self._batch, lines,
+                          '--stop-on-error')
+        self.assertIn('1 of %d commands run, 1 failed' % (COUNT + 1),
+                      self.stderr)
+
+    def test_parsed_upfront(self):
+        for line in ('function-list --unknown', 'batch other'):
+            self.assertRaises(exceptions.CommandError, self._batch,
+                              self._lists() + [line])
+        self.assertEqual(0, self.server.requests[('GET', 'functions')])
@@ -0,0 +1,88 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import unittest
+
+import mock
+
+from oasisclient.common import bench
+from oasisclient.tests import utils
+
+
+class HistogramTest(unittest.TestCase):
+
+    def setUp(self):
+        super(HistogramTest, self).setUp()
+        patcher = mock.patch.object(bench, 'hdrh', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_percentiles(self):
+        histogram = bench.Histogram()
+        for ms in range(100, 0, -1):
+            histogram.record(ms / 1000.0)
+        self.assertEqual(50000, histogram.percentile(50))
+        self.assertEqual(99000, histogram.percentile(99))
+        summary = histogram.summary()
+        self.assertEqual(100.0, summary['max'])
+        self.assertEqual(50.5, summary['mean'])
+        self.assertEqual(100, summary['count'])
+
+    def test_merge(self):
+        first, second = bench.Histogram(), bench.Histogram()
+        first.record(0.001)
+        second.record(0.003)
+        first.merge(second)
+        self.assertEqual(2, first.count)
+        self.assertEqual(3000, first.percentile(100))
+
+    def test_empty(self):
+        self.assertEqual(0.0, bench.Histogram().summary()['mean'])
+
+
+class BenchTest(utils.FakeServerTestCase):
+
+    def setUp(self):
+        super(BenchTest, self).setUp()
+        self.server.seed('functions', 5, {'name': 'fn-{n}'})
+
+    def test_run(self):
+        run = bench.Bench(self.cs.function,
+                          {'list': 1, 'get': 2, 'create': 2, 'update': 2,
+                           'delete': 1},
+                          template={'name': 'bench-{n}'}, seed=1)
+        report = run.run(workers=4, duration=None, requests=40)
+        operations = report['operations']
+        # Only a get or update racing a delete of the same object fails.
+        for op in ('list', 'create', 'delete'):
+            self.assertEqual({}, operations[op]['errors'])
+        for op in ('get', 'update'):
+            self.assertEqual(set(), set(operations[op]['errors']) -
+                             set(['404']))
+        self.assertEqual(40, report['requests'] +
+                         sum(op['skipped'] for op in operations.values()))
+        created = operations['create']['count']
+        deleted = operations['delete']['count']
+        self.assertEqual(5 + created - deleted,
+                         len(self.server.data['functions']))
+
+    def test_errors(self):
+        self.server.configure('functions', 'GET', errors={500: 1.0})
+        run = bench.Bench(self.cs.function, {'get': 1}, seed=1)
+        run._known = ['x']
+        run._prepare = lambda: None
+        report = run.run(workers=1, duration=None, requests=3)
+        self.assertEqual({'500': 3}, report['operations']['get']['errors'])
+
+    def test_unknown_operation(self):
+        self.assertRaises(ValueError, bench.Bench, self.cs.function,
+                          {'patch': 1})
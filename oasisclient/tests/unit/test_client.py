@@ -0,0 +1,65 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+
+import mock
+
+from oasisclient import fakeserver
+from oasisclient.tests import utils
+from oasisclient.v1 import client
+
+CLOUDS_YAML = '''clouds:
+  fake:
+    auth:
+      auth_url: %s
+      username: clouduser
+      password: demo
+      project_name: demo
+      user_domain_id: default
+      project_domain_id: default
+'''
+
+
+class ClientAuthTest(utils.FakeServerTestCase):
+
+    def setUp(self):
+        super(ClientAuthTest, self).setUp()
+        self.bodies = []
+        token = fakeserver.FakeOasisServer._token
+
+        def recording(server, body):
+            self.bodies.append(body)
+            return token(server, body)
+        patcher = mock.patch.object(fakeserver.FakeOasisServer, '_token',
+                                    recording)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _user(self):
+        return self.bodies[-1]['auth']['identity']['password']['user']
+
+    def test_user_id(self):
+        cs = client.Client(user_id='u123', password='demo',
+                           project_name='demo',
+                           auth_url=self.server.auth_url)
+        cs.function.list()
+        self.assertEqual('u123', self._user()['id'])
+
+    def test_cloud(self):
+        config = os.path.join(self.make_tempdir(), 'clouds.yaml')
+        with open(config, 'w') as f:
+            f.write(CLOUDS_YAML % self.server.auth_url)
+        with mock.patch.dict(os.environ, {'OS_CLIENT_CONFIG_FILE': config}):
+            cs = client.Client(cloud='fake')
+        cs.function.list()
+        self.assertEqual('clouduser', self._user()['name'])
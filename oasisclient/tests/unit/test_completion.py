@@ -0,0 +1,80 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+
+import mock
+import six
+
+from oasisclient import completion
+from oasisclient import shell
+from oasisclient.tests import utils
+
+
+class CompletionTest(utils.FakeServerTestCase):
+
+    def setUp(self):
+        super(CompletionTest, self).setUp()
+        self.server.seed('functions', 3, {'name': 'fn-{n}'})
+        self.patch_environment()
+        patcher = mock.patch('subprocess.Popen')
+        self.popen = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _refresh(self):
+        with mock.patch('sys.stdout', six.StringIO()):
+            shell.OasisShell().main(['completion-refresh'])
+
+    def test_names(self):
+        self._refresh()
+        self.assertEqual(['fn-0', 'fn-1', 'fn-2'],
+                         completion.complete(['function-delete', 'fn-']))
+        obj_id = sorted(self.server.data['functions'])[0]
+        self.assertEqual([obj_id], completion.complete(
+            ['function-delete', '--parallel', '2', obj_id[:8]]))
+        self.assertEqual([], completion.complete(['batch', 'fn-']))
+        self.assertFalse(self.popen.called)
+
+    def test_commands(self):
+        self._refresh()
+        candidates = completion.complete(['function-'])
+        self.assertIn('function-list', candidates)
+        self.assertIn('function-delete', candidates)
+        self.assertEqual(['batch'], completion.complete(['bat']))
+        self.assertEqual([], completion.complete(['--os-']))
+
+    def test_stale_cache_refreshed_once(self):
+        self._refresh()
+        self.assertEqual(['fn-0', 'fn-1', 'fn-2'],
+                         completion.complete(['function-show', 'fn-'],
+                                             ttl=-1))
+        completion.complete(['function-show', 'fn-'], ttl=-1)
+        self.assertEqual(1, self.popen.call_count)
+        self.assertTrue(os.path.exists(completion.cache_file() +
+                                       '.refreshing'))
+
+        # The refresh itself removes the marker.
+        self._refresh()
+        self.assertFalse(os.path.exists(completion.cache_file() +
+                                        '.refreshing'))
+
+    def test_no_cache(self):
+        self.assertEqual([], completion.complete(['function-delete', '']))
+        self.assertEqual(1, self.popen.call_count)
+
+    def test_main(self):
+        self._refresh()
+        with mock.patch('sys.stdout', six.StringIO()) as stdout:
+            self.assertEqual(0, completion.main(['2', 'function-delete',
+                                                 'fn-1']))
+        self.assertEqual('fn-1\n', stdout.getvalue())
+        self.assertEqual(1, completion.main(['x']))
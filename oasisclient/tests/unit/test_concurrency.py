@@ -0,0 +1,118 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+import unittest
+
+from oasisclient.common import concurrency
+
+
+class RunGraphTest(unittest.TestCase):
+
+    def setUp(self):
+        super(RunGraphTest, self).setUp()
+        self.started = []
+        self.lock = threading.Lock()
+
+    def _run(self, task):
+        with self.lock:
+            self.started.append(task)
+        if task.startswith('fail'):
+            raise ValueError(task)
+        return task.upper()
+
+    def test_dependency_order(self):
+        deps = {'a': set(), 'b': set(['a']), 'c': set(['a']),
+                'd': set(['b', 'c'])}
+        results = list(concurrency.run_graph(self._run, deps, 2))
+        self.assertEqual(set([('a', 'A', None), ('b', 'B', None),
+                              ('c', 'C', None), ('d', 'D', None)]),
+                         set(results))
+        self.assertEqual('a', self.started[0])
+        self.assertEqual('d', self.started[-1])
+
+    def test_failure_skips_dependents(self):
+        deps = {'fail': set(), 'b': set(['fail']), 'c': set(['b']),
+                'other': set()}
+        results = dict((task, exc) for (task, _result, exc)
+                       in concurrency.run_graph(self._run, deps))
+        self.assertIsInstance(results['fail'], ValueError)
+        for task in ('b', 'c'):
+            self.assertIsInstance(results[task],
+                                  concurrency.DependencyFailed)
+            self.assertEqual('fail', results[task].dependency)
+        self.assertIsNone(results['other'])
+        self.assertEqual(set(['fail', 'other']), set(self.started))
+
+    def test_max_workers(self):
+        running = [0, 0]
+
+        def task(name):
+            with self.lock:
+                running[0] += 1
+                running[1] = max(running)
+            threading.Event().wait(0.01)
+            with self.lock:
+                running[0] -= 1
+
+        deps = dict((name, set()) for name in range(10))
+        list(concurrency.run_graph(task, deps, 3))
+        self.assertLessEqual(running[1], 3)
+
+
+class MergeStreamsTest(unittest.TestCase):
+
+    def test_unordered(self):
+        streams = [iter(range(0, 100)), iter(range(100, 150)), iter([])]
+        self.assertEqual(list(range(150)),
+                         sorted(concurrency.merge_streams(streams)))
+
+    def test_ordered(self):
+        streams = [iter([1, 4, 7]), iter([2, 5, 8]), iter([0, 3, 6, 9])]
+        merged = list(concurrency.merge_streams(streams, key=lambda x: x,
+                                                buffer_size=1))
+        self.assertEqual(list(range(10)), merged)
+
+    def test_reverse(self):
+        streams = [iter([9, 5, 1]), iter([8, 4, 0])]
+        merged = list(concurrency.merge_streams(streams, key=lambda x: x,
+                                                reverse=True))
+        self.assertEqual([9, 8, 5, 4, 1, 0], merged)
+
+    def test_error(self):
+        def failing():
+            yield 1
+            raise ValueError('boom')
+
+        for key in (None, lambda x: x):
+            merged = concurrency.merge_streams([failing(), iter([2])],
+                                               key=key)
+            self.assertRaises(ValueError, list, merged)
+
+    def test_early_stop(self):
+        consumed = []
+
+        def endless():
+            n = 0
+            while True:
+                consumed.append(n)
+                yield n
+                n += 1
+
+        merged = concurrency.merge_streams([endless()], buffer_size=5)
+        self.assertEqual(0, next(merged))
+        merged.close()
+        threading.Event().wait(0.3)
+        count = len(consumed)
+        threading.Event().wait(0.3)
+        self.assertEqual(count, len(consumed))
+        self.assertLess(count, 10)
@@ -0,0 +1,88 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import io
+import os
+import threading
+import time
+import unittest
+
+import mock
+
+from oasisclient import daemon
+from oasisclient import exceptions
+from oasisclient import shell
+from oasisclient.tests import utils
+
+
+class ScopeTest(unittest.TestCase):
+
+    def test_scope_follows_settings(self):
+        with mock.patch.dict(os.environ, {'OS_TOKEN': 'a'}):
+            scope = daemon.env_scope()
+            with mock.patch.dict(os.environ, {'OS_TOKEN': 'b'}):
+                self.assertNotEqual(scope, daemon.env_scope())
+            with mock.patch.dict(os.environ, {'OASIS_PAGE_LATENCY': '1'}):
+                self.assertNotEqual(scope, daemon.env_scope())
+            with mock.patch.dict(os.environ, {'HOME_UNRELATED': '1'}):
+                self.assertEqual(scope, daemon.env_scope())
+
+    def test_forwardable(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop('OASIS_NO_DAEMON', None)
+            self.assertTrue(daemon._forwardable(['function-list']))
+            self.assertFalse(daemon._forwardable(['--os-token', 'x',
+                                                  'function-list']))
+            self.assertFalse(daemon._forwardable(['batch']))
+            self.assertFalse(daemon._forwardable([]))
+
+
+class DaemonTest(utils.FakeServerTestCase):
+
+    def setUp(self):
+        super(DaemonTest, self).setUp()
+        self.server.seed('functions', 3, {'name': 'fn-{n}'})
+        self.patch_environment()
+
+    def test_refuses_global_options(self):
+        with mock.patch.object(daemon, 'serve') as serve:
+            self.assertRaises(exceptions.CommandError,
+                              shell.OasisShell().main,
+                              ['--no-cache', 'daemon'])
+        self.assertFalse(serve.called)
+
+    def test_global_options_with_socket(self):
+        path = os.path.join(self.make_tempdir(), 'daemon.sock')
+        with mock.patch.object(daemon, 'serve') as serve:
+            shell.OasisShell().main(['--no-cache', 'daemon',
+                                     '--socket', path])
+        self.assertEqual(path, serve.call_args[0][2])
+
+    def test_forward(self):
+        path = daemon.socket_path()
+        output = io.BytesIO()
+        result = []
+
+        def client():
+            while not os.path.exists(path):
+                time.sleep(0.01)
+            result.append(daemon.forward(['function-list', '-f', 'value']))
+
+        thread = threading.Thread(target=client)
+        thread.start()
+        with mock.patch('sys.stdout', output):
+            shell.OasisShell().main(['daemon', '--idle-timeout', '1'])
+        thread.join()
+
+        self.assertEqual([0], result)
+        self.assertEqual(3, len(output.getvalue().splitlines()))
+        self.assertFalse(os.path.exists(path))
@@ -0,0 +1,113 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import csv
+import gzip
+import json
+import os
+
+import mock
+
+from oasisclient.common import export
+from oasisclient import fakeserver
+from oasisclient.tests import utils
+
+COUNT = fakeserver.DEFAULT_PAGE_SIZE * 2 + 10
+
+
+class ExportTest(utils.FakeServerTestCase):
+
+    def setUp(self):
+        super(ExportTest, self).setUp()
+        self.server.seed('functions', COUNT, {'name': 'fn-{n}',
+                                              'tags': {'kind': 'x'}})
+        tempdir = self.make_tempdir()
+        self.path = os.path.join(tempdir, 'functions.out')
+        self.checkpoint = os.path.join(tempdir, 'functions.checkpoint')
+        patcher = mock.patch.object(export, 'CHECKPOINT_EVERY', 20)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _names(self, lines):
+        return sorted(json.loads(line)['name'] for line in lines)
+
+    def _expected(self):
+        return sorted('fn-%d' % n for n in range(COUNT))
+
+    def _interrupt_after(self, count):
+        manager = self.cs.function
+        iter_pagination = manager._iter_pagination
+
+        def failing(*args, **kwargs):
+            for n, obj in enumerate(iter_pagination(*args, **kwargs)):
+                if n == count:
+                    raise KeyboardInterrupt()
+                yield obj
+
+        return mock.patch.object(manager, '_iter_pagination', failing)
+
+    def test_ndjson(self):
+        self.assertEqual(COUNT, export.export(self.cs.function, self.path))
+        with open(self.path) as f:
+            self.assertEqual(self._expected(), self._names(f))
+
+    def test_csv_fields(self):
+        export.export(self.cs.function, self.path, fmt='csv',
+                      fields=['name', 'tags'])
+        with open(self.path) as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(['name', 'tags'], rows[0])
+        self.assertEqual(COUNT, len(rows) - 1)
+        self.assertEqual(['fn-0', '{"kind": "x"}'], rows[1])
+
+    def _resume(self, compression, opener):
+        with self._interrupt_after(45):
+            self.assertRaises(KeyboardInterrupt, export.export,
+                              self.cs.function, self.path,
+                              compression=compression,
+                              checkpoint=self.checkpoint)
+        with open(self.checkpoint) as f:
+            self.assertEqual(45, json.load(f)['count'])
+
+        self.assertEqual(COUNT, export.export(
+            self.cs.function, self.path, compression=compression,
+            checkpoint=self.checkpoint))
+        self.assertFalse(os.path.exists(self.checkpoint))
+        with opener(self.path) as f:
+            self.assertEqual(self._expected(), self._names(f))
+
+    def test_resume(self):
+        self._resume(None, open)
+
+    def test_resume_gzip(self):
+        self._resume('gzip', gzip.open)
+
+    def test_resume_drops_unsaved_output(self):
+        with self._interrupt_after(45):
+            self.assertRaises(KeyboardInterrupt, export.export,
+                              self.cs.function, self.path,
+                              checkpoint=self.checkpoint)
+        # As if the process was killed after the last checkpoint.
+        with open(self.checkpoint) as f:
+            state = json.load(f)
+        with open(self.path, 'ab') as f:
+            f.write(b'{"name": "partial')
+        export.export(self.cs.function, self.path,
+                      checkpoint=self.checkpoint)
+        with open(self.path) as f:
+            self.assertEqual(self._expected(), self._names(f))
+        self.assertEqual(45, state['count'])
+
+    def test_parquet_checkpoint(self):
+        self.assertRaises(ValueError, export.export, self.cs.function,
+                          self.path, fmt='parquet',
+                          checkpoint=self.checkpoint)
@@ -0,0 +1,136 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import random
+import unittest
+
+from keystoneauth1 import exceptions as ksa_exc
+
+from oasisclient.common import faults
+from oasisclient import exceptions
+from oasisclient.tests import utils
+
+
+class LatencySamplerTest(unittest.TestCase):
+
+    def _draws(self, spec, count=1000):
+        sampler = faults.latency_sampler(spec)
+        rand = random.Random(1)
+        return [sampler(rand) for _i in range(count)]
+
+    def test_constant(self):
+        self.assertEqual([0.5] * 3, self._draws(0.5, 3))
+
+    def test_uniform(self):
+        draws = self._draws([0.1, 0.2])
+        self.assertTrue(all(0.1 <= draw <= 0.2 for draw in draws))
+
+    def test_lognormal(self):
+        draws = sorted(self._draws({'distribution': 'lognormal',
+                                    'median': 0.02, 'sigma': 0.8}))
+        self.assertAlmostEqual(0.02, draws[len(draws) // 2], delta=0.003)
+
+    def test_max(self):
+        draws = self._draws({'distribution': 'pareto', 'scale': 0.01,
+                             'alpha': 1.0, 'max': 0.05})
+        self.assertEqual(0.05, max(draws))
+        self.assertTrue(all(draw >= 0 for draw in self._draws(
+            {'distribution': 'normal', 'mean': 0, 'stddev': 1})))
+
+    def test_invalid(self):
+        for spec in ('fast', {'distribution': 'gamma'},
+                     {'distribution': 'normal', 'mean': 1}):
+            self.assertRaises(ValueError, faults.latency_sampler, spec)
+
+
+class ScheduleTest(unittest.TestCase):
+
+    def _statuses(self, schedule, count=200, method='GET',
+                  url='/v1/functions'):
+        result = []
+        for _i in range(count):
+            fault = schedule.draw(method, url)
+            result.append(fault.status if fault else None)
+        return result
+
+    def test_routes(self):
+        schedule = faults.Schedule([{'method': 'get',
+                                     'path': '/v1/functions*',
+                                     'errors': {'503': 1.0}}])
+        self.assertEqual(503, schedule.draw(
+            'GET', 'http://oasis/v1/functions/x?limit=1').status)
+        self.assertIsNone(schedule.draw('POST', '/v1/functions'))
+        self.assertIsNone(schedule.draw('GET', '/v1/httpapis'))
+
+    def test_seed(self):
+        spec = {'seed': 7, 'rules': [{'errors': {'500': 0.3}}]}
+        first = self._statuses(faults.Schedule.from_dict(spec))
+        self.assertEqual(first,
+                         self._statuses(faults.Schedule.from_dict(spec)))
+        self.assertIn(500, first)
+        self.assertIn(None, first)
+
+    def test_burst(self):
+        schedule = faults.Schedule([{'errors': {'503': 0.05}, 'burst': 5}],
+                                   seed=3)
+        statuses = self._statuses(schedule, 1000)
+        start = statuses.index(503)
+        self.assertEqual([503] * 5, statuses[start:start + 5])
+
+    def test_first_error_wins(self):
+        schedule = faults.Schedule([
+            {'errors': {'503': 1.0}, 'retry_after': 2, 'latency': 0.1},
+            {'errors': {'500': 1.0}, 'latency': 0.2}])
+        fault = schedule.draw('GET', '/v1/functions')
+        self.assertEqual((503, 2), (fault.status, fault.retry_after))
+        self.assertAlmostEqual(0.3, fault.delay)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, faults.Schedule.from_dict, {})
+        self.assertEqual(1, len(faults.Schedule.from_dict([{}]).rules))
+
+
+class FaultTransportTest(utils.FakeServerTestCase):
+
+    def setUp(self):
+        super(FaultTransportTest, self).setUp()
+        self.server.seed('functions', 3, {'name': 'fn-{n}'})
+
+    def _inject(self, *rules):
+        self.cs.set_transport(faults.FaultTransport(
+            self.cs.http_client, faults.Schedule(rules)))
+
+    def test_error(self):
+        self._inject({'method': 'GET', 'errors': {'503': 1.0}})
+        self.assertRaises(exceptions.ServiceUnavailable,
+                          self.cs.function.list)
+        self.assertEqual(0, self.server.requests[('GET', 'functions')])
+
+    def test_reset(self):
+        self._inject({'method': 'POST', 'reset': 1.0})
+        self.assertRaises(ksa_exc.ConnectFailure, self.cs.function.create,
+                          name='new')
+        self.assertEqual(3, len(self.server.data['functions']))
+
+    def test_drop(self):
+        self._inject({'method': 'POST', 'drop': 1.0})
+        self.assertRaises(ksa_exc.ConnectFailure, self.cs.function.create,
+                          name='new')
+        self.assertEqual(4, len(self.server.data['functions']))
+
+    def test_server_side(self):
+        self.server.faults = faults.Schedule([{'path': '/v1/functions',
+                                               'errors': {'500': 1.0}}])
+        self.assertRaises(exceptions.InternalServerError,
+                          self.cs.function.list)
+        self.server.faults = None
+        self.assertEqual(3, len(self.cs.function.list()))
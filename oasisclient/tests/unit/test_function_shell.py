@@ -0,0 +1,86 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import argparse
+
+import mock
+import six
+
+from oasisclient import exceptions
+from oasisclient import fakeserver
+from oasisclient.tests import utils
+from oasisclient.v1 import function_shell
+
+COUNT = fakeserver.DEFAULT_PAGE_SIZE * 2 + 20
+
+
+class FunctionListTest(utils.FakeServerTestCase):
+
+    def setUp(self):
+        super(FunctionListTest, self).setUp()
+        self.server.seed('functions', COUNT, {'name': 'fn-{n}'})
+
+    def _list(self, output_format, name=None):
+        args = argparse.Namespace(name=name, max_age=None,
+                                  output_format=output_format)
+        with mock.patch('sys.stdout', six.StringIO()) as stdout:
+            function_shell.do_function_list(self.cs, args)
+        return stdout.getvalue()
+
+    def test_table_lists_every_page(self):
+        output = self._list('table')
+        self.assertEqual(COUNT, output.count(' fn-'))
+
+    def test_formats_list_the_same(self):
+        self.assertEqual(COUNT, len(self._list('value').splitlines()))
+        self.assertEqual(COUNT + 1, len(self._list('csv').splitlines()))
+
+    def test_name(self):
+        output = self._list('value', name='fn-7')
+        self.assertEqual(1, len(output.splitlines()))
+        self.assertIn('fn-7', output)
+
+
+class FunctionDeleteTest(utils.FakeServerTestCase):
+
+    def setUp(self):
+        super(FunctionDeleteTest, self).setUp()
+        self.server.seed('functions', 6, {'name': 'fn-{n}'})
+
+    def _delete(self, targets, parallel):
+        args = argparse.Namespace(function=targets, parallel=parallel)
+        with mock.patch('sys.stdout', six.StringIO()) as stdout, \
+                mock.patch('sys.stderr', six.StringIO()) as stderr:
+            try:
+                function_shell.do_function_delete(self.cs, args)
+            finally:
+                self.stdout = stdout.getvalue()
+                self.stderr = stderr.getvalue()
+
+    def _names(self):
+        return sorted(obj['name']
+                      for obj in self.server.data['functions'].values())
+
+    def test_parallel(self):
+        obj_id = [obj['id'] for obj in self.server.data['functions'].values()
+                  if obj['name'] == 'fn-0'][0]
+        self._delete([obj_id, 'fn-1', 'fn-2', 'fn-3'], 3)
+        self.assertEqual(['fn-4', 'fn-5'], self._names())
+        self.assertEqual(4, self.stdout.count('has been accepted'))
+        self.assertIn('4 of 4 done, 0 failed.', self.stderr)
+
+    def test_failure_does_not_stop_the_others(self):
+        self.assertRaises(exceptions.CommandError, self._delete,
+                          ['fn-1', 'nope', 'fn-2'], 2)
+        self.assertEqual(['fn-0', 'fn-3', 'fn-4', 'fn-5'], self._names())
+        self.assertIn('Delete for function nope failed', self.stdout)
+        self.assertIn('2 of 3 done, 1 failed.', self.stderr)
@@ -0,0 +1,62 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import uuid
+
+from oasisclient import exceptions
+from oasisclient import fakeserver
+from oasisclient.tests import utils
+
+
+class GetTreeTest(utils.FakeServerTestCase):
+
+    def setUp(self):
+        super(GetTreeTest, self).setUp()
+        add = self.server.add
+        self.api = add('httpapis', {'name': 'api'})
+        other = add('httpapis', {'name': 'other'})
+        for name in ('get', 'post'):
+            req = add('requests', {'name': name,
+                                   'httpapi_id': self.api['id']})
+            add('requestheaders', {'name': name + '-header',
+                                   'request_id': req['id']})
+        add('requests', {'name': 'elsewhere', 'httpapi_id': other['id']})
+        resp = add('responses', {'name': 'ok', 'httpapi_id': self.api['id']})
+        add('responsecodes', {'code': 200, 'response_id': resp['id']})
+        add('responsemessages', {'message': 'fine',
+                                 'response_id': resp['id']})
+
+    def test_get_tree(self):
+        tree = self.cs.httpapi.get_tree(self.api['id'])
+        self.assertEqual('api', tree['name'])
+        requests = sorted(tree['requests'], key=lambda obj: obj['name'])
+        self.assertEqual(['get', 'post'], [obj['name'] for obj in requests])
+        self.assertEqual(['get-header'], [obj['name'] for obj in
+                                          requests[0]['request_headers']])
+        response, = tree['responses']
+        self.assertEqual([200], [obj['code']
+                                 for obj in response['response_codes']])
+        self.assertEqual(['fine'], [obj['message'] for obj
+                                    in response['response_messages']])
+
+    def test_one_request_per_lookup(self):
+        self.cs.httpapi.get_tree(self.api['id'], max_workers=1)
+        # One request per lookup: the httpapi, its two kinds of children,
+        # two header lookups and the two lookups of the response.
+        self.assertEqual(7, sum(count for ((method, collection), count)
+                                in self.server.requests.items()
+                                if method == 'GET' and
+                                collection in fakeserver.COLLECTIONS))
+
+    def test_missing(self):
+        self.assertRaises(exceptions.NotFound, self.cs.httpapi.get_tree,
+                          str(uuid.uuid4()))
@@ -0,0 +1,115 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import unittest
+
+from keystoneauth1 import session as ksa_session
+from requests import adapters
+import six
+
+from oasisclient.common import httpclient
+from oasisclient import exceptions
+
+
+class FakeResponse(object):
+    status = 200
+    will_close = False
+
+    def __init__(self):
+        self.body = '{}'
+
+    def getheader(self, name, default=None):
+        return 'application/json'
+
+    def getheaders(self):
+        return []
+
+    def read(self, amt=None):
+        body, self.body = self.body, ''
+        return body
+
+
+class FakeConnection(object):
+    """Connection failing as a stale one does, at `fail_at`."""
+
+    def __init__(self, fail_at=None):
+        self.fail_at = fail_at
+
+    def request(self, *args, **kwargs):
+        if self.fail_at == 'request':
+            raise six.moves.http_client.CannotSendRequest()
+
+    def getresponse(self):
+        if self.fail_at == 'response':
+            raise six.moves.http_client.BadStatusLine("''")
+        return FakeResponse()
+
+    def close(self):
+        pass
+
+
+class StaleConnectionTest(unittest.TestCase):
+
+    def setUp(self):
+        super(StaleConnectionTest, self).setUp()
+        self.client = httpclient.HTTPClient('http://localhost:1/v1')
+        self.opened = []
+        self.client.get_connection = self._connect
+
+    def _connect(self):
+        self.opened.append(FakeConnection())
+        return self.opened[-1]
+
+    def _request(self, method, fail_at):
+        self.client._idle_connections = [FakeConnection(fail_at)]
+        return self.client._http_request('/v1/functions', method)
+
+    def test_retries_idempotent_methods(self):
+        for method in ('GET', 'PUT', 'DELETE'):
+            self._request(method, 'response')
+        self.assertEqual(3, len(self.opened))
+
+    def test_retries_unsent_requests(self):
+        self._request('POST', 'request')
+        self.assertEqual(1, len(self.opened))
+
+    def test_does_not_resend_posts(self):
+        for method in ('POST', 'PATCH'):
+            self.assertRaises(exceptions.ConnectionRefused,
+                              self._request, method, 'response')
+        self.assertEqual([], self.opened)
+
+
+class SessionPoolSizeTest(unittest.TestCase):
+
+    def test_keeps_adapter_settings(self):
+        session = ksa_session.Session()
+        mounted = adapters.HTTPAdapter(pool_connections=4, max_retries=3)
+        session.session.mount('https://', mounted)
+        client = httpclient.SessionClient(session=session)
+
+        client.set_pool_size(32)
+
+        adapter = session.session.get_adapter('https://')
+        self.assertIs(mounted, adapter)
+        self.assertEqual(3, adapter.max_retries.total)
+        self.assertEqual(32, adapter._pool_maxsize)
+        self.assertEqual(4, adapter._pool_connections)
+        self.assertEqual(32, adapter.poolmanager.connection_pool_kw['maxsize'])
+
+    def test_never_shrinks(self):
+        session = ksa_session.Session()
+        client = httpclient.SessionClient(session=session)
+        client.set_pool_size(32)
+        client.set_pool_size(2)
+        self.assertEqual(
+            32, session.session.get_adapter('http://')._pool_maxsize)
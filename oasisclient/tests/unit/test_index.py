@@ -0,0 +1,107 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import argparse
+import json
+import os
+import uuid
+
+import mock
+import six
+
+from oasisclient.common import index
+from oasisclient import exceptions
+from oasisclient.tests import utils
+from oasisclient.v1 import function_shell
+
+
+class ResourceIndexTest(utils.FakeServerTestCase):
+
+    def setUp(self):
+        super(ResourceIndexTest, self).setUp()
+        self.server.seed('functions', 3, {'name': 'fn-{n}'})
+
+    def _id(self, name):
+        return [obj['id'] for obj in self.server.data['functions'].values()
+                if obj['name'] == name][0]
+
+    def test_resolve(self):
+        self.assertEqual(self._id('fn-1'), self.cs.function.resolve('fn-1'))
+
+    def test_resolve_refreshes_on_miss(self):
+        self.cs.function.resolve('fn-0')
+        created = self.make_client().function.create(name='fn-new')
+        self.assertEqual(created.id, self.cs.function.resolve('fn-new'))
+
+    def test_resolve_missing(self):
+        self.assertRaises(exceptions.NotFound,
+                          self.cs.function.resolve, 'nope')
+
+    def test_resolve_uuid_without_building(self):
+        obj_id = str(uuid.uuid4())
+        self.assertEqual(obj_id, self.cs.function.resolve(obj_id))
+        self.assertFalse(self.cs.function.get_index().built)
+
+    def test_resolve_stale_name(self):
+        old_id = self._id('fn-1')
+        self.cs.function.resolve('fn-1')
+        self.make_client().function.update(old_id, name='keepme')
+
+        self.assertEqual(old_id, self.cs.function.resolve('fn-1'))
+        self.assertRaises(exceptions.NotFound, self.cs.function.resolve,
+                          'fn-1', verify=True)
+        self.assertEqual(old_id, self.cs.function.resolve('keepme'))
+
+    def test_resolve_recreated_name(self):
+        old_id = self._id('fn-1')
+        self.cs.function.resolve('fn-1')
+        other = self.make_client()
+        other.function.delete(old_id)
+        created = other.function.create(name='fn-1')
+
+        self.assertEqual(created.id,
+                         self.cs.function.resolve('fn-1', verify=True))
+
+    def test_delete_after_rename(self):
+        old_id = self._id('fn-1')
+        self.cs.function.resolve('fn-1')
+        self.make_client().function.update(old_id, name='keepme')
+
+        args = argparse.Namespace(function=['fn-1'], parallel=1)
+        with mock.patch('sys.stdout', six.StringIO()):
+            self.assertRaises(exceptions.CommandError,
+                              function_shell.do_function_delete,
+                              self.cs, args)
+        self.assertIn(old_id, self.server.data['functions'])
+
+    def test_changes_saved_on_flush(self):
+        cache_file = os.path.join(self.make_tempdir(), 'functions.json')
+        idx = self.cs.function.get_index(cache_file)
+        idx.build()
+        self.cs.function.create(name='fn-new')
+        with open(cache_file) as f:
+            self.assertNotIn('fn-new', f.read())
+
+        self.cs.flush_index_cache()
+        with open(cache_file) as f:
+            names = [values['name']
+                     for values in json.load(f)['objects'].values()]
+        self.assertIn('fn-new', names)
+
+    def test_loaded_from_cache_file(self):
+        cache_file = os.path.join(self.make_tempdir(), 'functions.json')
+        self.cs.function.get_index(cache_file).build()
+
+        loaded = index.ResourceIndex(self.make_client().function,
+                                     cache_file=cache_file)
+        self.assertTrue(loaded.built)
+        self.assertEqual(set([self._id('fn-2')]), loaded.ids('fn-2'))
@@ -0,0 +1,84 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oasisclient import exceptions
+from oasisclient import fakeserver
+from oasisclient.tests import utils
+
+
+class InvokeTest(utils.FakeServerTestCase):
+
+    def setUp(self):
+        super(InvokeTest, self).setUp()
+        add = self.server.add
+        self.function = add('functions', {'name': 'hello'})
+        self.endpoint = add('endpoints', {
+            'name': 'hello-ep', 'function_id': self.function['id'],
+            'url': self._url('hello')})
+        add('httpapis', {'name': 'items-api',
+                         'endpoint_id': self.endpoint['id'],
+                         'path': 'items', 'method': 'get'})
+        add('functions', {'name': 'orphan'})
+
+    def _url(self, name):
+        return '%s/%s/%s' % (self.server.base_url, fakeserver.INVOKE, name)
+
+    def _lookups(self):
+        return sum(count for ((method, collection), count)
+                   in self.server.requests.items()
+                   if method == 'GET' and collection in fakeserver.COLLECTIONS)
+
+    def test_targets(self):
+        resp = self.cs.function.invoke('hello', {'n': 1})
+        self.assertEqual({'function': 'hello', 'method': 'POST',
+                          'payload': {'n': 1}}, resp.json())
+        self.assertEqual('hello', self.cs.function.invoke(
+            self.endpoint['id']).json()['function'])
+        resp = self.cs.function.invoke('items-api')
+        self.assertEqual(('hello/items', 'GET'),
+                         (resp.json()['function'], resp.json()['method']))
+        self.assertEqual('direct', self.cs.function.invoke(
+            self._url('direct')).json()['function'])
+
+    def test_route_cached(self):
+        self.cs.function.invoke('hello')
+        lookups = self._lookups()
+        self.cs.function.invoke('hello')
+        self.assertEqual(lookups, self._lookups())
+
+    def test_not_found(self):
+        self.assertRaises(exceptions.NotFound, self.cs.function.invoke,
+                          'nope')
+        self.assertRaises(exceptions.NotFound, self.cs.function.invoke,
+                          'orphan')
+
+    def test_moved_endpoint(self):
+        self.server.data['endpoints'][self.endpoint['id']]['url'] = (
+            self.server.base_url + '/gone')
+        self.assertRaises(exceptions.NotFound, self.cs.function.invoke,
+                          'hello')
+        self.server.data['endpoints'][self.endpoint['id']]['url'] = (
+            self._url('moved'))
+        self.assertEqual('moved', self.cs.function.invoke(
+            'hello').json()['function'])
+
+    def test_invoke_many(self):
+        results = list(self.cs.function.invoke_many(
+            'hello', ({'n': n} for n in range(20)), max_workers=4))
+        self.assertEqual([None] * 20, [exc for (_p, _r, exc) in results])
+        self.assertEqual(sorted(range(20)),
+                         sorted(resp.json()['payload']['n']
+                                for (_p, resp, _e) in results))
+
+    def test_invoke_async(self):
+        future = self.cs.function.invoke_async('hello', b'[1, 2]')
+        self.assertEqual([1, 2], future.result().json()['payload'])
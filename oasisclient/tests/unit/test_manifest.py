@@ -0,0 +1,81 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oasisclient import exceptions
+from oasisclient.tests import utils
+from oasisclient.v1 import manifest
+
+
+class ApplierTest(utils.FakeServerTestCase):
+
+    def setUp(self):
+        super(ApplierTest, self).setUp()
+        self.server.seed('functions', 1, {'name': 'kept',
+                                          'runtime': 'python'})
+        self.server.seed('httpapis', 1, {'name': 'old-api'})
+        self.manifest = {'resources': [
+            {'type': 'function', 'name': 'hello',
+             'properties': {'runtime': 'python'}},
+            {'type': 'endpoints', 'name': 'hello-ep',
+             'properties': {'function_id': {'get_resource': 'hello'}}},
+            {'type': 'function', 'name': 'kept',
+             'properties': {'runtime': 'go'}},
+            {'type': 'httpapi', 'name': 'old-api', 'state': 'absent'},
+        ]}
+
+    def _ops(self, actions):
+        return dict((action.node.name, action.op) for action in actions)
+
+    def test_plan(self):
+        actions = manifest.Applier(self.cs, self.manifest).plan()
+        self.assertEqual(['hello', 'kept', 'old-api', 'hello-ep'],
+                         [action.node.name for action in actions])
+        self.assertEqual({'hello': manifest.CREATE,
+                          'hello-ep': manifest.CREATE,
+                          'kept': manifest.UPDATE,
+                          'old-api': manifest.DELETE}, self._ops(actions))
+        self.assertEqual({'runtime': 'go'}, actions[1].changes)
+
+    def test_apply(self):
+        results = list(manifest.Applier(self.cs, self.manifest).apply())
+        self.assertEqual([None] * 4, [exc for (_a, _r, exc) in results])
+
+        functions = dict((obj['name'], obj)
+                         for obj in self.server.data['functions'].values())
+        self.assertEqual('go', functions['kept']['runtime'])
+        self.assertEqual('python', functions['hello']['runtime'])
+        endpoints = list(self.server.data['endpoints'].values())
+        self.assertEqual([functions['hello']['id']],
+                         [obj['function_id'] for obj in endpoints])
+        self.assertEqual({}, self.server.data['httpapis'])
+
+        actions = manifest.Applier(self.cs, self.manifest).plan()
+        self.assertEqual(set([manifest.NOOP]),
+                         set(self._ops(actions).values()))
+
+    def test_dependent_skipped(self):
+        self.server.configure('functions', 'POST', errors={500: 1.0})
+        results = dict((action.node.name, exc) for (action, _r, exc)
+                       in manifest.Applier(self.cs, self.manifest).apply())
+        self.assertIsInstance(results['hello'],
+                              exceptions.InternalServerError)
+        self.assertIsNotNone(results['hello-ep'])
+        self.assertEqual({}, self.server.data['endpoints'])
+
+    def test_cycle(self):
+        self.assertRaises(exceptions.InvalidManifest, manifest.Applier,
+                          self.cs, {'resources': [
+                              {'type': 'function', 'name': 'a',
+                               'properties': {'x': {'get_resource': 'b'}}},
+                              {'type': 'function', 'name': 'b',
+                               'properties': {'x': {'get_resource': 'a'}}},
+                          ]})
@@ -0,0 +1,88 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+
+from oasisclient.tests import utils
+from oasisclient.v1 import mirror
+
+
+class MirrorTest(utils.FakeServerTestCase):
+
+    def setUp(self):
+        super(MirrorTest, self).setUp()
+        # The server's timestamps are in seconds.
+        self.server.seed('functions', 3,
+                         {'name': 'fn-{n}', 'runtime': 'python',
+                          'created_at': '2020-01-01T00:00:00+00:00'})
+        self.ids = list(self.server.data['functions'])
+        self.path = os.path.join(self.make_tempdir(), 'mirror.sqlite')
+        self.mirror = self._open()
+
+    def _open(self, **kwargs):
+        kwargs.setdefault('max_age', 3600)
+        result = mirror.Mirror(self.cs, self.path, **kwargs)
+        self.addCleanup(result.close)
+        return result
+
+    def _listings(self):
+        return self.server.requests[('GET', 'functions')]
+
+    def test_reads(self):
+        self.assertEqual(sorted(self.ids),
+                         sorted(obj.id for obj in
+                                self.mirror.list('functions')))
+        self.assertEqual('fn-1', self.mirror.get('functions',
+                                                 self.ids[1]).name)
+        self.assertIsNone(self.mirror.get('functions', 'unknown'))
+        self.assertEqual([self.ids[2]],
+                         [obj.id for obj in self.mirror.find(
+                             'functions', name='fn-2', runtime='python')])
+        self.assertEqual([], self.mirror.find('functions', name='fn-2',
+                                              runtime='go'))
+        self.assertRaises(ValueError, self.mirror.list, 'unknown')
+
+    def test_served_locally_while_fresh(self):
+        self.mirror.list('functions')
+        listings = self._listings()
+        self.mirror.get('functions', self.ids[0])
+        self.mirror.find('functions', name='fn-0')
+        self.assertEqual(listings, self._listings())
+
+        self.mirror.list('functions', max_age=0)
+        self.assertGreater(self._listings(), listings)
+
+    def test_incremental_sync(self):
+        self.mirror.sync(['functions'])
+        other = self.make_client()
+        other.function.update(self.ids[0], name='renamed')
+        created = other.function.create(name='fn-new')
+        self.assertEqual({'functions': 2}, self.mirror.sync(['functions']))
+        self.assertEqual('renamed',
+                         self.mirror.get('functions', self.ids[0]).name)
+        self.assertIsNotNone(self.mirror.get('functions', created.id))
+
+    def test_deletions_on_resync(self):
+        local = self._open(resync_every=1)
+        local.sync(['functions'])
+        self.make_client().function.delete(self.ids[0])
+        self.assertEqual({'functions': 1}, local.sync(['functions']))
+        self.assertIsNone(local.get('functions', self.ids[0]))
+
+    def test_persisted(self):
+        self.mirror.sync()
+        self.mirror.close()
+        listings = self._listings()
+        reopened = self._open()
+        self.assertEqual(3, len(reopened.list('functions')))
+        self.assertEqual(listings, self._listings())
+        self.assertEqual({'functions': 0}, reopened.sync(['functions']))
@@ -0,0 +1,74 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import unittest
+
+from oasisclient.common import pagination
+from oasisclient.tests import utils
+
+
+class PageSizeTunerTest(unittest.TestCase):
+
+    def test_grows_by_steps(self):
+        tuner = pagination.PageSizeTuner(initial_limit=100)
+        self.assertEqual(200, tuner.record(100, 0.001))
+        self.assertEqual(400, tuner.record(200, 0.002))
+
+    def test_shrinks_by_steps(self):
+        tuner = pagination.PageSizeTuner(initial_limit=100)
+        self.assertEqual(50, tuner.record(100, 10.0))
+
+    def test_settles_on_target_latency(self):
+        tuner = pagination.PageSizeTuner(target_latency=1.0,
+                                         initial_limit=100)
+        for _i in range(5):
+            tuner.record(tuner.limit, tuner.limit * 0.008)
+        self.assertEqual(125, tuner.limit)
+
+    def test_page_bytes(self):
+        tuner = pagination.PageSizeTuner(initial_limit=100,
+                                         max_page_bytes=8000)
+        self.assertEqual(80, tuner.record(100, 0.001, size=10000))
+
+    def test_bounds(self):
+        tuner = pagination.PageSizeTuner(min_limit=20, max_limit=150,
+                                         initial_limit=100)
+        self.assertEqual(150, tuner.record(100, 0.001))
+        self.assertEqual(100, pagination.PageSizeTuner(
+            initial_limit=100).record(0, 1.0))
+        self.assertRaises(ValueError, pagination.PageSizeTuner,
+                          min_limit=10, max_limit=5)
+
+
+class TunedListingTest(utils.FakeServerTestCase):
+
+    def setUp(self):
+        super(TunedListingTest, self).setUp()
+        self.server.seed('functions', 300, {'name': 'fn-{n}'})
+        self.cs.enable_page_tuning(initial_limit=20, max_limit=200)
+
+    def _pages(self):
+        return self.server.requests[('GET', 'functions')]
+
+    def test_iter_findall(self):
+        self.assertEqual(300, len(list(self.cs.function.iter_findall())))
+        # 20, 40, 80 and 160 items, rather than 15 pages of 20.
+        self.assertEqual(4, self._pages())
+        # The last page, without a 'next' link, is not accounted for.
+        self.assertEqual(160, self.cs.function.page_tuner.limit)
+
+    def test_list_follows_every_page(self):
+        self.assertEqual(300, len(self.cs.function.list()))
+
+    def test_limit(self):
+        self.assertEqual(30, len(self.cs.function.list(limit=30)))
+        self.assertEqual(2, self._pages())
@@ -0,0 +1,74 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import gzip
+import os
+import uuid
+
+from oasisclient.common import replay
+from oasisclient import exceptions
+from oasisclient.tests import utils
+from oasisclient.v1 import client
+
+
+class ReplayTest(utils.FakeServerTestCase):
+
+    def setUp(self):
+        super(ReplayTest, self).setUp()
+        self.server.seed('functions', 3, {'name': 'fn-{n}'})
+        self.ids = sorted(self.server.data['functions'])
+        self.missing = str(uuid.uuid4())
+        self.path = os.path.join(self.make_tempdir(), 'trace.gz')
+        with replay.RecordingTransport(self.cs.http_client,
+                                       self.path) as recorder:
+            self.cs.set_transport(recorder)
+            self.recorded = self._traffic(self.cs)
+
+    def _traffic(self, cs):
+        names = sorted(obj.name for obj in cs.function.list())
+        updated = cs.function.update(self.ids[0], name='renamed')
+        try:
+            cs.function.get(self.missing)
+        except exceptions.NotFound as e:
+            missing = type(e), e.http_status
+        return names, updated.name, missing
+
+    def _replayer(self, **kwargs):
+        kwargs.setdefault('timing', 'zero')
+        return client.Client(http_client=replay.ReplayTransport(self.path,
+                                                                **kwargs))
+
+    def test_replay(self):
+        requests = sum(self.server.requests.values())
+        self.assertEqual(self.recorded, self._traffic(self._replayer()))
+        self.assertEqual(requests, sum(self.server.requests.values()))
+
+    def test_miss(self):
+        cs = self._replayer()
+        self.assertRaises(replay.ReplayMiss, cs.function.get, self.ids[1])
+        cs.function.list()
+        self.assertRaises(replay.ReplayMiss, cs.function.list)
+
+    def test_loop(self):
+        cs = self._replayer(loop=True)
+        self.assertEqual(cs.function.list()[0].id, cs.function.list()[0].id)
+
+    def test_scaled_timing(self):
+        cs = self._replayer(timing='scaled', scale=0.5)
+        self.assertEqual(3, len(cs.function.list()))
+        self.assertRaises(ValueError, replay.ReplayTransport, self.path,
+                          timing='faster')
+
+    def test_not_a_recording(self):
+        with gzip.open(self.path, 'wb') as f:
+            f.write(b'{"version": 0}\n')
+        self.assertRaises(ValueError, replay.ReplayTransport, self.path)
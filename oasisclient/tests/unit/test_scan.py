@@ -0,0 +1,52 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oasisclient import fakeserver
+from oasisclient.tests import utils
+
+HTTPAPIS = ('api-a', 'api-b', 'api-c')
+PER_HTTPAPI = fakeserver.DEFAULT_PAGE_SIZE + 10
+
+
+class ScanTest(utils.FakeServerTestCase):
+
+    def setUp(self):
+        super(ScanTest, self).setUp()
+        for httpapi_id in HTTPAPIS:
+            self.server.seed('requests', PER_HTTPAPI,
+                             {'name': '%s-{n}' % httpapi_id,
+                              'httpapi_id': httpapi_id})
+        self.shards = [{'httpapi_id': httpapi_id} for httpapi_id in HTTPAPIS]
+
+    def test_scan(self):
+        ids = [obj.id for obj in self.cs.request.scan(self.shards)]
+        self.assertEqual(len(HTTPAPIS) * PER_HTTPAPI, len(ids))
+        self.assertEqual(set(self.server.data['requests']), set(ids))
+
+    def test_scan_ordered(self):
+        names = [obj.name for obj in self.cs.request.scan(
+            self.shards, sort_key='name', sort_dir='desc', ordered=True)]
+        self.assertEqual(sorted(names, reverse=True), names)
+        self.assertEqual(len(HTTPAPIS) * PER_HTTPAPI, len(names))
+
+    def test_scan_some_shards(self):
+        objs = list(self.cs.request.scan(self.shards[:1]))
+        self.assertEqual(PER_HTTPAPI, len(objs))
+        self.assertEqual(set(['api-a']),
+                         set(obj.httpapi_id for obj in objs))
+
+    def test_unsupported_filter(self):
+        self.assertRaises(ValueError, self.cs.request.scan, [{'name': 'x'}])
+
+    def test_ordered_needs_sort_key(self):
+        self.assertRaises(ValueError, self.cs.request.scan, self.shards,
+                          ordered=True)
@@ -0,0 +1,152 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+import os
+import pstats
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import mock
+import six
+
+from oasisclient import exceptions
+from oasisclient import shell
+from oasisclient.tests import utils
+from oasisclient.v1 import shell as shell_v1
+
+# Modules only some commands or options need.
+LAZY_MODULES = ('oasisclient.common.faults', 'oasisclient.common.profiling',
+                'oasisclient.common.replay', 'oasisclient.completion')
+
+
+class ImportTest(unittest.TestCase):
+
+    def test_optional_modules_not_imported(self):
+        code = ('import json, sys\n'
+                'from oasisclient import shell\n'
+                'shell.OasisShell().get_base_parser()\n'
+                'print(json.dumps(sorted(sys.modules)))\n')
+        output = subprocess.check_output([sys.executable, '-c', code])
+        imported = set(json.loads(output.decode('utf-8')))
+        self.assertEqual(set(), imported.intersection(LAZY_MODULES))
+
+
+class CommandTableTest(unittest.TestCase):
+
+    def setUp(self):
+        super(CommandTableTest, self).setUp()
+        self.env = dict(os.environ, XDG_CACHE_HOME=tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.env['XDG_CACHE_HOME'])
+
+    def _imported(self, argv):
+        code = ('import json, sys\n'
+                'from oasisclient import shell\n'
+                'cli = shell.OasisShell()\n'
+                'cli.parser = cli.get_subcommand_parser(\n'
+                '    shell.DEFAULT_API_VERSION)\n'
+                'cli.parse_args(%r)\n'
+                'print(json.dumps(sorted(sys.modules)))\n' % (argv,))
+        output = subprocess.check_output([sys.executable, '-c', code],
+                                         env=self.env)
+        imported = set(json.loads(output.decode('utf-8')))
+        return imported.intersection(shell_v1.COMMAND_MODULES)
+
+    def test_cached(self):
+        self.assertEqual(set(shell_v1.COMMAND_MODULES),
+                         self._imported(['bash-completion']))
+        self.assertEqual(set(), self._imported(['bash-completion']))
+        self.assertEqual(set(['oasisclient.v1.function_shell']),
+                         self._imported(['function-list']))
+
+    def test_stale_entry(self):
+        with mock.patch.dict(os.environ, self.env):
+            cli = shell.OasisShell()
+            cli.parser = cli.get_subcommand_parser(shell.DEFAULT_API_VERSION)
+            cli._commands['function-list']['function'] = 'do_gone'
+            self.assertRaises(exceptions.CommandError, cli.parse_args,
+                              ['function-list'])
+            self.assertEqual('do_function_list',
+                             cli._commands['function-list']['function'])
+
+
+class BareProfileTest(unittest.TestCase):
+
+    def setUp(self):
+        super(BareProfileTest, self).setUp()
+        self.shell = shell.OasisShell()
+        self.shell.parser = self.shell.get_subcommand_parser(
+            shell.DEFAULT_API_VERSION)
+
+    def _profile(self, argv):
+        return self.shell.parse_args(self.shell._bare_profile(argv)).profile
+
+    def test_before_command(self):
+        self.assertEqual(shell.DEFAULT_PROFILE,
+                         self._profile(['--profile', 'function-list']))
+
+    def test_file_name(self):
+        self.assertEqual('x.prof', self._profile(['--profile', 'x.prof',
+                                                  'function-list']))
+        self.assertEqual('x.prof', self._profile(['--profile=x.prof',
+                                                  'function-list']))
+
+    def test_before_other_option(self):
+        self.assertEqual(shell.DEFAULT_PROFILE,
+                         self._profile(['--profile', '--no-cache',
+                                        'function-list']))
+
+    def test_after_option_value(self):
+        self.assertEqual(shell.DEFAULT_PROFILE,
+                         self._profile(['--os-token', 'x', '--profile',
+                                        'function-list']))
+
+    def test_after_command(self):
+        argv = ['function-list', '--name', '--profile']
+        self.assertEqual(argv, self.shell._bare_profile(argv))
+        argv = ['--os-token', '--profile', 'function-list']
+        self.assertEqual(argv, self.shell._bare_profile(argv))
+
+
+class TimingsTest(utils.FakeServerTestCase):
+
+    def setUp(self):
+        super(TimingsTest, self).setUp()
+        self.server.seed('functions', 3, {'name': 'fn-{n}'})
+        self.patch_environment()
+        self.tempdir = self.make_tempdir()
+
+    def _main(self, argv):
+        with mock.patch('sys.stdout', six.StringIO()), \
+                mock.patch('sys.stderr', six.StringIO()) as stderr:
+            shell.OasisShell().main(argv)
+        return stderr.getvalue()
+
+    def test_timings(self):
+        report = self._main(['--timings', 'function-list', '-f', 'value'])
+        self.assertIn('authentication and endpoint lookup', report)
+        self.assertIn('HTTP requests (1)', report)
+        self.assertIn('GET', report)
+
+    def test_profile(self):
+        path = os.path.join(self.tempdir, 'list.prof')
+        self._main(['--profile', path, 'function-list'])
+        self.assertTrue(pstats.Stats(path).total_calls)
+
+    def test_bare_profile(self):
+        path = os.path.join(self.tempdir, 'oasis.prof')
+        with mock.patch.object(shell, 'DEFAULT_PROFILE', path):
+            self._main(['--profile', 'function-list'])
+        self.assertTrue(os.path.exists(path))
@@ -0,0 +1,96 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import unittest
+
+from six.moves.urllib import parse
+
+from oasisclient.common import watch
+from oasisclient.tests import utils
+
+
+class FakeObject(object):
+
+    def __init__(self, id, created_at, updated_at=None):
+        self.id = id
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+
+class FakeManager(object):
+    collection_key = 'functions'
+
+    def __init__(self, objs):
+        self.objs = objs
+
+    @staticmethod
+    def _path():
+        return '/v1/functions'
+
+    def _iter_pagination(self, url, response_key):
+        query = dict(parse.parse_qsl(parse.urlsplit(url).query))
+        sort_key = query.get('sort_key')
+        if not sort_key:
+            return list(self.objs)
+        # Objects without the sort key last, as the API sorts them.
+        return sorted(self.objs,
+                      key=lambda obj: (getattr(obj, sort_key) is not None,
+                                       getattr(obj, sort_key)),
+                      reverse=query.get('sort_dir') == 'desc')
+
+
+class ChangeTrackerTest(unittest.TestCase):
+
+    def test_newest_first_update_and_older_create(self):
+        old = FakeObject('old', '2020-01-01T00:00:00')
+        manager = FakeManager([old])
+        tracker = watch.ChangeTracker(manager, resync_every=None)
+        self.assertEqual([watch.ADDED],
+                         [event.type for event in tracker.poll()])
+
+        # Between two polls: an object is created, then an older one is
+        # updated, its update being newer than the creation.
+        created = FakeObject('created', '2020-01-02T00:00:00')
+        old.updated_at = '2020-01-03T00:00:00'
+        manager.objs.append(created)
+
+        events = dict((event.id, event.type) for event in tracker.poll())
+        self.assertEqual({'old': watch.MODIFIED, 'created': watch.ADDED},
+                         events)
+        self.assertEqual('2020-01-03T00:00:00', tracker.watermark)
+
+
+class FakeServerChangeTrackerTest(utils.FakeServerTestCase):
+
+    def _poll(self, tracker):
+        return dict((event.id, event.type) for event in tracker.poll())
+
+    def test_changes(self):
+        # The server's timestamps are in seconds.
+        self.server.seed('functions', 3,
+                         {'name': 'fn-{n}',
+                          'created_at': '2020-01-01T00:00:00+00:00'})
+        ids = list(self.server.data['functions'])
+        tracker = watch.ChangeTracker(self.cs.function, resync_every=2)
+        self.assertEqual(dict((obj_id, watch.ADDED) for obj_id in ids),
+                         self._poll(tracker))
+
+        other = self.make_client()
+        created = other.function.create(name='fn-new')
+        other.function.update(ids[0], name='renamed')
+        self.assertEqual({created.id: watch.ADDED, ids[0]: watch.MODIFIED},
+                         self._poll(tracker))
+
+        # Deletions are only noticed by the full listings.
+        other.function.delete(ids[1])
+        self.assertEqual({ids[1]: watch.DELETED}, self._poll(tracker))
+        self.assertEqual({}, self._poll(tracker))
@@ -0,0 +1,54 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from oasisclient import fakeserver
+from oasisclient.v1 import client
+
+
+class FakeServerTestCase(unittest.TestCase):
+    """Runs a fresh :class:`FakeOasisServer` for every test."""
+
+    def setUp(self):
+        super(FakeServerTestCase, self).setUp()
+        self.server = fakeserver.FakeOasisServer()
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        self.cs = self.make_client()
+
+    def make_client(self):
+        """Return a v1 client of the server, logged in as 'demo'."""
+        return client.Client(username='demo', password='demo',
+                             project_name='demo',
+                             auth_url=self.server.auth_url)
+
+    def make_tempdir(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path, True)
+        return path
+
+    def patch_environment(self):
+        """Point the shell at the server, with no other setting."""
+        env = dict((key, value) for (key, value) in os.environ.items()
+                   if not key.startswith(('OS_', 'OASIS_')))
+        env.update(OS_AUTH_URL=self.server.auth_url, OS_USERNAME='demo',
+                   OS_PASSWORD='demo', OS_PROJECT_NAME='demo',
+                   XDG_CACHE_HOME=self.make_tempdir())
+        patcher = mock.patch.dict(os.environ, env, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
@@ -0,0 +1,144 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+
+from oasisclient.common import bench
+from oasisclient.common import cliutils as utils
+from oasisclient import exceptions
+
+
+def _parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        op, _sep, weight = item.partition('=')
+        try:
+            mix[op.strip()] = float(weight) if weight else 1.0
+        except ValueError:
+            raise exceptions.CommandError("Invalid weight in '%s'" % item)
+    return mix
+
+
+def _load_json(value):
+    """Parse JSON given inline, or from a file as @<file>."""
+    if value is None:
+        return None
+    try:
+        if value.startswith('@'):
+            with open(value[1:]) as f:
+                return json.load(f)
+        return json.loads(value)
+    except (IOError, OSError, ValueError) as e:
+        raise exceptions.CommandError("Invalid JSON '%s': %s" % (value, e))
+
+
+def _print_report(report):
+    print("%(requests)d requests in %(duration).1fs, %(throughput).1f/s, "
+          "%(errors)d errors, %(cpu_per_request).3f ms client CPU per "
+          "request" % report)
+    rows = sorted(report['operations'].items())
+    rows.append(('all', dict(report['latency'], errors={}, skipped=0)))
+    columns = ['count', 'mean', 'p50', 'p90', 'p99', 'p99.9', 'max']
+    print('%-8s' % 'op' + ''.join('%10s' % c for c in columns) +
+          '  errors')
+    for op, summary in rows:
+        errors = ', '.join('%s: %d' % item
+                           for item in sorted(summary['errors'].items()))
+        if summary['skipped']:
+            errors = ', '.join(filter(None, [
+                errors, 'skipped: %d' % summary['skipped']]))
+        print('%-8s' % op + '%10d' % summary['count'] +
+              ''.join('%10.2f' % summary[c] for c in columns[1:]) +
+              ('  ' + errors).rstrip())
+
+
+@utils.arg('resource',
+           metavar='<resource>',
+           help='Collection to drive, e.g. functions or endpoints.')
+@utils.arg('--mix',
+           metavar='<op=weight,...>',
+           default='list=1,get=4',
+           help='Weights of the operations, among %s.' %
+                ', '.join(bench.OPERATIONS))
+@utils.arg('--mode',
+           choices=bench.MODES,
+           default='closed',
+           help="'closed' to send a request as soon as a worker is free, "
+                "'open' to send them at a fixed --rate.")
+@utils.arg('--workers',
+           metavar='<workers>',
+           type=int,
+           default=8,
+           help='Number of concurrent requests.')
+@utils.arg('--rate',
+           metavar='<requests/s>',
+           type=float,
+           default=None,
+           help='Arrival rate of the open loop.')
+@utils.arg('--duration',
+           metavar='<seconds>',
+           type=float,
+           default=None,
+           help='Seconds to run for; 10 unless --requests is given.')
+@utils.arg('--requests',
+           metavar='<count>',
+           type=int,
+           default=None,
+           help='Number of requests to send.')
+@utils.arg('--warmup',
+           metavar='<seconds>',
+           type=float,
+           default=0.0,
+           help='Seconds run before measuring.')
+@utils.arg('--template',
+           metavar='<json>',
+           default=None,
+           help="Body of the created objects, or @<file>; '{n}' in its "
+                "strings becomes a serial number.")
+@utils.arg('--changes',
+           metavar='<json>',
+           default=None,
+           help='Fields set by update, or @<file>; defaults to the '
+                'template.')
+@utils.arg('--seed',
+           metavar='<seed>',
+           type=int,
+           default=None,
+           help='Seed of the random choices, to repeat a run.')
+@utils.arg('--json',
+           action='store_true',
+           default=False,
+           help='Print the report as JSON.')
+def do_bench(cs, args):
+    """Drive a mix of operations against a collection and measure it."""
+    managers = cs.managers()
+    if args.resource not in managers:
+        raise exceptions.CommandError(
+            "Unknown resource '%s', choose from: %s" %
+            (args.resource, ', '.join(sorted(managers))))
+    duration = args.duration
+    if duration is None and args.requests is None:
+        duration = 10.0
+    try:
+        runner = bench.Bench(managers[args.resource], _parse_mix(args.mix),
+                             template=_load_json(args.template),
+                             changes=_load_json(args.changes),
+                             seed=args.seed)
+        report = runner.run(mode=args.mode, workers=args.workers,
+                            rate=args.rate, duration=duration,
+                            requests=args.requests, warmup=args.warmup)
+    except ValueError as e:
+        raise exceptions.CommandError(str(e))
+    if args.json:
+        print(json.dumps(report, indent=2, sort_keys=True))
+    else:
+        _print_report(report)
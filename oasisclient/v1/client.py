@@ -13,18 +13,26 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import atexit
+import os
+
 from keystoneauth1 import loading
 from keystoneauth1.exceptions import catalog
 from keystoneauth1 import session as ksa_session
 import os_client_config
 
 from oasisclient.v1 import functions
+from oasisclient.common import base
 from oasisclient.common import httpclient
+from oasisclient.common import index
+from oasisclient.common import pagination
+from oasisclient.common import utils
 from oasisclient.v1 import policy
 from oasisclient.v1 import nodepool
 from oasisclient.v1 import nodepoolpolicy
 from oasisclient.v1 import endpoint
 from oasisclient.v1 import httpapi
+from oasisclient.v1 import mirror
 from oasisclient.v1 import request
 from oasisclient.v1 import requestheader
 from oasisclient.v1 import response
@@ -38,6 +46,15 @@ import logging
 LOG = logging.getLogger(__name__)
 
 
+def _load_session(cloud, insecure=False):
+    """Return a session authenticated as a cloud of clouds.yaml says."""
+    cloud_config = os_client_config.OpenStackConfig().get_one_cloud(
+        cloud=cloud, verify=not insecure)
+    verify, cert = cloud_config.get_requests_verify_args()
+    return ksa_session.Session(auth=cloud_config.get_auth(), verify=verify,
+                               cert=cert)
+
+
 class Client(object):
     def __init__(self, username=None, api_key=None, project_id=None,
                  project_name=None, auth_url=None, oasis_url=None,
@@ -46,82 +63,89 @@ class Client(object):
                  session=None, password=None, auth_type='password',
                  interface='public', service_name=None, insecure=False,
                  user_domain_id=None, user_domain_name=None,
-                 project_domain_id=None, project_domain_name=None):
-
-        # We have to keep the api_key are for backwards compat, but let's
-        # remove it from the rest of our code since it's not a keystone
-        # concept
-        if not password:
-            password = api_key
-        # Backwards compat for people assing in endpoint_type
-        if endpoint_type:
-            interface = endpoint_type
-
-        if oasis_url and input_auth_token:
-            auth_type = 'admin_token'
-            session = None
-            loader_kwargs = dict(
-                token=input_auth_token,
-                endpoint=oasis_url)
-
-        elif input_auth_token and not session:
-            auth_type = 'token'
-            loader_kwargs = dict(
-                token=input_auth_token,
-                auth_url=auth_url,
-                project_id=project_id,
-                project_name=project_name,
-                user_domain_id=user_domain_id,
-                user_domain_name=user_domain_name,
-                project_domain_id=project_domain_id,
-                project_domain_name=project_domain_name)
-
-            print '$$$$$$$$$$$$$$$$$$$$$$$$$$$$$'
-            print loader_kwargs
-        else:
-            loader_kwargs = dict(
-                username=username,
-                password=password,
-                auth_url=auth_url,
-                project_id=project_id,
-                project_name=project_name,
-                user_domain_id=user_domain_id,
-                user_domain_name=user_domain_name,
-                project_domain_id=project_domain_id,
-                project_domain_name=project_domain_name)
-
-        # Backwards compatibility for people not passing in Session
-        if session is None:
-            loader = loading.get_plugin_loader(auth_type)
-
-            # This should be able to handle v2 and v3 Keystone Auth
-            auth_plugin = loader.load_from_options(**loader_kwargs)
-            session = ksa_session.Session(
-                auth=auth_plugin, verify=(not insecure))
-
-        client_kwargs = {}
-        if oasis_url:
-            client_kwargs['endpoint_override'] = oasis_url
-
-        if not oasis_url:
-            try:
-                # Trigger an auth error so that we can throw the exception
-                # we always have
-                session.get_endpoint(
-                    service_type=service_type,
-                    service_name=service_name,
-                    interface=interface,
-                    region_name=region_name)
-            except Exception:
-                raise RuntimeError("Not Authorized")
-
-        self.http_client = httpclient.SessionClient(
-            service_type=service_type,
-            service_name=service_name,
-            interface=interface,
-            region_name=region_name,
-            session=session,
-            **client_kwargs)
+                 project_domain_id=None, project_domain_name=None,
+                 http_client=None, cloud=None, user_id=None):
+
+        # An HTTP client given as is, e.g. a replay of recorded traffic,
+        # needs no authentication.
+        if http_client is None:
+            # We have to keep the api_key are for backwards compat, but let's
+            # remove it from the rest of our code since it's not a keystone
+            # concept
+            if not password:
+                password = api_key
+            # Backwards compat for people assing in endpoint_type
+            if endpoint_type:
+                interface = endpoint_type
+
+            if oasis_url and input_auth_token:
+                auth_type = 'admin_token'
+                session = None
+                loader_kwargs = dict(
+                    token=input_auth_token,
+                    endpoint=oasis_url)
+
+            elif input_auth_token and not session:
+                auth_type = 'token'
+                loader_kwargs = dict(
+                    token=input_auth_token,
+                    auth_url=auth_url,
+                    project_id=project_id,
+                    project_name=project_name,
+                    user_domain_id=user_domain_id,
+                    user_domain_name=user_domain_name,
+                    project_domain_id=project_domain_id,
+                    project_domain_name=project_domain_name)
+            else:
+                loader_kwargs = dict(
+                    user_id=user_id,
+                    username=username,
+                    password=password,
+                    auth_url=auth_url,
+                    project_id=project_id,
+                    project_name=project_name,
+                    user_domain_id=user_domain_id,
+                    user_domain_name=user_domain_name,
+                    project_domain_id=project_domain_id,
+                    project_domain_name=project_domain_name)
+
+            # A named cloud brings its own credentials, from clouds.yaml.
+            if session is None and cloud:
+                session = _load_session(cloud, insecure)
+
+            # Backwards compatibility for people not passing in Session
+            if session is None:
+                loader = loading.get_plugin_loader(auth_type)
+
+                # This should be able to handle v2 and v3 Keystone Auth
+                auth_plugin = loader.load_from_options(**loader_kwargs)
+                session = ksa_session.Session(
+                    auth=auth_plugin, verify=(not insecure))
+
+            client_kwargs = {}
+            if oasis_url:
+                client_kwargs['endpoint_override'] = oasis_url
+
+            if not oasis_url:
+                try:
+                    # Trigger an auth error so that we can throw the exception
+                    # we always have
+                    session.get_endpoint(
+                        service_type=service_type,
+                        service_name=service_name,
+                        interface=interface,
+                        region_name=region_name)
+                except Exception:
+                    raise RuntimeError("Not Authorized")
+
+            http_client = httpclient.SessionClient(
+                service_type=service_type,
+                service_name=service_name,
+                interface=interface,
+                region_name=region_name,
+                session=session,
+                **client_kwargs)
+        self.http_client = http_client
 
         self.function = functions.FunctionManager(self.http_client)
         self.policy = policy.PolicyManager(self.http_client)
@@ -134,3 +158,70 @@ class Client(object):
         self.response_code = responsecode.ResponseCodeManager(self.http_client)
         self.httpapi = httpapi.HttpApiManager(self.http_client)
         self.response_message = responsemessage.ResponseMessageManager(self.http_client)
+
+        self.cache_scope = None
+        self._mirror = None
+
+    def set_transport(self, transport):
+        """Make all the managers send their requests through `transport`.
+
+        :param transport: an object with the json_request and raw_request
+            methods of the HTTP clients, typically wrapping
+            :attr:`http_client`, see :mod:`oasisclient.common.replay`.
+        """
+        self.http_client = transport
+        for manager in vars(self).values():
+            if isinstance(manager, base.Manager):
+                manager.api = transport
+
+    def managers(self):
+        """Return the managers of the v1 collections, keyed by collection."""
+        return dict((manager.collection_key, manager)
+                    for manager in vars(self).values()
+                    if isinstance(manager, base.Manager) and
+                    manager.collection_key)
+
+    def enable_index_cache(self, scope):
+        """Persist the name indexes of the managers between runs.
+
+        :param scope: key separating the caches of different clouds,
+            projects and users.
+        """
+        if self.cache_scope is None:
+            atexit.register(self.flush_index_cache)
+        self.cache_scope = scope
+        for key, manager in self.managers().items():
+            manager.get_index(index.default_cache_file(scope, key))
+
+    def flush_index_cache(self):
+        """Persist the changes made to the name indexes since last time."""
+        for manager in self.managers().values():
+            if manager._index is not None:
+                manager._index.flush()
+
+    def enable_page_tuning(self, **kwargs):
+        """Adapt the page size of paginated listings as they go.
+
+        Every manager gets its own
+        :class:`oasisclient.common.pagination.PageSizeTuner`, since item
+        sizes differ between collections; keyword arguments such as
+        `target_latency`, `min_limit` and `max_limit` are passed on to it.
+        """
+        for manager in self.managers().values():
+            manager.page_tuner = pagination.PageSizeTuner(**kwargs)
+
+    def mirror(self, **kwargs):
+        """Return the local SQLite mirror of the collections.
+
+        The mirror lives in the user cache directory when the caches are
+        enabled, in memory otherwise. Keyword arguments are passed on to
+        :class:`oasisclient.v1.mirror.Mirror` when it is created.
+        """
+        if self._mirror is None:
+            path = ':memory:'
+            if self.cache_scope:
+                path = os.path.join(
+                    utils.cache_dir('mirror', self.cache_scope),
+                    'oasis.sqlite')
+            self._mirror = mirror.Mirror(self, path, **kwargs)
+        return self._mirror
@@ -13,6 +13,8 @@ class Endpoint(base.Resource):
 
 class EndpointManager(base.Manager):
     resource_class = Endpoint
+    collection_key = 'endpoints'
+    filter_params = ('name', 'project_id')
 
     @staticmethod
     def _path(id=None):
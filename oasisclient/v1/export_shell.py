@@ -0,0 +1,72 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import sys
+
+from oasisclient.common import cliutils as utils
+from oasisclient.common import export
+from oasisclient import exceptions
+
+
+@utils.arg('resource',
+           metavar='<resource>',
+           help='Collection to export, e.g. functions or requests.')
+@utils.arg('--format',
+           dest='fmt',
+           choices=export.FORMATS,
+           default='ndjson',
+           help='Output format.')
+@utils.arg('-o', '--output',
+           metavar='<file>',
+           default='-',
+           help='Output file; defaults to stdout.')
+@utils.arg('--compress',
+           choices=export.COMPRESSIONS,
+           default=None,
+           help='Compress the output.')
+@utils.arg('--fields',
+           metavar='<field,field,...>',
+           default=None,
+           help='Attributes to export; defaults to all of them, as found '
+                'on the first object for csv and parquet.')
+@utils.arg('--sort-key',
+           metavar='<sort-key>',
+           default=None,
+           help='Attribute to sort the listing on.')
+@utils.arg('--marker',
+           metavar='<marker>',
+           default=None,
+           help='ID of the object to start after.')
+@utils.arg('--checkpoint',
+           metavar='<file>',
+           default=None,
+           help='Save the progress to this file, and resume from it when '
+                'it exists.')
+def do_export(cs, args):
+    """Stream a whole collection to a file."""
+    managers = cs.managers()
+    if args.resource not in managers:
+        raise exceptions.CommandError(
+            "Unknown resource '%s', choose from: %s" %
+            (args.resource, ', '.join(sorted(managers))))
+    fields = args.fields.split(',') if args.fields else None
+    try:
+        count = export.export(managers[args.resource], args.output,
+                              fmt=args.fmt, compression=args.compress,
+                              fields=fields, sort_key=args.sort_key,
+                              marker=args.marker, checkpoint=args.checkpoint)
+    except ValueError as e:
+        raise exceptions.CommandError(str(e))
+    if args.output != '-':
+        print("Exported %d %s to %s." % (count, args.resource, args.output))
+    else:
+        sys.stderr.write("Exported %d %s.\n" % (count, args.resource))
@@ -9,32 +9,124 @@ from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives import serialization
 from cryptography import x509
 from cryptography.x509.oid import NameOID
+import json
 import os
+import sys
 
 
 @utils.arg('--name',
-           metavar='<function>',
-           help='Name of the baymodel to create.')
+           metavar='<name>',
+           help='Only list the functions with this name.')
+@utils.arg('--max-age',
+           metavar='<seconds>',
+           type=int,
+           default=None,
+           help='Answer from the local mirror, syncing it first if it is '
+                'older than <seconds>.')
+@utils.arg('-f', '--format',
+           dest='output_format',
+           choices=utils.OUTPUT_FORMATS,
+           default='table',
+           help='Output format; all but table print the functions as the '
+                'pages of the listing arrive.')
 def do_function_list(cs, args):
     """Print a list of functions."""
-    functions = cs.function.list()
+    if args.max_age is not None:
+        mirror = cs.mirror()
+        if args.name:
+            functions = mirror.find('functions', max_age=args.max_age,
+                                    name=args.name)
+        else:
+            functions = mirror.list('functions', max_age=args.max_age)
+    elif args.name:
+        functions = cs.function.iter_findall(name=args.name)
+    else:
+        # Every page whatever the format; only the table waits for the
+        # last one before printing.
+        functions = cs.function.iter_findall()
 
-    columns = ['name', 'user_id', 'project_id']
-    columns += utils._get_list_table_columns_and_formatters(
-        args.fields, functions,
-        exclude_fields=(c.lower() for c in columns))[0]
-    # utils.print_list(functions, columns,
-    #                  {'versions': magnum_utils.print_list_field('versions')},
-    #                  sortby_index=None)
+    columns = ['id', 'name', 'user_id', 'project_id']
+    utils.print_list(functions, columns, sortby_index=None,
+                     output_format=args.output_format)
 
 @utils.arg('function',
            metavar='<function>',
            nargs='+',
            help='ID or name of the (function)s to delete.')
+@utils.arg('--parallel',
+           metavar='<workers>',
+           type=int,
+           default=1,
+           help='Number of functions deleted at once.')
 def do_function_delete(cs, args):
     """Delete specified function."""
-    pass
+    if hasattr(cs.http_client, 'set_pool_size'):
+        cs.http_client.set_pool_size(args.parallel)
+    failed = utils.run_for_each(
+        lambda function: cs.function.delete(
+            cs.function.resolve(function, verify=True)),
+        args.function, args.parallel,
+        success="Request to delete function %(target)s has been accepted.",
+        failure="Delete for function %(target)s failed: %(e)s")
+    if failed:
+        raise exceptions.CommandError(
+            "Unable to delete %d of the functions." % len(failed))
 
 def do_function_test(cs, args):
     """API Connect Test."""
-    cs.function.test()
\ No newline at end of file
+    cs.function.test()
+
+
+def _invoke_payload(value):
+    if value is None:
+        return None
+    if value == '@-':
+        return getattr(sys.stdin, 'buffer', sys.stdin)
+    if value.startswith('@'):
+        try:
+            return open(value[1:], 'rb')
+        except (IOError, OSError) as e:
+            raise exceptions.CommandError("Cannot read %s: %s" %
+                                          (value[1:], e))
+    try:
+        return json.loads(value)
+    except ValueError as e:
+        raise exceptions.CommandError("Invalid JSON '%s': %s" % (value, e))
+
+
+@utils.arg('target',
+           metavar='<target>',
+           help='ID or name of the function, endpoint or httpapi to call, '
+                'or the URL to call.')
+@utils.arg('--data',
+           metavar='<json>',
+           default=None,
+           help='JSON payload, or @<file> to send a file as is, @- for '
+                'stdin.')
+@utils.arg('--method',
+           metavar='<method>',
+           default=None,
+           help='HTTP method, instead of the one of the route.')
+@utils.arg('--content-type',
+           metavar='<type>',
+           default=None,
+           help='Content type of a payload read from a file.')
+def do_function_invoke(cs, args):
+    """Call a deployed function and print its response as it comes."""
+    payload = _invoke_payload(args.data)
+    headers = {}
+    if args.content_type:
+        headers['Content-Type'] = args.content_type
+    try:
+        resp = cs.function.invoke(args.target, payload, method=args.method,
+                                  headers=headers, stream=True)
+    finally:
+        if hasattr(payload, 'close') and args.data != '@-':
+            payload.close()
+    out = getattr(sys.stdout, 'buffer', sys.stdout)
+    try:
+        for chunk in resp.iter_content(chunk_size=None):
+            out.write(chunk)
+            out.flush()
+    finally:
+        resp.close()
@@ -1,9 +1,9 @@
 from oasisclient.common import base
 from oasisclient.common import utils
+from oasisclient.v1 import invocation
 
-import jsonpatch
 import logging
-import json
+import threading
 
 LOG = logging.getLogger(__name__)
 
@@ -15,6 +15,21 @@ class Function(base.Resource):
 
 class FunctionManager(base.Manager):
     resource_class = Function
+    collection_key = 'functions'
+    filter_params = ('name', 'project_id')
+
+    def __init__(self, api):
+        super(FunctionManager, self).__init__(api)
+        self._invoker = None
+        self._invoker_lock = threading.Lock()
+
+    @property
+    def invoker(self):
+        """The :class:`~oasisclient.v1.invocation.Invoker` of the calls."""
+        with self._invoker_lock:
+            if self._invoker is None:
+                self._invoker = invocation.Invoker(self)
+            return self._invoker
 
     @staticmethod
     def _path(id=None):
@@ -74,16 +89,32 @@ class FunctionManager(base.Manager):
     def delete(self, id):
         return self._delete(self._path(id))
 
-    def update(self, id, **param):
-
-        original_function = self.get(id).to_dict()
-        del original_function['user_id']
-        del original_function['created_at']
-        del original_function['updated_at']
-        del original_function['id']
-        del original_function['project_id']
-        LOG.debug(original_function)
-        LOG.debug(param)
-        patch = jsonpatch.JsonPatch.from_diff(original_function, param)
-        LOG.debug(str(patch))
-        return self._update(self._path(id), json.loads(str(patch)))
+    def update(self, id, original=None, **param):
+        """Update the given fields of a function.
+
+        :param original: the object as last read, used to send only what
+            changed and to detect concurrent updates through its ETag.
+        """
+        return self._update_fields(self._path(id), param, original=original)
+
+    def invoke(self, target, payload=None, **kwargs):
+        """Call a deployed function and return its response.
+
+        See :meth:`oasisclient.v1.invocation.Invoker.invoke`.
+        """
+        return self.invoker.invoke(target, payload, **kwargs)
+
+    def invoke_async(self, target, payload=None, **kwargs):
+        """Call a deployed function in the background, return a future.
+
+        See :meth:`oasisclient.v1.invocation.Invoker.invoke_async`.
+        """
+        return self.invoker.invoke_async(target, payload, **kwargs)
+
+    def invoke_many(self, target, payloads, max_workers=None, **kwargs):
+        """Call a deployed function once per payload, concurrently.
+
+        See :meth:`oasisclient.v1.invocation.Invoker.invoke_many`.
+        """
+        return self.invoker.invoke_many(target, payloads, max_workers,
+                                        **kwargs)
@@ -1,11 +1,35 @@
+from oasisclient.common.apiclient import exceptions
 from oasisclient.common import base
+from oasisclient.common import concurrency
 from oasisclient.common import utils
+from oasisclient.v1 import request
+from oasisclient.v1 import requestheader
+from oasisclient.v1 import response
+from oasisclient.v1 import responsecode
+from oasisclient.v1 import responsemessage
 
+import collections
 import logging
 
 LOG = logging.getLogger(__name__)
 
 
+# Objects hanging off an httpapi: (attribute in the tree, manager class,
+# attribute of the child holding the ID of its parent, children).
+HTTPAPI_TREE = (
+    ('requests', request.RequestManager, 'httpapi_id', (
+        ('request_headers', requestheader.RequestHeaderManager,
+         'request_id', ()),
+    )),
+    ('responses', response.ResponseManager, 'httpapi_id', (
+        ('response_codes', responsecode.ResponseCodeManager,
+         'response_id', ()),
+        ('response_messages', responsemessage.ResponseMessageManager,
+         'response_id', ()),
+    )),
+)
+
+
 class HttpApi(base.Resource):
     def __repr__(self):
         return "<HttpApis %s>" % self._info
@@ -13,6 +37,8 @@ class HttpApi(base.Resource):
 
 class HttpApiManager(base.Manager):
     resource_class = HttpApi
+    collection_key = 'httpapis'
+    filter_params = ('name', 'project_id')
 
     @staticmethod
     def _path(id=None):
@@ -65,7 +91,7 @@ class HttpApiManager(base.Manager):
 
     def get(self, id):
         try:
-            return self._list(self._path(id), "httpapis")
+            return self._list(self._path(id))[0]
         except IndexError:
             return None
 
@@ -74,3 +100,64 @@ class HttpApiManager(base.Manager):
 
     def update(self, id, patch):
         return self._update(self._path(id), patch)
+
+    def get_tree(self, id, max_workers=concurrency.DEFAULT_WORKERS):
+        """Get an httpapi along with all the objects hanging off it.
+
+        Lookups run concurrently, one level of HTTPAPI_TREE at a time;
+        the httpapi itself is fetched along with its direct children.
+        Each distinct lookup is made once and an object reached through
+        several parents is shared between them.
+
+        :param id: ID of the httpapi.
+        :param max_workers: maximum number of concurrent requests.
+        :returns: the httpapi as a `dict`, with its children as lists of
+            `dict` under the attributes named in HTTPAPI_TREE.
+        """
+        managers = {}
+        tree = {}
+        nodes = {}
+
+        def fetch(task):
+            manager_class, key, parent_id = task
+            if manager_class is None:
+                return [self.get(parent_id)]
+            manager = managers.get(manager_class)
+            if manager is None:
+                manager = managers[manager_class] = manager_class(self.api)
+            return manager.findall(**{key: parent_id})
+
+        # lookup -> [(dict to attach the results to, attribute, children)]
+        wave = collections.OrderedDict()
+        wave[(None, None, id)] = [(None, None, ())]
+        for attr, manager_class, key, children in HTTPAPI_TREE:
+            wave.setdefault((manager_class, key, id), []).append(
+                (tree, attr, children))
+
+        while wave:
+            next_wave = collections.OrderedDict()
+            for task, objs, exc in concurrency.run_concurrently(
+                    fetch, list(wave), max_workers):
+                if exc is not None:
+                    raise exc
+                for parent, attr, children in wave[task]:
+                    if parent is None:
+                        if not objs[0]:
+                            raise exceptions.NotFound(
+                                "HttpApi %s not found" % id)
+                        tree.update(objs[0].to_dict())
+                        continue
+
+                    nested = []
+                    for obj in objs:
+                        node = nodes.get((task[0], obj.id))
+                        if node is None:
+                            node = nodes[(task[0], obj.id)] = obj.to_dict()
+                            for child in children:
+                                next_wave.setdefault(
+                                    (child[1], child[2], obj.id), []).append(
+                                    (node, child[0], child[3]))
+                        nested.append(node)
+                    parent[attr] = nested
+            wave = next_wave
+        return tree
@@ -0,0 +1,275 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Invocation of deployed functions.
+
+A function is called at the URL of one of its endpoints, or at the route
+of an httpapi. :class:`Invoker` looks that URL up once per target and
+keeps it, and makes the calls over a pool of keep-alive connections of
+its own::
+
+    resp = cs.function.invoke('hello', {'name': 'world'})
+    future = cs.function.invoke_async('hello', {'name': 'world'})
+    for payload, resp, exc in cs.function.invoke_many('hello', payloads):
+        ...
+"""
+
+import threading
+
+from concurrent import futures
+from oslo_utils import uuidutils
+import requests
+from requests import adapters
+import six
+
+from oasisclient.common import base
+from oasisclient.common import concurrency
+from oasisclient.common import httpclient
+from oasisclient import exceptions
+from oasisclient.v1 import endpoint
+from oasisclient.v1 import httpapi
+
+# Attribute of an endpoint holding the URL it serves its function at.
+ENDPOINT_URL_ATTR = 'url'
+
+# Attributes of an httpapi: the endpoint serving it, and the path and
+# method of its route on that endpoint.
+HTTPAPI_ENDPOINT_ATTR = 'endpoint_id'
+HTTPAPI_PATH_ATTR = 'path'
+HTTPAPI_METHOD_ATTR = 'method'
+
+DEFAULT_METHOD = 'POST'
+
+
+def _lookup(manager, name_or_id):
+    """Return the object of `manager` with that ID or name, None if none."""
+    try:
+        if uuidutils.is_uuid_like(name_or_id):
+            return manager.get(name_or_id)
+        return manager.find(name=name_or_id)
+    except exceptions.NotFound:
+        return None
+
+
+def _join(url, path):
+    if not path:
+        return url
+    return '%s/%s' % (url.rstrip('/'), path.lstrip('/'))
+
+
+class Invoker(object):
+    """Calls deployed functions over a pool of keep-alive connections.
+
+    :param manager: the FunctionManager to look the targets up with.
+    :param pool_size: maximum number of concurrent calls, and of idle
+        connections kept around.
+    :param timeout: seconds to wait for the server, or a
+        ``(connect, read)`` tuple; None to wait forever.
+    :param verify: whether to verify the TLS certificates, or a CA
+        bundle to verify them against.
+    """
+
+    def __init__(self, manager, pool_size=concurrency.DEFAULT_WORKERS,
+                 timeout=None, verify=True):
+        self.manager = manager
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.verify = verify
+        self.pool_size = 0
+        self._routes = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self.set_pool_size(pool_size)
+
+    def set_pool_size(self, size):
+        """Let up to `size` concurrent calls share the connection pool."""
+        with self._lock:
+            if size <= self.pool_size:
+                return
+            self.pool_size = size
+            for prefix in ('https://', 'http://'):
+                self.session.mount(prefix, adapters.HTTPAdapter(
+                    pool_maxsize=size, max_retries=0))
+            if self._executor is not None:
+                # Replaced by a larger one on the next invoke_async();
+                # the calls already submitted finish on this one.
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def close(self):
+        """Wait for the pending calls, and close the connections."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+        self.session.close()
+
+    # Routes
+
+    def route(self, target):
+        """Return the method and URL of the calls to `target`.
+
+        Targets other than URLs are looked up on the first call only.
+
+        :param target: a function, endpoint or httpapi, or the ID or name
+            of one, looked up in that order; or the URL to call.
+        :raises NotFound: if `target` is none of those, or is a function
+            without an endpoint.
+        """
+        if (isinstance(target, six.string_types) and
+                target.startswith(('http://', 'https://'))):
+            return DEFAULT_METHOD, target
+        key = base.getid(target)
+        with self._lock:
+            route = self._routes.get(key)
+        if route is None:
+            route = self._resolve(target)
+            with self._lock:
+                self._routes[key] = route
+        return route
+
+    def forget(self, target=None):
+        """Look `target` up again on its next call, or all the targets."""
+        with self._lock:
+            if target is None:
+                self._routes.clear()
+            else:
+                self._routes.pop(base.getid(target), None)
+
+    def _resolve(self, target):
+        api = self.manager.api
+        endpoints = endpoint.EndpointManager(api)
+        if isinstance(target, base.Resource):
+            kind, obj = target.manager.collection_key, target
+        else:
+            for manager in (self.manager, endpoints,
+                            httpapi.HttpApiManager(api)):
+                obj = _lookup(manager, target)
+                if obj is not None:
+                    kind = manager.collection_key
+                    break
+            else:
+                raise exceptions.NotFound(
+                    "No function, endpoint or httpapi '%s' exists." % target)
+
+        if kind == 'endpoints':
+            return DEFAULT_METHOD, self._endpoint_url(obj)
+        if kind == 'httpapis':
+            endpoint_id = getattr(obj, HTTPAPI_ENDPOINT_ATTR, None)
+            served_by = endpoint_id and _lookup(endpoints, endpoint_id)
+            if not served_by:
+                raise exceptions.NotFound(
+                    "HttpApi %s has no endpoint." % obj.id)
+            return ((getattr(obj, HTTPAPI_METHOD_ATTR, None) or
+                     DEFAULT_METHOD).upper(),
+                    _join(self._endpoint_url(served_by),
+                          getattr(obj, HTTPAPI_PATH_ATTR, None)))
+        for candidate in endpoints.findall(function_id=obj.id):
+            if getattr(candidate, ENDPOINT_URL_ATTR, None):
+                return DEFAULT_METHOD, self._endpoint_url(candidate)
+        raise exceptions.NotFound("Function %s has no endpoint." % obj.id)
+
+    @staticmethod
+    def _endpoint_url(obj):
+        url = getattr(obj, ENDPOINT_URL_ATTR, None)
+        if not url:
+            raise exceptions.NotFound("Endpoint %s has no URL." % obj.id)
+        return url
+
+    # Calls
+
+    def invoke(self, target, payload=None, method=None, headers=None,
+               stream=False, timeout=None):
+        """Call a function, and return its response.
+
+        :param target: see :meth:`route`.
+        :param payload: body of the call: a `dict` or `list`, sent as
+            JSON; bytes or text, sent as is; a file or an iterator of
+            bytes, streamed; None for no body.
+        :param method: HTTP method, instead of the route's.
+        :param headers: `dict` of extra headers.
+        :param stream: return as soon as the headers are read; the body
+            is then read from the response, e.g. with iter_content(), and
+            the connection goes back to the pool once it is read or the
+            response is closed.
+        :param timeout: see :class:`Invoker`, for this call only.
+        :returns: a `requests.Response`.
+        :raises HttpError: if the function answers with an HTTP error.
+        :raises ConnectionRefused: if the function cannot be reached.
+        """
+        route_method, url = self.route(target)
+        method = method or route_method
+        kwargs = {'headers': headers, 'stream': stream,
+                  'timeout': timeout or self.timeout}
+        if isinstance(payload, (dict, list)):
+            kwargs['json'] = payload
+        elif payload is not None:
+            kwargs['data'] = payload
+
+        timings = getattr(self.manager.api, 'timings', None)
+        with httpclient._timed(timings, method, url) as timing:
+            try:
+                resp = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                raise exceptions.ConnectionRefused(
+                    "Error communicating with %(url)s %(e)s"
+                    % dict(url=url, e=e))
+            if resp.status_code >= 400:
+                timing.response(resp.status_code, len(resp.content))
+                if resp.status_code == 404:
+                    # The endpoint may have moved.
+                    self.forget(target)
+                error_json = httpclient._extract_error_json(resp.content)
+                raise exceptions.from_response(
+                    resp, error_json.get('faultstring'),
+                    error_json.get('debuginfo'), method, url)
+            timing.response(resp.status_code,
+                            None if stream else len(resp.content))
+        return resp
+
+    def invoke_async(self, target, payload=None, **kwargs):
+        """Call a function in the background.
+
+        At most `pool_size` calls run at once; the others wait for their
+        turn.
+
+        :param kwargs: see :meth:`invoke`.
+        :returns: a `concurrent.futures.Future` of the response.
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = futures.ThreadPoolExecutor(
+                    max_workers=self.pool_size)
+            executor = self._executor
+        return executor.submit(self.invoke, target, payload, **kwargs)
+
+    def invoke_many(self, target, payloads, max_workers=None, **kwargs):
+        """Call a function once per payload, concurrently.
+
+        The target is looked up before the first call. With `stream`,
+        every response holds its connection until it is read or closed.
+
+        :param payloads: iterable of payloads, consumed lazily.
+        :param max_workers: maximum number of concurrent calls,
+            `pool_size` by default.
+        :param kwargs: see :meth:`invoke`.
+        :returns: generator of ``(payload, response, exception)`` tuples,
+            in completion order; `exception` is None if the call
+            succeeded.
+        """
+        max_workers = max_workers or self.pool_size
+        self.set_pool_size(max_workers)
+        self.route(target)
+        return concurrency.run_concurrently(
+            lambda payload: self.invoke(target, payload, **kwargs),
+            payloads, max_workers)
@@ -0,0 +1,316 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Declarative management of v1 resources from a manifest.
+
+A manifest lists the resources that should exist::
+
+    {"resources": [
+        {"type": "function", "name": "hello",
+         "properties": {"runtime": "python"}},
+        {"type": "endpoint", "name": "hello-ep",
+         "properties": {"function_id": {"get_resource": "hello"}}},
+        {"type": "httpapi", "name": "old-api", "state": "absent"}
+    ]}
+
+`type` is either a client attribute (``request_header``) or a collection
+(``requestheaders``). ``{"get_resource": <name>}`` stands for the ID of
+another resource of the manifest and makes this one depend on it. Named
+resources are matched to the live ones by name, the others by `match`
+(all of their properties by default).
+"""
+
+import collections
+import json
+
+from oslo_utils import importutils
+import six
+
+from oasisclient.common.apiclient import exceptions as apiexc
+from oasisclient.common import base
+from oasisclient.common import concurrency
+from oasisclient import exceptions
+from oasisclient.i18n import _
+
+yaml = importutils.try_import('yaml')
+
+REF_KEY = 'get_resource'
+
+CREATE = 'create'
+UPDATE = 'update'
+DELETE = 'delete'
+NOOP = 'noop'
+
+Action = collections.namedtuple('Action', ['op', 'node', 'live', 'changes'])
+
+
+class Node(object):
+    """A resource of the manifest."""
+
+    def __init__(self, name, type, manager, properties, match=None,
+                 state='present', depends_on=()):
+        self.name = name
+        self.type = type
+        self.manager = manager
+        self.properties = properties
+        self.match = match
+        self.state = state
+        self.deps = set(_refs(properties)) | set(_refs(match))
+        self.deps.update(depends_on)
+
+    def __repr__(self):
+        return '<Node %s %s>' % (self.type, self.name)
+
+
+def _refs(value):
+    if isinstance(value, dict):
+        if list(value) == [REF_KEY]:
+            yield value[REF_KEY]
+            return
+        for item in value.values():
+            for ref in _refs(item):
+                yield ref
+    elif isinstance(value, list):
+        for item in value:
+            for ref in _refs(item):
+                yield ref
+
+
+class _Unresolved(Exception):
+    pass
+
+
+def _resolve(value, ids):
+    """Replace the references in `value` by IDs."""
+    if isinstance(value, dict):
+        if list(value) == [REF_KEY]:
+            obj_id = ids.get(value[REF_KEY])
+            if obj_id is None:
+                raise _Unresolved(value[REF_KEY])
+            return obj_id
+        return dict((key, _resolve(item, ids))
+                    for (key, item) in value.items())
+    elif isinstance(value, list):
+        return [_resolve(item, ids) for item in value]
+    return value
+
+
+def load_manifest(path):
+    """Read a JSON manifest, or a YAML one if PyYAML is available."""
+    with open(path) as f:
+        data = f.read()
+    try:
+        return json.loads(data)
+    except ValueError as e:
+        if yaml is None:
+            raise exceptions.InvalidManifest(
+                _("Cannot parse manifest %(path)s: %(err)s") %
+                {'path': path, 'err': e})
+    try:
+        return yaml.safe_load(data)
+    except yaml.YAMLError as e:
+        raise exceptions.InvalidManifest(
+            _("Cannot parse manifest %(path)s: %(err)s") %
+            {'path': path, 'err': e})
+
+
+def _managers(client):
+    managers = {}
+    for attr, manager in vars(client).items():
+        if isinstance(manager, base.Manager) and manager.collection_key:
+            managers[attr] = manager
+            managers[manager.collection_key] = manager
+    return managers
+
+
+class Applier(object):
+    """Brings the live resources in line with a manifest.
+
+    :param client: a :class:`oasisclient.v1.client.Client`.
+    :param manifest: the manifest, as a `dict`.
+    :param max_workers: maximum number of concurrent API calls.
+    """
+
+    def __init__(self, client, manifest,
+                 max_workers=concurrency.DEFAULT_WORKERS):
+        self.max_workers = max_workers
+        self.nodes = self._parse(_managers(client), manifest)
+        self._sort()
+        self.ids = {}
+
+    def _parse(self, managers, manifest):
+        nodes = collections.OrderedDict()
+        for spec in (manifest or {}).get('resources') or []:
+            name = spec.get('name')
+            if not name or name in nodes:
+                raise exceptions.InvalidManifest(
+                    _("Every resource needs a unique name, got '%s'") % name)
+            manager = managers.get(spec.get('type'))
+            if manager is None:
+                raise exceptions.InvalidManifest(
+                    _("Unknown type '%(type)s' for resource %(name)s") %
+                    {'type': spec.get('type'), 'name': name})
+
+            properties = dict(spec.get('properties') or {})
+            match = spec.get('match')
+            if match is None and 'name' in manager.filter_params:
+                properties.setdefault('name', name)
+                match = {'name': properties['name']}
+            nodes[name] = Node(name, spec['type'], manager, properties,
+                               match, spec.get('state', 'present'),
+                               spec.get('depends_on', ()))
+
+        for node in nodes.values():
+            unknown = node.deps - set(nodes)
+            if unknown:
+                raise exceptions.InvalidManifest(
+                    _("Resource %(name)s refers to unknown %(refs)s") %
+                    {'name': node.name, 'refs': ', '.join(sorted(unknown))})
+        return nodes
+
+    def _sort(self):
+        order = []
+        waiting = dict((name, set(node.deps))
+                       for (name, node) in self.nodes.items())
+        while waiting:
+            ready = sorted(name for (name, deps) in waiting.items()
+                           if not deps)
+            if not ready:
+                raise exceptions.InvalidManifest(
+                    _("Dependency cycle between %s") %
+                    ', '.join(sorted(waiting)))
+            for name in ready:
+                del waiting[name]
+                order.append(name)
+            for deps in waiting.values():
+                deps.difference_update(ready)
+        self.order = order
+
+    def _find_live(self, node):
+        try:
+            match = _resolve(node.match or node.properties, self.ids)
+        except _Unresolved:
+            # What it refers to does not exist yet, so neither does it.
+            return None
+        matches = node.manager.findall(**match)
+        if len(matches) > 1:
+            raise apiexc.NoUniqueMatch(
+                _("Several live %(type)s match resource %(name)s") %
+                {'type': node.type, 'name': node.name})
+        return matches[0] if matches else None
+
+    def _plan_node(self, name):
+        node = self.nodes[name]
+        live = self._find_live(node)
+        if node.state == 'absent':
+            return Action(DELETE if live else NOOP, node, live, {})
+        if live is None:
+            return Action(CREATE, node, None, node.properties)
+
+        changes = {}
+        for key, value in node.properties.items():
+            try:
+                value = _resolve(value, self.ids)
+            except _Unresolved:
+                pass
+            if getattr(live, key, None) != value:
+                changes[key] = value
+        return Action(UPDATE if changes else NOOP, node, live, changes)
+
+    def plan(self):
+        """Compare the manifest with the live resources.
+
+        Live lookups run concurrently, one dependency level at a time.
+
+        :returns: list of :class:`Action`, in dependency order.
+        """
+        actions = {}
+        deps = dict((name, self.nodes[name].deps) for name in self.order)
+        for name, action, exc in concurrency.run_graph(
+                self._plan_and_record, deps, self.max_workers):
+            if exc is not None:
+                raise exc
+            actions[name] = action
+        return [actions[name] for name in self.order]
+
+    def _plan_and_record(self, name):
+        action = self._plan_node(name)
+        if action.live is not None and action.op != DELETE:
+            self.ids[name] = action.live.id
+        return action
+
+    def _run(self, action):
+        node = action.node
+        manager = node.manager
+        if action.op == CREATE:
+            obj = manager.create(**_resolve(node.properties, self.ids))
+            self.ids[node.name] = obj.id
+            return obj
+        elif action.op == UPDATE:
+            changes = _resolve(action.changes, self.ids)
+            return manager.update_fields(action.live.id, changes,
+                                         original=action.live)
+        elif action.op == DELETE:
+            return manager.delete(action.live.id)
+
+    def apply(self, actions=None):
+        """Carry out a plan.
+
+        Creates and updates run in dependency order, then deletes in the
+        reverse order, each as concurrently as the dependencies allow.
+        Resources depending on a failed one are skipped.
+
+        :param actions: the result of :meth:`plan`, computed if not given.
+        :returns: generator of ``(action, result, exception)`` tuples, in
+            completion order.
+        """
+        if actions is None:
+            actions = self.plan()
+        by_name = dict((action.node.name, action) for action in actions)
+
+        def run(name):
+            return self._run(by_name[name])
+
+        changing = set(name for (name, action) in by_name.items()
+                       if action.op != DELETE)
+        changing = dict((name, self.nodes[name].deps & changing)
+                        for name in changing)
+        for name, result, exc in concurrency.run_graph(
+                run, changing, self.max_workers):
+            yield by_name[name], result, exc
+
+        deleting = [name for (name, action) in by_name.items()
+                    if action.op == DELETE]
+        reverse = dict((name, set()) for name in deleting)
+        for name in deleting:
+            for dep in self.nodes[name].deps:
+                if dep in reverse:
+                    reverse[dep].add(name)
+        for name, result, exc in concurrency.run_graph(
+                run, reverse, self.max_workers):
+            yield by_name[name], result, exc
+
+
+def format_action(action):
+    """Return a one line description of an action, for plan output."""
+    node = action.node
+    line = '%s %s %s' % ({CREATE: '+', UPDATE: '~', DELETE: '-',
+                          NOOP: '='}[action.op], node.type, node.name)
+    if action.live is not None:
+        line += ' (%s)' % action.live.id
+    if action.op == UPDATE:
+        line += ': ' + ', '.join(
+            '%s: %s -> %s' % (key, getattr(action.live, key, None),
+                              six.text_type(value))
+            for (key, value) in sorted(action.changes.items()))
+    return line
@@ -0,0 +1,50 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oasisclient.common import cliutils as utils
+from oasisclient.common import concurrency
+from oasisclient import exceptions
+from oasisclient.v1 import manifest
+
+
+@utils.arg('-f', '--file',
+           metavar='<manifest>',
+           required=True,
+           help='JSON (or YAML) manifest of the resources.')
+@utils.arg('--dry-run',
+           action='store_true',
+           default=False,
+           help='Only print the plan.')
+@utils.arg('--parallel',
+           metavar='<workers>',
+           type=int,
+           default=concurrency.DEFAULT_WORKERS,
+           help='Maximum number of concurrent API calls.')
+def do_apply(cs, args):
+    """Create, update and delete resources to match a manifest."""
+    applier = manifest.Applier(cs, manifest.load_manifest(args.file),
+                               max_workers=args.parallel)
+    actions = applier.plan()
+    for action in actions:
+        if action.op != manifest.NOOP:
+            print(manifest.format_action(action))
+    if args.dry_run:
+        return
+
+    failed = 0
+    for action, result, exc in applier.apply(actions):
+        if exc is not None:
+            failed += 1
+            print("%(action)s failed: %(e)s" %
+                  {'action': manifest.format_action(action), 'e': exc})
+    if failed:
+        raise exceptions.CommandError("%d of the changes failed." % failed)
@@ -0,0 +1,197 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Local SQLite replica of the v1 collections.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from oasisclient.common import concurrency
+from oasisclient.common import watch
+
+LOG = logging.getLogger(__name__)
+
+# Attributes stored in their own indexed column, so that find() can look
+# them up without decoding every object.
+INDEXED_ATTRS = ('name', 'project_id')
+
+
+class Mirror(object):
+    """Keeps a local copy of the v1 collections in an SQLite database.
+
+    Each collection gets its own table. Synchronization is incremental,
+    using a :class:`oasisclient.common.watch.ChangeTracker` seeded from
+    the table, and runs concurrently across collections. Reads are served
+    from the database as long as the collection was synced less than
+    `max_age` seconds ago, and trigger a sync otherwise.
+
+    :param client: a :class:`oasisclient.v1.client.Client`.
+    :param path: path of the database file; defaults to an in-memory
+        database.
+    :param max_age: staleness bound of reads, in seconds.
+    :param resync_every: number of syncs between two full listings of a
+        collection, which pick up deletions.
+    """
+
+    def __init__(self, client, path=':memory:', max_age=60, resync_every=10):
+        self.managers = client.managers()
+        self.max_age = max_age
+        self.resync_every = resync_every
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS _sync ('
+                             'collection TEXT PRIMARY KEY, '
+                             'synced_at REAL, polls INTEGER)')
+            for key in self.managers:
+                self._create_table(key)
+
+    def _create_table(self, key):
+        columns = ''.join(', "%s" TEXT' % attr for attr in INDEXED_ATTRS)
+        self._db.execute('CREATE TABLE IF NOT EXISTS "%s" ('
+                         'id TEXT PRIMARY KEY, stamp TEXT%s, '
+                         'body TEXT NOT NULL)' % (key, columns))
+        for attr in INDEXED_ATTRS:
+            self._db.execute('CREATE INDEX IF NOT EXISTS "%s_%s" '
+                             'ON "%s" ("%s")' % (key, attr, key, attr))
+
+    def _manager(self, key):
+        try:
+            return self.managers[key]
+        except KeyError:
+            raise ValueError("Unknown collection '%s'" % key)
+
+    def _tracker(self, key):
+        with self._lock:
+            rows = self._db.execute('SELECT id, stamp FROM "%s"' % key)
+            snapshot = dict(rows.fetchall())
+            row = self._db.execute('SELECT polls FROM _sync '
+                                   'WHERE collection = ?', (key,)).fetchone()
+        return watch.ChangeTracker(self._manager(key),
+                                   resync_every=self.resync_every,
+                                   snapshot=snapshot,
+                                   polls=row[0] if row else 0)
+
+    def _apply(self, key, tracker, events, synced_at):
+        placeholders = ', '.join('?' * (len(INDEXED_ATTRS) + 3))
+        columns = ''.join(', "%s"' % attr for attr in INDEXED_ATTRS)
+        with self._lock, self._db:
+            for event in events:
+                if event.type == watch.DELETED:
+                    self._db.execute('DELETE FROM "%s" WHERE id = ?' % key,
+                                     (event.id,))
+                    continue
+                info = event.resource._info
+                values = [event.id, tracker.snapshot.get(event.id)]
+                values.extend(info.get(attr) for attr in INDEXED_ATTRS)
+                values.append(json.dumps(info))
+                self._db.execute('INSERT OR REPLACE INTO "%s" '
+                                 '(id, stamp%s, body) VALUES (%s)' %
+                                 (key, columns, placeholders), values)
+            self._db.execute('INSERT OR REPLACE INTO _sync '
+                             '(collection, synced_at, polls) '
+                             'VALUES (?, ?, ?)',
+                             (key, synced_at, tracker.polls))
+
+    def sync(self, collections=None,
+             max_workers=concurrency.DEFAULT_WORKERS):
+        """Bring collections up to date with the API.
+
+        :param collections: keys of the collections to sync, e.g.
+            ['functions']; all of them by default.
+        :param max_workers: number of collections synced concurrently.
+        :returns: `dict` of the number of changes applied per collection.
+        """
+        keys = list(collections or self.managers)
+
+        def poll(key):
+            started = time.time()
+            tracker = self._tracker(key)
+            return tracker, tracker.poll(), started
+
+        changes = {}
+        for key, result, exc in concurrency.run_concurrently(
+                poll, keys, max_workers):
+            if exc is not None:
+                raise exc
+            tracker, events, started = result
+            self._apply(key, tracker, events, started)
+            changes[key] = len(events)
+            LOG.debug('Synced %d changes to %s', len(events), key)
+        return changes
+
+    def age(self, key):
+        """Seconds since a collection was last synced, None if never."""
+        with self._lock:
+            row = self._db.execute('SELECT synced_at FROM _sync '
+                                   'WHERE collection = ?', (key,)).fetchone()
+        return time.time() - row[0] if row else None
+
+    def _ensure_fresh(self, key, max_age):
+        self._manager(key)
+        max_age = self.max_age if max_age is None else max_age
+        age = self.age(key)
+        if age is None or age > max_age:
+            self.sync([key])
+
+    def _resources(self, key, rows):
+        manager = self._manager(key)
+        return [manager.resource_class(manager, json.loads(body), loaded=True)
+                for (body,) in rows]
+
+    def list(self, key, max_age=None):
+        """List a collection from the mirror.
+
+        :param key: the collection, e.g. 'functions'.
+        :param max_age: staleness bound overriding the mirror's one.
+        """
+        self._ensure_fresh(key, max_age)
+        with self._lock:
+            rows = self._db.execute('SELECT body FROM "%s" ORDER BY rowid'
+                                    % key).fetchall()
+        return self._resources(key, rows)
+
+    def get(self, key, obj_id, max_age=None):
+        """Get an object from the mirror, None if there is no such object."""
+        self._ensure_fresh(key, max_age)
+        with self._lock:
+            rows = self._db.execute('SELECT body FROM "%s" WHERE id = ?'
+                                    % key, (obj_id,)).fetchall()
+        objs = self._resources(key, rows)
+        return objs[0] if objs else None
+
+    def find(self, key, max_age=None, **kwargs):
+        """Find the objects of a collection with matching attributes.
+
+        Indexed attributes are looked up by SQLite, the others are matched
+        on the decoded objects.
+        """
+        self._ensure_fresh(key, max_age)
+        indexed = [attr for attr in sorted(kwargs) if attr in INDEXED_ATTRS]
+        query = 'SELECT body FROM "%s"' % key
+        if indexed:
+            query += ' WHERE ' + ' AND '.join('"%s" = ?' % attr
+                                              for attr in indexed)
+        with self._lock:
+            rows = self._db.execute(query, [kwargs[attr] for attr in indexed])
+            rows = rows.fetchall()
+        return [obj for obj in self._resources(key, rows)
+                if all(getattr(obj, attr, None) == value
+                       for (attr, value) in kwargs.items())]
+
+    def close(self):
+        self._db.close()
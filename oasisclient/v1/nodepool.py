@@ -1,9 +1,6 @@
 from oasisclient.common import base
 from oasisclient.common import utils
 
-import jsonpatch
-import json
-
 
 class NodePool(base.Resource):
     def __repr__(self):
@@ -12,6 +9,8 @@ class NodePool(base.Resource):
 
 class NodePoolManager(base.Manager):
     resource_class = NodePool
+    collection_key = 'nodepools'
+    filter_params = ('name', 'project_id')
 
     @staticmethod
     def _path(id=None):
@@ -70,15 +69,13 @@ class NodePoolManager(base.Manager):
     def delete(self, id):
         return self._delete(self._path(id))
 
-    def update(self, id, **param):
-        original_nodepool = self.get(id).to_dict()
-        del original_nodepool['created_at']
-        del original_nodepool['updated_at']
-        del original_nodepool['id']
-        del original_nodepool['project_id']
-        del original_nodepool['user_id']
-        patch = jsonpatch.JsonPatch.from_diff(original_nodepool, param)
-        return self._update(self._path(id), json.loads(str(patch)))
+    def update(self, id, original=None, **param):
+        """Update the given fields of a node pool.
+
+        :param original: the object as last read, used to send only what
+            changed and to detect concurrent updates through its ETag.
+        """
+        return self._update_fields(self._path(id), param, original=original)
 
     def test(self):
         try:
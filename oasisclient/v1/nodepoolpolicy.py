@@ -1,7 +1,5 @@
 from oasisclient.common import base
 from oasisclient.common import utils
-import jsonpatch
-import json
 
 class NodePoolPolicy(base.Resource):
     def __repr__(self):
@@ -10,6 +8,8 @@ class NodePoolPolicy(base.Resource):
 
 class NodePoolPolicyManager(base.Manager):
     resource_class = NodePoolPolicy
+    collection_key = 'nodepool_policies'
+    filter_params = ('name', 'project_id')
 
     @staticmethod
     def _path(id=None):
@@ -65,15 +65,13 @@ class NodePoolPolicyManager(base.Manager):
         except IndexError:
             return None
 
-    def update(self, id, **param):
-        original_policy = self.get(id).to_dict()
-        del original_policy['created_at']
-        del original_policy['updated_at']
-        del original_policy['id']
-        del original_policy['project_id']
-        del original_policy['user_id']
-        patch = jsonpatch.JsonPatch.from_diff(original_policy, param)
-        return self._update(self._path(id), json.loads(str(patch)))
+    def update(self, id, original=None, **param):
+        """Update the given fields of a node pool policy.
+
+        :param original: the object as last read, used to send only what
+            changed and to detect concurrent updates through its ETag.
+        """
+        return self._update_fields(self._path(id), param, original=original)
 
     def delete(self, id):
         return self._delete(self._path(id))
@@ -1,13 +1,5 @@
 from oasisclient.common import cliutils
-
-
-@cliutils.arg('--policy',
-           metavar='<policy>',
-           help='VM policy to create.')
-def do_policy_delete(cs, args):
-    """Create a function."""
-    pass
-
+from oasisclient import exceptions
 
 
 def do_policy_list(cs, args):
@@ -17,8 +9,20 @@ def do_policy_list(cs, args):
 @cliutils.arg('policy',
            metavar='<policy>',
            nargs='+',
-           help='ID or name of the (policy)s to delete.')
+           help='ID of the (policy)s to delete.')
+@cliutils.arg('--parallel',
+           metavar='<workers>',
+           type=int,
+           default=1,
+           help='Number of policies deleted at once.')
 def do_policy_delete(cs, args):
     """Delete specified policy."""
-    pass
-
+    if hasattr(cs.http_client, 'set_pool_size'):
+        cs.http_client.set_pool_size(args.parallel)
+    failed = cliutils.run_for_each(
+        cs.policy.delete, args.policy, args.parallel,
+        success="Request to delete policy %(target)s has been accepted.",
+        failure="Delete for policy %(target)s failed: %(e)s")
+    if failed:
+        raise exceptions.CommandError(
+            "Unable to delete %d of the policies." % len(failed))
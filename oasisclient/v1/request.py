@@ -13,6 +13,8 @@ class Request(base.Resource):
 
 class RequestManager(base.Manager):
     resource_class = Request
+    collection_key = 'requests'
+    filter_params = ('httpapi_id',)
 
     @staticmethod
     def _path(id=None):
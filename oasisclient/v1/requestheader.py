@@ -13,6 +13,8 @@ class RequestHeader(base.Resource):
 
 class RequestHeaderManager(base.Manager):
     resource_class = RequestHeader
+    collection_key = 'requestheaders'
+    filter_params = ('request_id',)
 
     @staticmethod
     def _path(id=None):
@@ -65,7 +67,7 @@ class RequestHeaderManager(base.Manager):
 
     def get(self, id):
         try:
-            return self._list(self._path(id), "requestheaders")
+            return self._list(self._path(id))[0]
         except IndexError:
             return None
 
@@ -13,6 +13,8 @@ class Response(base.Resource):
 
 class ResponseManager(base.Manager):
     resource_class = Response
+    collection_key = 'responses'
+    filter_params = ('httpapi_id',)
 
     @staticmethod
     def _path(id=None):
@@ -13,6 +13,8 @@ class ResponseCode(base.Resource):
 
 class ResponseCodeManager(base.Manager):
     resource_class = ResponseCode
+    collection_key = 'responsecodes'
+    filter_params = ('response_id',)
 
     @staticmethod
     def _path(id=None):
@@ -13,6 +13,8 @@ class ResponseMessage(base.Resource):
 
 class ResponseMessageManager(base.Manager):
     resource_class = ResponseMessage
+    collection_key = 'responsemessages'
+    filter_params = ('response_id',)
 
     @staticmethod
     def _path(id=None):
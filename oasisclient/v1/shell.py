@@ -13,10 +13,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from oasisclient.v1 import function_shell
-from oasisclient.v1 import policy_shell
-
+# Modules holding the do_* commands. They are only imported when one of
+# their commands is run, or to rebuild the cached command table.
 COMMAND_MODULES = [
-    function_shell,
-    policy_shell
+    'oasisclient.v1.bench_shell',
+    'oasisclient.v1.export_shell',
+    'oasisclient.v1.function_shell',
+    'oasisclient.v1.manifest_shell',
+    'oasisclient.v1.policy_shell',
 ]